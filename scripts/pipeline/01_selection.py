@@ -9,6 +9,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 from src.core.config import ConfigLoader
 from src.gatekeeper.engine import GatekeeperEngine
 from src.core.models import NewsItem
+from src.core.ledger import ProcessedLedger
 
 def run_stage1():
     print("=== [Stage 1] Daily News Selection (Gatekeeper) ===")
@@ -18,9 +19,25 @@ def run_stage1():
     config = loader.load()
     
     # 2. Initialize Engine
-    engine = GatekeeperEngine(config)
+    # Ledger (stable item IDs): items scored in earlier runs keep their stored scores
+    ledger = ProcessedLedger()
+    engine = GatekeeperEngine(config, ledger=ledger)
     print(f"DEBUG: Loaded API Keys: {list(config.api_keys.keys())}")
     
+    try:
+        output_path = select_and_save(config, engine)
+    except BaseException:
+        # Nothing persisted: the polled feed items stay unseen, so the next run fetches them again
+        engine.discard_feed_state()
+        raise
+    # Only now are the polled feed items safe to mark as seen (incremental polling, if enabled)
+    engine.commit_feed_state()
+    print(f"=== [Stage 1] Complete. Saved to {output_path} ===")
+
+def select_and_save(config, engine: GatekeeperEngine) -> str:
+    """
+    Steps 3-6: fetch (or load today's archive), filter, judge and save. Returns the output path.
+    """
     # 3. Fetch & Filters (IRL)
     today = datetime.now().strftime("%Y-%m-%d")
     output_dir = f"data/daily/{today}"
@@ -181,8 +198,8 @@ def run_stage1():
     # Overwrite legacy for dashboard compatibility
     with open(output_path_legacy, 'w', encoding='utf-8') as f:
         json.dump(data_dicts, f, indent=4, ensure_ascii=False, cls=DateTimeEncoder)
-        
-    print(f"=== [Stage 1] Complete. Saved to {output_path} ===")
+
+    return output_path
 
 if __name__ == "__main__":
     run_stage1()
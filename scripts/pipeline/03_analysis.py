@@ -1,6 +1,9 @@
 import sys
 import os
 import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict
 
@@ -13,8 +16,70 @@ from src.core.models import NewsItem, Commentary
 from src.historian.engine import HistorianEngine
 from src.historian.graph_db import Neo4jGraph
 from src.analyst.engine import AnalystEngine
+from src.core.ledger import ProcessedLedger
+from src.analyst.rate_limit import RateLimiter
+from src.analyst.workflow import StepCheckpoint
+from src.analyst.prompts import ANALYST_PROMPT_VERSION
 from dataclasses import asdict
 
+LEDGER_STAGE = "stage3_analysis" # base name; the run's stage adds model + prompt version
+
+# Articles analyzed at once, and the shared LLM quota they draw on
+ARTICLE_CONCURRENCY = int(os.getenv("STAGE3_CONCURRENCY", "4"))
+LLM_RPM = float(os.getenv("STAGE3_RPM", "15"))
+LLM_CONCURRENCY = int(os.getenv("STAGE3_LLM_CONCURRENCY", "4"))
+
+class DateTimeEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+def safe_filename(item_id: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', item_id)
+
+def load_partial(path: str) -> List[Dict]:
+    """
+    Reads commentaries appended by an interrupted run (a torn last line is ignored).
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+def build_context(historian: HistorianEngine, item: NewsItem, tag: str) -> Dict:
+    # A. Retrieve Context
+    try:
+        context = historian.retrieve_context(item)
+        events = context.get('related_events', [])
+        print(f"    > {tag} Found {len(events)} related historical events.")
+        
+        # [NEW] Add Related News from Clustering
+        related_news = []
+        if hasattr(item, 'related_items') and item.related_items:
+            # Convert related items to simplified dicts
+            for r in item.related_items:
+                # Depending on how it's stored (obj or dict), handle safely
+                r_title = r.title if hasattr(r, 'title') else r.get('title')
+                r_source = r.source if hasattr(r, 'source') else r.get('source')
+                if r_title:
+                    related_news.append(f"- {r_title} ({r_source})")
+                    
+        context['related_news'] = related_news
+        if related_news:
+            print(f"    > {tag} Integrated {len(related_news)} similar reports into context.")
+        
+    except Exception as e:
+        print(f"    > {tag} Historian Error: {e}")
+        context = {"related_events": [], "related_news": []}
+    return context
+
 def run_stage3():
     print("=== [Stage 3] Context Retrieval & Analysis ===")
     
@@ -97,62 +162,85 @@ def run_stage3():
         print(f">>> Initializing Analyst with Mock LLM (No Key)...")
         active_key = None
         
-    analyst = AnalystEngine(use_openai=use_openai, use_gemini=use_gemini, api_key=active_key)
+    # One quota for every article analyzed in parallel (Gemini free tier ~15 RPM)
+    limiter = RateLimiter(rpm=LLM_RPM, max_concurrency=LLM_CONCURRENCY)
+    analyst = AnalystEngine(use_openai=use_openai, use_gemini=use_gemini, api_key=active_key, rate_limiter=limiter)
+    
+    # Resume state (partial JSONL, step checkpoints) is only valid for the model + prompts that wrote it
+    run_key = f"{safe_filename(analyst.model)}.v{ANALYST_PROMPT_VERSION}"
+    output_path = os.path.join(date_dir, "3_analyzed.json")
+    partial_path = os.path.join(date_dir, f"3_analyzed.{run_key}.jsonl")
+    checkpoint_root = os.path.join(date_dir, "checkpoints")
+    checkpoint_dir = os.path.join(checkpoint_root, run_key)
+    
+    # Finished commentaries by news_id (ledger from earlier runs + partial JSONL of a crashed run)
+    finished = {}
     
-    commentaries = []
+    # Ledger (stable item IDs): reuse commentaries the same model + prompts produced in an earlier run.
+    # Mock commentaries are never recorded, so a later run with a key analyzes those items for real.
+    ledger = ProcessedLedger()
+    ledger_stage = f"{LEDGER_STAGE}:{analyst.model}:v{ANALYST_PROMPT_VERSION}"
+    ledger.retire_stages(ledger_stage)
+    new_items, done_items = ledger.split_new(ledger_stage, items)
+    for item in done_items:
+        finished[item.id] = ledger.get(ledger_stage, item.id)
+    if done_items:
+        print(f">>> Ledger: reusing {len(done_items)} analyses, {len(new_items)} new items to analyze.")
     
-    # 3. Processing Loop
-    for i, item in enumerate(items):
-        print(f"\n[{i+1}/{len(items)}] Analyzing: {item.title[:50]}...")
+    for record in load_partial(partial_path):
+        finished.setdefault(record['news_id'], record)
+    pending = [item for item in new_items if item.id not in finished]
+    if len(pending) < len(new_items):
+        print(f">>> Resuming: {len(new_items) - len(pending)} items already in {partial_path}.")
+    
+    # 3. Processing (bounded concurrency, each result appended to the JSONL as it finishes)
+    write_lock = threading.Lock()
+    
+    def analyze(idx: int, item: NewsItem):
+        tag = f"[{idx+1}/{len(pending)}]"
+        print(f"\n{tag} Analyzing: {item.title[:50]}...")
+        context = build_context(historian, item, tag)
         
-        # A. Retrieve Context
+        # B. Generate Analysis (agent steps checkpointed: a rerun resumes after the last finished step)
+        checkpoint = StepCheckpoint(os.path.join(checkpoint_dir, f"{safe_filename(item.id)}.json"))
+        if checkpoint.steps:
+            print(f"    > {tag} Resuming from checkpoint: {', '.join(checkpoint.steps)} done.")
         try:
-            print("    > Querying Knowledge Graph...")
-            context = historian.retrieve_context(item)
-            events = context.get('related_events', [])
-            print(f"    > Found {len(events)} related historical events.")
-            
-            # [NEW] Add Related News from Clustering
-            related_news = []
-            if hasattr(item, 'related_items') and item.related_items:
-                # Convert related items to simplified dicts
-                for r in item.related_items:
-                    # Depending on how it's stored (obj or dict), handle safely
-                    r_title = r.title if hasattr(r, 'title') else r.get('title')
-                    r_source = r.source if hasattr(r, 'source') else r.get('source')
-                    if r_title:
-                        related_news.append(f"- {r_title} ({r_source})")
-                        
-            context['related_news'] = related_news
-            if related_news:
-                print(f"    > Integrated {len(related_news)} similar reports into context.")
-            
+            commentary = analyst.generate_commentary(item, context_data=context, checkpoint=checkpoint)
         except Exception as e:
-            print(f"    > Historian Error: {e}")
-            context = {"related_events": [], "related_news": []}
-            
-        # B. Generate Analysis
-        try:
-            print("    > Generating Commentary (Agentic Workflow)...")
-            commentary = analyst.generate_commentary(item, context_data=context)
-            commentaries.append(commentary)
-            print(f"    > Done. Title: {commentary.title}")
-        except Exception as e:
-            print(f"    > Analyst Error: {e}")
-            
-    # 4. Save Results
-    output_path = os.path.join(date_dir, "3_analyzed.json")
+            print(f"    > {tag} Analyst Error: {e} (progress kept in {checkpoint.path})")
+            return
+        record = asdict(commentary)
+        with write_lock:
+            with open(partial_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False, cls=DateTimeEncoder) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            finished[item.id] = record
+        if not analyst.is_mock:
+            ledger.record(ledger_stage, item.id, record)
+        checkpoint.clear() # The item checkpoint is now the JSONL line
+        print(f"    > {tag} Done. Title: {commentary.title}")
     
-    class DateTimeEncoder(json.JSONEncoder):
-        def default(self, o):
-            if isinstance(o, datetime):
-                return o.isoformat()
-            return super().default(o)
-
-    outputs = [asdict(c) for c in commentaries]
+    print(f">>> Analyzing {len(pending)} items ({ARTICLE_CONCURRENCY} at a time)...")
+    with ThreadPoolExecutor(max_workers=ARTICLE_CONCURRENCY) as executor:
+        for future in [executor.submit(analyze, i, item) for i, item in enumerate(pending)]:
+            future.result()
+    print(f"    > LLM quota: {limiter.stats}")
+    print(f"    > Historian retrieval cache: {historian.cache_stats}")
+            
+    # 4. Compaction: JSONL -> 3_analyzed.json (curated order), atomically
+    outputs = [finished[item.id] for item in items if item.id in finished]
     
-    with open(output_path, 'w', encoding='utf-8') as f:
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(outputs, f, indent=4, ensure_ascii=False, cls=DateTimeEncoder)
+    os.replace(tmp_path, output_path)
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+    for path in (checkpoint_dir, checkpoint_root):
+        if os.path.isdir(path) and not os.listdir(path):
+            os.rmdir(path)
         
     print(f"\n=== [Stage 3] Complete. Saved {len(outputs)} reports to {output_path} ===")
     
@@ -7,6 +7,7 @@ from datetime import datetime
 sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 
 from src.analyst.llm import GeminiClient, OpenAIClient
+from src.analyst.llm_cache import CachedLLM
 from src.core.config import ConfigLoader
 
 def get_mermaid_chart(client, content):
@@ -55,6 +56,7 @@ def run_stage4():
     if not gemini_key:
         print("Warning: GOOGLE_API_KEY not found. Visualization may fail.")
     viz_llm = GeminiClient(api_key=gemini_key) # Use Gemini for chart gen for speed/cost
+    viz_llm = CachedLLM(viz_llm) # Re-exports of unchanged analyses reuse cached charts
     
     # 2. Format MD/HTML
     # Output File
@@ -88,6 +90,7 @@ def run_stage4():
                 f.write(f"> - {t}\n")
             f.write(f"\n---\n\n")
             
+    print(f"    > Chart cache: {viz_llm.stats}")
     print(f"=== [Stage 4] Complete. Report saved to {output_file} ===")
 
 if __name__ == "__main__":
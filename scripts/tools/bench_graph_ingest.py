@@ -0,0 +1,58 @@
+import sys
+import os
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+# Add project root to path (scripts/tools/ -> ../../)
+sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
+
+from src.core.models import Event
+from src.historian.graph_db import Neo4jGraph
+from src.historian.neo4j_fake import RecordingDriver
+
+def synthetic_events(count: int, entities: int, seed: int = 0):
+    rng = random.Random(seed)
+    names = [f"Entity_{i}" for i in range(entities)]
+    start = datetime(2015, 1, 1)
+    for i in range(count):
+        yield Event(
+            id=f"EVT_BENCH_{i}",
+            date=start + timedelta(hours=i),
+            description=f"Synthetic event {i}",
+            entities=rng.sample(names, 3),
+            event_type="Benchmark",
+            impact_score=round(rng.random(), 3),
+        )
+
+def run_benchmark():
+    """
+    Neo4j bulk-ingestion benchmark. Uses the recording fake driver unless --live is given.
+    Example: python scripts/tools/bench_graph_ingest.py --events 20000 --batch-size 1000 --latency 0.005
+    """
+    parser = argparse.ArgumentParser(description="Benchmark batched UNWIND ingestion into Neo4j.")
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--entities", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.005, help="Seconds per round-trip (fake driver)")
+    parser.add_argument("--live", action="store_true", help="Use the real Neo4j from NEO4J_URI")
+    args = parser.parse_args()
+
+    driver = None if args.live else RecordingDriver(latency=args.latency)
+    graph = Neo4jGraph(driver=driver, batch_size=args.batch_size)
+
+    start = time.time()
+    written = graph.add_events(synthetic_events(args.events, args.entities))
+    elapsed = time.time() - start
+
+    print("=== [Graph Ingest Benchmark] ===")
+    print(f"Events: {written} | Batch size: {args.batch_size} | Wall time: {elapsed:.2f}s ({written / max(elapsed, 1e-9):.0f} rows/s)")
+    if driver is not None:
+        print(f"Round-trips: {driver.round_trips} (schema: {len(Neo4jGraph.SCHEMA_QUERIES)}) | Sessions: {driver.sessions}")
+        per_event = args.events * args.latency
+        print(f"Per-event MERGE at the same latency would take ~{per_event:.1f}s")
+    graph.close()
+
+if __name__ == "__main__":
+    run_benchmark()
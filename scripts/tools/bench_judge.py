@@ -0,0 +1,48 @@
+import sys
+import os
+import time
+import argparse
+from datetime import datetime
+
+# Add project root to path (scripts/tools/ -> ../../)
+sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
+
+from src.core.models import NewsItem
+from src.analyst.llm import FakeLLM
+from src.gatekeeper.judge import Judge
+
+def run_benchmark():
+    """
+    Offline Judge throughput benchmark (no API calls).
+    Example: python scripts/tools/bench_judge.py --items 200 --latency 1.5 --rpm 60 --concurrency 8 --error-rate 0.05
+    """
+    parser = argparse.ArgumentParser(description="Benchmark Judge scheduling against a fake LLM.")
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds per fake completion")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls raising a 429")
+    parser.add_argument("--rpm", type=float, default=60)
+    parser.add_argument("--tpm", type=float, default=1_000_000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    items = [
+        NewsItem(id=f"BENCH_{i}", title=f"Benchmark headline {i}", content="Snippet " * 40,
+                 url=f"https://example.com/{i}", published_at=datetime.now(), source="bench")
+        for i in range(args.items)
+    ]
+
+    llm = FakeLLM(latency=args.latency, error_rate=args.error_rate, error_message="429 RESOURCE_EXHAUSTED (retry in 1s)")
+    judge = Judge(llm=llm, rpm=args.rpm, tpm=args.tpm, max_concurrency=args.concurrency, memo_path=None)
+
+    start = time.time()
+    ranked = judge.evaluate_batch(items)
+    elapsed = time.time() - start
+
+    scored = sum(1 for item in ranked if item.scores_breakdown.get('llm_reason') == "Fake Judge")
+    print("=== [Judge Benchmark] ===")
+    print(f"Items: {len(ranked)} (scored: {scored}) | LLM calls: {llm.calls} (errors: {llm.errors})")
+    print(f"Wall time: {elapsed:.2f}s | Throughput: {len(ranked) / elapsed:.1f} items/s")
+    print(f"Limiter: {judge.limiter.stats}")
+
+if __name__ == "__main__":
+    run_benchmark()
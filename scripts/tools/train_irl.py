@@ -7,6 +7,11 @@ from typing import List, Tuple
 from sentence_transformers import SentenceTransformer
 import random
 
+# Add project root to path (scripts/tools/ -> ../../)
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
+from src.gatekeeper.embedding_cache import EmbeddingCache
+
 # Configuration
 MODEL_NAME = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
 WEIGHTS_PATH = "data/irl_weights.pth"
@@ -20,9 +25,13 @@ class PreferenceDataset(Dataset):
         
         # Pre-embed or embed on fly? Embed on fly is slower but saves RAM.
         # Let's pre-embed for small datasets.
+        # Shared embedding cache: retraining on the same history skips SBERT entirely.
         print("[Trainer] Embedding data...")
-        pos_embs = embedder.encode(positives, convert_to_tensor=True)
-        neg_embs = embedder.encode(negatives, convert_to_tensor=True)
+        cache = EmbeddingCache(model_name=MODEL_NAME)
+        encode_fn = lambda batch: embedder.encode(batch, convert_to_numpy=True)
+        pos_embs = torch.from_numpy(cache.encode(positives, encode_fn))
+        neg_embs = torch.from_numpy(cache.encode(negatives, encode_fn))
+        print(f"[Trainer] Embedding cache: {cache.stats}")
         
         for emb in pos_embs:
             self.data.append((emb, 1.0)) # Label 1.0 for selected
@@ -1,56 +1,98 @@
+import threading
 from src.analyst.llm import MockLLM, LLMInterface
-from typing import Dict, Any
+from src.analyst.context import ContextBuilder
+from src.analyst.tokens import estimate_tokens
+from typing import Dict, Any, Optional
 from src.analyst.prompts import (
-    PLANNER_SYSTEM_PROMPT, 
-    SIMULATOR_SYSTEM_PROMPT, 
+    PLANNER_SYSTEM_PROMPT,
+    SIMULATOR_SYSTEM_PROMPT,
     WRITER_SYSTEM_PROMPT,
     DEVILS_ADVOCATE_SYSTEM_PROMPT,
     SYNTHESIZER_SYSTEM_PROMPT
 )
 
 class Agent:
-    def __init__(self, name: str, role: str, llm: LLMInterface):
+    # Token budgets for the agent-specific part of the prompt (after the shared prefix)
+    RELATED_TOKENS = 0
+    UPSTREAM_TOKENS = 600 # each upstream output (plan, simulation, critique)
+
+    def __init__(self, name: str, role: str, llm: LLMInterface, builder: Optional[ContextBuilder] = None):
         self.name = name
         self.role = role
         self.llm = llm
+        self.builder = builder or ContextBuilder()
+        self._usage = threading.local()
 
     def run(self, context: Dict[str, Any]) -> str:
         pass
 
+    @property
+    def last_usage(self) -> Optional[Dict[str, int]]:
+        """
+        Estimated tokens of this thread's last call: prompt (incl. system), shared system prefix, completion.
+        """
+        return getattr(self._usage, 'last', None)
+
+    def _upstream(self, context: Dict[str, Any], key: str) -> str:
+        return self.builder.capped(context[key], self.UPSTREAM_TOKENS)
+
+    def _related(self, context: Dict[str, Any]) -> str:
+        return self.builder.related(context.get('related_news', []), self.RELATED_TOKENS)
+
+    def _complete(self, context: Dict[str, Any], task: str, role_prompt: str) -> str:
+        # System = shared prefix (same bytes for every agent on this article) + this agent's role
+        system_prompt = self.builder.system_prompt(context, role_prompt)
+        prefix_tokens = estimate_tokens(self.builder.shared_system(context))
+        return self._call(task.strip(), system_prompt, prefix_tokens)
+
+    def _call(self, user_prompt: str, system_prompt: str, prefix_tokens: int = 0) -> str:
+        response = self.llm.complete(user_prompt, system_prompt)
+        self._usage.last = {
+            "prompt": estimate_tokens(system_prompt) + estimate_tokens(user_prompt),
+            "prefix": prefix_tokens,
+            "completion": estimate_tokens(response or ""),
+        }
+        return response
+
 class PlannerAgent(Agent):
+    RELATED_TOKENS = 400
+
     def run(self, context: Dict[str, Any]) -> str:
         # Context includes news item, historical events, AND related news
-        related_str = "\n".join(context.get('related_news', []))
-        prompt = f"Create an outline for a commentary on: {context['news'].title}.\nContext: {context['history']}\nRelated Reports being merged: {related_str}"
-        return self.llm.complete(prompt, PLANNER_SYSTEM_PROMPT)
+        task = f"Create an outline for a commentary on the article above.\nRelated Reports being merged:\n{self._related(context)}"
+        return self._complete(context, task, PLANNER_SYSTEM_PROMPT)
 
 class SimulatorAgent(Agent):
     def run(self, context: Dict[str, Any]) -> str:
+        # Needs only the title: no shared article/history prefix
         prompt = f"Run a counterfactual simulation for: {context['news'].title}. What if this didn't happen?"
-        return self.llm.complete(prompt, SIMULATOR_SYSTEM_PROMPT)
+        return self._call(prompt, SIMULATOR_SYSTEM_PROMPT)
 
 class DevilsAdvocateAgent(Agent):
     def run(self, context: Dict[str, Any]) -> str:
-        prompt = f"""
-        Critique this Plan: {context['plan']}
-        And this Counterfactual: {context['simulation']}
-        
+        task = f"""
+        Critique this Plan: {self._upstream(context, 'plan')}
+        And this Counterfactual: {self._upstream(context, 'simulation')}
+
         Identify 3 flaws or missed risks.
         """
-        return self.llm.complete(prompt, DEVILS_ADVOCATE_SYSTEM_PROMPT)
+        return self._complete(context, task, DEVILS_ADVOCATE_SYSTEM_PROMPT)
 
 class SynthesizerAgent(Agent):
     def run(self, context: Dict[str, Any]) -> str:
-        prompt = f"""
-        Original Plan: {context['plan']}
-        Critique: {context['critique']}
-        
+        task = f"""
+        Original Plan: {self._upstream(context, 'plan')}
+        Critique: {self._upstream(context, 'critique')}
+
         Synthesize a Revised Plan that addresses the critique.
         """
-        return self.llm.complete(prompt, SYNTHESIZER_SYSTEM_PROMPT)
+        return self._complete(context, task, SYNTHESIZER_SYSTEM_PROMPT)
 
 class WriterAgent(Agent):
+    RELATED_TOKENS = 250
+    UPSTREAM_TOKENS = 800
+
     def run(self, context: Dict[str, Any]) -> str:
-        related_str = "\n".join(context.get('related_news', []))
-        prompt = f"Write a commentary based on this outline: {context['plan']}.\nIncorporate this simulation: {context['simulation']}.\nAlso synthesize insights from these related reports: {related_str}"
-        return self.llm.complete(prompt, WRITER_SYSTEM_PROMPT)
+        simulation = self.builder.capped(context['simulation'], self.UPSTREAM_TOKENS // 2)
+        task = f"Write a commentary based on this outline: {self._upstream(context, 'plan')}.\nIncorporate this simulation: {simulation}.\nAlso synthesize insights from these related reports: {self._related(context)}"
+        return self._complete(context, task, WRITER_SYSTEM_PROMPT)
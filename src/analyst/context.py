@@ -0,0 +1,67 @@
+from typing import Dict, Any, List
+from src.analyst.tokens import estimate_tokens, truncate_to_tokens
+from src.analyst.prompts import ANALYST_SHARED_SYSTEM_PROMPT
+
+class ContextBuilder:
+    """
+    Builds agent prompts as system = <shared prefix> + <agent role> and user = <agent task>.
+    The shared prefix (instructions + article + history) is byte-identical for every agent working
+    on the same article and comes first in the request, so provider-side prefix caching can reuse it;
+    everything agent-specific (role prompt, upstream outputs, related reports) follows it,
+    each capped to a token budget.
+    """
+    def __init__(self, article_tokens: int = 350, history_tokens: int = 500):
+        self.article_tokens = article_tokens
+        self.history_tokens = history_tokens
+
+    def shared_prefix(self, context: Dict[str, Any]) -> str:
+        news = context['news']
+        snippet = truncate_to_tokens(news.content or "", self.article_tokens)
+        return (
+            f"## Article\nTitle: {news.title}\nSource: {news.source}\n{snippet}\n\n"
+            f"## Historical Context\n{self.history(context.get('history', []))}\n\n"
+        )
+
+    def history(self, events: List[Any]) -> str:
+        """
+        Most impactful past events first, one line each, until the history budget is spent.
+        """
+        if not events:
+            return "(none)"
+        ranked = sorted(events, key=lambda e: getattr(e, 'impact_score', 0.0), reverse=True)
+        return self._capped_lines([self._event_line(e) for e in ranked], self.history_tokens, "past events")
+
+    @staticmethod
+    def _event_line(event: Any) -> str:
+        if not hasattr(event, 'description'):
+            return f"- {event}"
+        date = event.date.strftime('%Y-%m-%d') if hasattr(event.date, 'strftime') else event.date
+        return f"- {date}: {event.description} (impact {event.impact_score:.1f})"
+
+    def related(self, related_news: List[str], max_tokens: int) -> str:
+        if not related_news or max_tokens <= 0:
+            return "(none)"
+        return self._capped_lines(list(related_news), max_tokens, "similar reports")
+
+    @staticmethod
+    def _capped_lines(lines: List[str], max_tokens: int, noun: str) -> str:
+        kept, used = [], 0
+        for line in lines:
+            cost = estimate_tokens(line) + 1
+            if kept and used + cost > max_tokens:
+                break
+            kept.append(truncate_to_tokens(line, max_tokens) if not kept else line)
+            used += cost
+        if len(kept) < len(lines):
+            kept.append(f"(+{len(lines) - len(kept)} more {noun} omitted)")
+        return "\n".join(kept)
+
+    @staticmethod
+    def capped(text: str, max_tokens: int) -> str:
+        return truncate_to_tokens(text or "", max_tokens)
+
+    def shared_system(self, context: Dict[str, Any]) -> str:
+        return ANALYST_SHARED_SYSTEM_PROMPT.strip() + "\n\n" + self.shared_prefix(context)
+
+    def system_prompt(self, context: Dict[str, Any], role_prompt: str) -> str:
+        return self.shared_system(context) + "## Role\n" + role_prompt.strip()
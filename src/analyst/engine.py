@@ -1,11 +1,16 @@
 from src.analyst.llm import MockLLM, OpenAIClient, GeminiClient
 from src.analyst.agents import PlannerAgent, SimulatorAgent, WriterAgent, DevilsAdvocateAgent, SynthesizerAgent
 from src.core.models import NewsItem, Commentary
-from typing import Dict, Any
+from src.analyst.llm_cache import CachedLLM, DEFAULT_CACHE_PATH
+from src.analyst.rate_limit import RateLimiter, RateLimitedLLM
+from src.analyst.workflow import WorkflowScheduler, WorkflowNode, StepCheckpoint, format_timings
+from typing import Dict, Any, Optional
 import os
 
 class AnalystEngine:
-    def __init__(self, use_openai: bool = False, use_gemini: bool = False, api_key: str = None):
+    def __init__(self, use_openai: bool = False, use_gemini: bool = False, api_key: str = None,
+                 cache_path: Optional[str] = DEFAULT_CACHE_PATH, replay_only: bool = False,
+                 rate_limiter: Optional[RateLimiter] = None):
         self.llm = MockLLM()
         
         if use_gemini and api_key:
@@ -15,14 +20,37 @@ class AnalystEngine:
             # Fallback to OpenAI if not explicitly using Gemini
             self.llm = OpenAIClient(api_key=api_key)
             print("    > [Analyst] Using OpenAI Model.")
+        
+        # Mock output is a placeholder, never a result worth persisting
+        self.is_mock = isinstance(self.llm, MockLLM)
+        self.model = getattr(self.llm, 'model', type(self.llm).__name__)
+        
+        # Shared quota (one limiter across all concurrently analyzed articles)
+        if rate_limiter is not None and not self.is_mock:
+            self.llm = RateLimitedLLM(self.llm, rate_limiter)
+
+        # Persistent response cache: rerunning stage 3 on unchanged input costs no API call
+        if cache_path and not self.is_mock:
+            self.llm = CachedLLM(self.llm, path=cache_path, replay_only=replay_only)
             
         self.planner = PlannerAgent("Planner", "Structural Planning", self.llm)
         self.simulator = SimulatorAgent("Simulator", "Counterfactual Reasoning", self.llm)
         self.devil = DevilsAdvocateAgent("Devil", "Risk Analysis", self.llm)
         self.synthesizer = SynthesizerAgent("Synthesizer", "Logic Synthesis", self.llm)
         self.writer = WriterAgent("Writer", "Content Generation", self.llm)
+
+        # Agent dependency graph: Planner and Simulator are independent and run in parallel,
+        # the debate loop (critique -> revised plan) follows, then the Writer.
+        self.workflow = WorkflowScheduler([
+            WorkflowNode("plan", self.planner),
+            WorkflowNode("simulation", self.simulator),
+            WorkflowNode("critique", self.devil, deps=["plan", "simulation"]),
+            WorkflowNode("revised_plan", self.synthesizer, deps=["plan", "critique"]),
+            WorkflowNode("draft", self.writer, deps=["revised_plan", "simulation"], bind={"plan": "revised_plan"}),
+        ])
         
-    def generate_commentary(self, news_item: NewsItem, context_data: Dict[str, Any]) -> Commentary:
+    def generate_commentary(self, news_item: NewsItem, context_data: Dict[str, Any],
+                            checkpoint: Optional[StepCheckpoint] = None) -> Commentary:
         # Context for agents
         agent_context = {
             "news": news_item,
@@ -30,23 +58,13 @@ class AnalystEngine:
             "related_news": context_data.get("related_news", [])
         }
         
-        # 1. Plan
-        plan = self.planner.run(agent_context)
-        agent_context["plan"] = plan
-        
-        # 2. Simulate
-        simulation = self.simulator.run(agent_context)
-        agent_context["simulation"] = simulation
-        
-        # 3. Debate Loop (New)
-        critique = self.devil.run(agent_context)
-        agent_context["critique"] = critique
-        
-        revised_plan = self.synthesizer.run(agent_context)
-        agent_context["plan"] = revised_plan # Update plan for Writer
-        
-        # 4. Write
-        draft = self.writer.run(agent_context)
+        # 1. Plan || 2. Simulate -> 3. Debate Loop -> 4. Write
+        results, timings = self.workflow.run(agent_context, checkpoint=checkpoint)
+        plan = results["plan"]
+        simulation = results["simulation"]
+        critique = results["critique"]
+        revised_plan = results["revised_plan"]
+        draft = results["draft"]
         
         # Parse Metrics (Confidence & Horizon)
         import re
@@ -83,7 +101,8 @@ class AnalystEngine:
                 f"Initial Plan: {plan}",
                 f"Simulation: {simulation}",
                 f"Critique: {critique}",
-                f"Revised Plan: {revised_plan}"
+                f"Revised Plan: {revised_plan}",
+                format_timings(timings)
             ],
             referenced_events=[e.id for e in context_data.get("related_events", [])],
             counterfactuals=[simulation]
@@ -0,0 +1,91 @@
+import json
+import re
+from typing import Any, Dict, List
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser for a streamed JSON array of objects (`[{...}, {...}]`).
+    `feed()` returns every top-level object completed by the new text, so callers can act
+    on each element before the completion finishes. Tolerates leading prose / ```json fences,
+    and skips (counts) malformed elements instead of failing the whole array.
+    The array starts at a `[` right after a code fence, or at a `[` followed (after whitespace)
+    by `{` or `]`, so brackets in leading prose ("[Note] ...", "[1]") are not taken for it.
+    """
+    FENCE = re.compile(r'```[A-Za-z]*\s*$')
+
+    def __init__(self):
+        self._buf = []          # chars of the object currently being read
+        self._in_array = False
+        self._bracket = False   # saw a `[` in the prose; the next non-space char decides
+        self._tail = ""         # last prose chars (code fence detection)
+        self._done = False
+        self._depth = 0         # brace/bracket depth inside the current element
+        self._in_string = False
+        self._escape = False
+        self.malformed = 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        out = []
+        for ch in text:
+            if self._done:
+                break
+            if not self._in_array:
+                if self._bracket:
+                    if ch.isspace():
+                        continue
+                    self._bracket = False
+                    self._in_array = ch in '{]'
+                if not self._in_array:
+                    if ch == '[':
+                        if self.FENCE.search(self._tail):
+                            self._in_array = True
+                        else:
+                            self._bracket = True
+                    self._tail = (self._tail + ch)[-32:]
+                    continue
+
+            if self._depth == 0:
+                # Between elements: wait for the next object or the closing bracket
+                if ch == '{':
+                    self._buf = [ch]
+                    self._depth = 1
+                elif ch == ']':
+                    self._done = True
+                continue
+
+            self._buf.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(out)
+        return out
+
+    def _emit(self, out: List[Dict[str, Any]]):
+        raw = "".join(self._buf)
+        self._buf = []
+        try:
+            obj = json.loads(raw)
+        except ValueError:
+            self.malformed += 1
+            return
+        if isinstance(obj, dict):
+            out.append(obj)
+        else:
+            self.malformed += 1
+
+    @property
+    def complete(self) -> bool:
+        return self._done
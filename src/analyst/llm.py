@@ -1,8 +1,12 @@
+import asyncio
+import threading
+import weakref
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple, Union
 
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
+    import httpx
     HAS_OPENAI = True
 except ImportError:
     HAS_OPENAI = False
@@ -13,13 +17,87 @@ try:
 except ImportError:
     HAS_GEMINI = False
 
+# Connection pool size per provider/API key (shared by every client instance)
+POOL_MAX_CONNECTIONS = 32
+POOL_MAX_KEEPALIVE = 16
+
+_pool_lock = threading.Lock()
+_sync_clients: Dict[Tuple[str, str], Any] = {}
+# Async transports are bound to the event loop that created them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], Any]]" = weakref.WeakKeyDictionary()
+
+def _shared_client(provider: str, api_key: Optional[str], factory):
+    key = (provider, api_key or "")
+    with _pool_lock:
+        client = _sync_clients.get(key)
+        if client is None:
+            client = _sync_clients[key] = factory()
+        return client
+
+def _shared_async_client(provider: str, api_key: Optional[str], factory):
+    loop = asyncio.get_running_loop()
+    key = (provider, api_key or "")
+    with _pool_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = factory()
+        return client
+
+Prompt = Union[str, Tuple[str, str]]
+
 class LLMInterface(ABC):
     @abstractmethod
     def complete(self, user_prompt: str, system_prompt: str = "") -> str:
         pass
 
+    async def acomplete(self, user_prompt: str, system_prompt: str = "") -> str:
+        """
+        Async completion. Default: runs the blocking `complete` in the default executor;
+        provider clients override this with their native async transport.
+        """
+        return await asyncio.to_thread(self.complete, user_prompt, system_prompt)
+
+    async def abatch(self, prompts: Sequence[Prompt], max_concurrency: int = 8,
+                     return_exceptions: bool = False) -> List[Any]:
+        """
+        Runs many completions concurrently on the current event loop (results in input order).
+        Each prompt is a user prompt or a (user_prompt, system_prompt) tuple.
+        """
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def run(prompt: Prompt) -> str:
+            user_prompt, system_prompt = (prompt, "") if isinstance(prompt, str) else prompt
+            async with slots:
+                return await self.acomplete(user_prompt, system_prompt)
+
+        return await asyncio.gather(*(run(p) for p in prompts), return_exceptions=return_exceptions)
+
+    def stream(self, user_prompt: str, system_prompt: str = "") -> Iterator[str]:
+        """
+        Yields the completion as text deltas. Default: one chunk from `complete`.
+        """
+        yield self.complete(user_prompt, system_prompt)
+
 class MockLLM(LLMInterface):
+    model = "mock"
+
+    def __init__(self, latency: float = 0.0):
+        # Simulated round-trip time (seconds) for exercising concurrent callers offline
+        self.latency = latency
+
     def complete(self, user_prompt: str, system_prompt: str = "") -> str:
+        if self.latency:
+            import time
+            time.sleep(self.latency)
+        return self._respond(user_prompt, system_prompt)
+
+    async def acomplete(self, user_prompt: str, system_prompt: str = "") -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(user_prompt, system_prompt)
+
+    def _respond(self, user_prompt: str, system_prompt: str) -> str:
         # Simple heuristic response based on prompt content
         if "Planner" in system_prompt or "Plan" in user_prompt:
             return "THOUGHT: I should retrieve context about the topic.\nPLAN: Retrieve(Topic)"
@@ -41,42 +119,164 @@ class MockLLM(LLMInterface):
             return "REVIEW: The analysis is sound. Grade: S"
         return "Mock Response"
 
+class FakeLLM(LLMInterface):
+    """
+    Offline stand-in for benchmarking schedulers: configurable latency and error injection.
+    Answers Judge-style prompts ("ID: ..." lines) with a JSON score list.
+    """
+    model = "fake"
+
+    def __init__(self, latency: float = 1.0, error_rate: float = 0.0, error_message: str = "429 RESOURCE_EXHAUSTED", seed: int = 0):
+        import random
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_message = error_message
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def _roll(self) -> bool:
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return fail
+
+    def complete(self, user_prompt: str, system_prompt: str = "") -> str:
+        import time
+        fail = self._roll()
+        time.sleep(self.latency)
+        if fail:
+            raise RuntimeError(self.error_message)
+        return self._respond(user_prompt)
+
+    async def acomplete(self, user_prompt: str, system_prompt: str = "") -> str:
+        fail = self._roll()
+        await asyncio.sleep(self.latency)
+        if fail:
+            raise RuntimeError(self.error_message)
+        return self._respond(user_prompt)
+
+    @staticmethod
+    def _respond(user_prompt: str) -> str:
+        import json
+        import re
+        ids = re.findall(r"^ID: (.+)$", user_prompt, re.MULTILINE)
+        if ids:
+            return json.dumps([{"id": i, "score": 5.0, "reason": "Fake Judge"} for i in ids])
+        return "Mock Response"
+
+    def stream(self, user_prompt: str, system_prompt: str = "") -> Iterator[str]:
+        text = self.complete(user_prompt, system_prompt)
+        for i in range(0, len(text), 16):
+            yield text[i:i + 16]
+
 class OpenAIClient(LLMInterface):
-    def __init__(self, api_key: str, model: str = "gpt-4o"):
+    def __init__(self, api_key: str, model: str = "gpt-4o", max_output_tokens: Optional[int] = None):
         if not HAS_OPENAI:
             raise ImportError("OpenAI library not installed.")
-        self.client = OpenAI(api_key=api_key)
+        self.api_key = api_key
         self.model = model
-        
-    def complete(self, user_prompt: str, system_prompt: str = "") -> str:
+        self.max_output_tokens = max_output_tokens # enforced by the provider when set
+        # One keep-alive pool per API key, shared by Judge / Analyst / Writer instances
+        self.client = _shared_client("openai", api_key, lambda: OpenAI(
+            api_key=api_key, http_client=httpx.Client(limits=self._limits())))
+
+    @staticmethod
+    def _limits():
+        return httpx.Limits(max_connections=POOL_MAX_CONNECTIONS, max_keepalive_connections=POOL_MAX_KEEPALIVE)
+
+    @property
+    def aclient(self):
+        api_key = self.api_key
+        return _shared_async_client("openai", api_key, lambda: AsyncOpenAI(
+            api_key=api_key, http_client=httpx.AsyncClient(limits=self._limits())))
+
+    @staticmethod
+    def _messages(user_prompt: str, system_prompt: str) -> List[Dict[str, str]]:
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": user_prompt})
+        return messages
+
+    def _options(self) -> Dict[str, Any]:
+        return {"max_tokens": self.max_output_tokens} if self.max_output_tokens else {}
+
+    def complete(self, user_prompt: str, system_prompt: str = "") -> str:
+        messages = self._messages(user_prompt, system_prompt)
         
         response = self.client.chat.completions.create(
             model=self.model,
-            messages=messages
+            messages=messages,
+            **self._options()
         )
         return response.choices[0].message.content
 
+    async def acomplete(self, user_prompt: str, system_prompt: str = "") -> str:
+        response = await self.aclient.chat.completions.create(
+            model=self.model,
+            messages=self._messages(user_prompt, system_prompt),
+            **self._options()
+        )
+        return response.choices[0].message.content
+
+    def stream(self, user_prompt: str, system_prompt: str = "") -> Iterator[str]:
+        messages = self._messages(user_prompt, system_prompt)
+
+        for chunk in self.client.chat.completions.create(model=self.model, messages=messages, stream=True, **self._options()):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
 class GeminiClient(LLMInterface):
-    def __init__(self, api_key: str, model: str = "gemini-3-flash-preview"):
+    def __init__(self, api_key: str, model: str = "gemini-3-flash-preview", max_output_tokens: Optional[int] = None):
         if not HAS_GEMINI:
             raise ImportError("Google GenAI library not installed. Run 'pip install google-genai'.")
-        self.client = genai.Client(api_key=api_key)
+        # genai.Client owns the HTTP session; share it per API key (its `.aio` side per event loop, see aclient)
+        self.api_key = api_key
+        self.client = _shared_client("gemini", api_key, lambda: genai.Client(api_key=api_key))
         self.model = model
-        
-    def complete(self, user_prompt: str, system_prompt: str = "") -> str:
+        self.max_output_tokens = max_output_tokens # enforced by the provider when set
+
+    @property
+    def aclient(self):
+        # `.aio` sessions are bound to the loop that first used them: one client per loop
+        api_key = self.api_key
+        return _shared_async_client("gemini", api_key, lambda: genai.Client(api_key=api_key).aio)
+
+    def _options(self) -> Dict[str, Any]:
+        return {"config": {"max_output_tokens": self.max_output_tokens}} if self.max_output_tokens else {}
+
+    @staticmethod
+    def _full_prompt(user_prompt: str, system_prompt: str) -> str:
         # Simple concatenation for System Prompt if Config is complex
         # Or try to use system_instruction if supported easily.
         # Let's use the explicit Concatenation for maximum compatibility with the preview model.
-        full_prompt = user_prompt
         if system_prompt:
-            full_prompt = f"System Instruction:\n{system_prompt}\n\nUser Task:\n{user_prompt}"
-            
+            return f"System Instruction:\n{system_prompt}\n\nUser Task:\n{user_prompt}"
+        return user_prompt
+        
+    def complete(self, user_prompt: str, system_prompt: str = "") -> str:
         response = self.client.models.generate_content(
             model=self.model,
-            contents=full_prompt
+            contents=self._full_prompt(user_prompt, system_prompt),
+            **self._options()
         )
         return response.text
+
+    async def acomplete(self, user_prompt: str, system_prompt: str = "") -> str:
+        response = await self.aclient.models.generate_content(
+            model=self.model,
+            contents=self._full_prompt(user_prompt, system_prompt),
+            **self._options()
+        )
+        return response.text
+
+    def stream(self, user_prompt: str, system_prompt: str = "") -> Iterator[str]:
+        full_prompt = self._full_prompt(user_prompt, system_prompt)
+
+        for chunk in self.client.models.generate_content_stream(model=self.model, contents=full_prompt, **self._options()):
+            if chunk.text:
+                yield chunk.text
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterator, Optional
+from src.analyst.llm import LLMInterface
+
+DEFAULT_CACHE_PATH = "data/llm_cache.sqlite"
+
+class CacheMissError(KeyError):
+    """Raised in replay-only mode when a prompt has no cached response."""
+
+class CachedLLM(LLMInterface):
+    """
+    Persistent response cache around any LLMInterface (SQLite).
+    Key = sha256(model, system prompt, user prompt). Entries expire after `ttl_seconds`
+    and the least-recently-used rows are evicted beyond `max_entries`.
+
+    replay_only=True never calls the wrapped client: misses raise CacheMissError
+    (deterministic tests / offline reruns).
+
+    `validate(user_prompt, response) -> bool` rejects responses before they are stored
+    (e.g. truncated / unparseable JSON), so a bad answer is never replayed.
+    """
+
+    def __init__(self, llm: LLMInterface, path: str = DEFAULT_CACHE_PATH, ttl_seconds: Optional[float] = 30 * 24 * 3600,
+                 max_entries: int = 50_000, replay_only: bool = False,
+                 validate: Optional[Callable[[str, str], bool]] = None):
+        self.llm = llm
+        self.validate = validate
+        self.rejected = 0
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.replay_only = replay_only
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, response TEXT,"
+            " created REAL, accessed REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed)")
+        self._db.commit()
+
+    @property
+    def model(self) -> str:
+        return getattr(self.llm, 'model', type(self.llm).__name__)
+
+    def key(self, user_prompt: str, system_prompt: str = "") -> str:
+        h = hashlib.sha256()
+        for part in (self.model, system_prompt, user_prompt):
+            h.update(part.encode('utf-8'))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def lookup(self, user_prompt: str, system_prompt: str = "") -> Optional[str]:
+        key = self.key(user_prompt, system_prompt)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return row[0]
+
+    def store(self, user_prompt: str, system_prompt: str, response: str) -> bool:
+        """
+        Caches `response` unless it is empty or fails `validate`. Returns whether it was stored.
+        """
+        if not response:
+            return False
+        if self.validate is not None and not self.validate(user_prompt, response):
+            self.rejected += 1
+            return False
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (self.key(user_prompt, system_prompt), self.model, response, now, now)
+            )
+            count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                # Evict LRU rows down to 90% of the limit in one statement
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed ASC LIMIT ?)",
+                    (count - int(self.max_entries * 0.9),)
+                )
+            self._db.commit()
+        return True
+
+    def invalidate(self, user_prompt: str, system_prompt: str = ""):
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (self.key(user_prompt, system_prompt),))
+            self._db.commit()
+
+    def complete(self, user_prompt: str, system_prompt: str = "") -> str:
+        cached = self.lookup(user_prompt, system_prompt)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        if self.replay_only:
+            raise CacheMissError(f"No cached response for prompt (model={self.model}) in replay-only mode")
+
+        response = self.llm.complete(user_prompt, system_prompt)
+        self.store(user_prompt, system_prompt, response)
+        return response
+
+    async def acomplete(self, user_prompt: str, system_prompt: str = "") -> str:
+        cached = self.lookup(user_prompt, system_prompt)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        if self.replay_only:
+            raise CacheMissError(f"No cached response for prompt (model={self.model}) in replay-only mode")
+
+        response = await self.llm.acomplete(user_prompt, system_prompt)
+        self.store(user_prompt, system_prompt, response)
+        return response
+
+    def stream(self, user_prompt: str, system_prompt: str = "") -> Iterator[str]:
+        cached = self.lookup(user_prompt, system_prompt)
+        if cached is not None:
+            self.hits += 1
+            yield cached
+            return
+
+        self.misses += 1
+        if self.replay_only:
+            raise CacheMissError(f"No cached response for prompt (model={self.model}) in replay-only mode")
+
+        parts = []
+        for delta in self.llm.stream(user_prompt, system_prompt):
+            parts.append(delta)
+            yield delta
+        # Only fully received (and valid) completions are cached
+        self.store(user_prompt, system_prompt, "".join(parts))
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "rejected": self.rejected,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
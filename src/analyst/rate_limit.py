@@ -0,0 +1,179 @@
+import re
+import threading
+import time
+from typing import Iterator, Optional
+from src.analyst.llm import LLMInterface
+
+RETRYABLE_MARKERS = ("429", "503", "Overloaded", "RESOURCE_EXHAUSTED", "UNAVAILABLE", "Rate limit")
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, up to `capacity` banked.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Takes `amount` tokens (may go negative = debt) and returns how long the caller must wait.
+        Requests larger than the capacity are clamped so they can still proceed.
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+class RateLimiter:
+    """
+    Shared LLM quota: requests-per-minute + tokens-per-minute buckets, a concurrency cap,
+    and a global cool-down that any worker can trigger on 429/503 (honouring Retry-After).
+    One instance can be shared by every caller that draws on the same API key.
+    """
+    def __init__(self, rpm: float = 15, tpm: float = 1_000_000, max_concurrency: int = 4):
+        self.requests = TokenBucket(rpm / 60.0, max(1.0, min(rpm, max_concurrency)))
+        self.tokens = TokenBucket(tpm / 60.0, tpm)
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._cooldown_until = 0.0
+        self._penalty = 0 # consecutive throttles (exponential backoff exponent)
+
+        # Stats
+        self.calls = 0
+        self.throttled = 0
+        self.waited = 0.0
+
+    def acquire(self, est_tokens: int = 0):
+        self._slots.acquire()
+        wait = max(self.requests.reserve(1), self.tokens.reserve(est_tokens))
+        with self._lock:
+            wait = max(wait, self._cooldown_until - time.monotonic())
+            self.calls += 1
+        if wait > 0:
+            self.waited += wait
+            time.sleep(wait)
+
+    def release(self):
+        self._slots.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def on_success(self):
+        with self._lock:
+            self._penalty = 0
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> float:
+        """
+        Registers a 429/503 and pauses every worker. Returns the cool-down applied (seconds).
+        Without a Retry-After hint: 12s, 24s, 48s, ... capped at 120s.
+        """
+        with self._lock:
+            self.throttled += 1
+            delay = retry_after if retry_after is not None else min(120.0, 12.0 * (2 ** self._penalty))
+            self._penalty += 1
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+            return delay
+
+    @property
+    def stats(self) -> dict:
+        return {"calls": self.calls, "throttled": self.throttled, "waited_s": round(self.waited, 2)}
+
+def is_retryable(error: Exception) -> bool:
+    err_str = str(error)
+    status = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+    return status in (429, 503) or any(marker in err_str for marker in RETRYABLE_MARKERS)
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Extracts a server-suggested delay from a provider error (Retry-After header, Gemini retryDelay, message text).
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers:
+        value = headers.get('retry-after') or headers.get('Retry-After')
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(error)) or \
+            re.search(r"(?:retry|try again) in (\d+(?:\.\d+)?)\s*s", str(error), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+class RateLimitedLLM(LLMInterface):
+    """
+    Routes every call of a wrapped client through a shared RateLimiter, retrying 429/503
+    after the global cool-down. Wrap *inside* CachedLLM so cache hits cost no quota.
+    """
+    def __init__(self, llm: LLMInterface, limiter: RateLimiter, max_retries: int = 3, output_tokens: int = 1024):
+        self.llm = llm
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.output_tokens = output_tokens
+
+    @property
+    def model(self) -> str:
+        return getattr(self.llm, 'model', type(self.llm).__name__)
+
+    def _estimate(self, user_prompt: str, system_prompt: str) -> int:
+        from src.analyst.tokens import estimate_tokens
+        return estimate_tokens(user_prompt) + estimate_tokens(system_prompt) + self.output_tokens
+
+    def _throttled(self, e: Exception, attempt: int) -> bool:
+        if is_retryable(e) and attempt < self.max_retries - 1:
+            delay = self.limiter.on_throttle(retry_after_seconds(e))
+            print(f"    > [RateLimit] {self.model} throttled. All workers cooling down {delay:.0f}s...")
+            return True
+        return False
+
+    def complete(self, user_prompt: str, system_prompt: str = "") -> str:
+        est_tokens = self._estimate(user_prompt, system_prompt)
+        for attempt in range(self.max_retries):
+            self.limiter.acquire(est_tokens)
+            try:
+                response = self.llm.complete(user_prompt, system_prompt)
+            except Exception as e:
+                if self._throttled(e, attempt):
+                    continue
+                raise
+            finally:
+                self.limiter.release()
+            self.limiter.on_success()
+            return response
+
+    def stream(self, user_prompt: str, system_prompt: str = "") -> Iterator[str]:
+        """
+        The slot is held for the whole stream; a throttled stream is retried only
+        if nothing was yielded yet (otherwise the error reaches the caller).
+        """
+        est_tokens = self._estimate(user_prompt, system_prompt)
+        for attempt in range(self.max_retries):
+            yielded = False
+            self.limiter.acquire(est_tokens)
+            try:
+                for delta in self.llm.stream(user_prompt, system_prompt):
+                    yielded = True
+                    yield delta
+            except Exception as e:
+                if not yielded and self._throttled(e, attempt):
+                    continue
+                raise
+            finally:
+                self.limiter.release()
+            self.limiter.on_success()
+            return
@@ -0,0 +1,43 @@
+import re
+
+# Optional exact tokenizer; the heuristic below is used when tiktoken is missing
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+# Hangul, CJK ideographs, Hiragana/Katakana: roughly one token per character
+_CJK_RE = re.compile(r'[ᄀ-ᇿ぀-ヿ㄰-㆏㐀-䶿一-鿿가-힯]')
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count estimate for budgeting prompts (provider-agnostic).
+    Latin text ~4 chars/token; CJK ~1 char/token (our KR/JP feeds).
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cuts text to roughly `max_tokens` (on a word boundary when possible).
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # Binary search on the character length
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    cut = text[:lo]
+    space = cut.rfind(' ')
+    if space > lo * 0.8:
+        cut = cut[:space]
+    return cut.rstrip() + "..."
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+from src.analyst.agents import Agent
+
+@dataclass
+class WorkflowNode:
+    """
+    One agent step. Its result is stored under `output` in the shared context.
+    `bind` maps the context keys the agent reads to the keys they are taken from
+    (e.g. the Writer reads "plan" from "revised_plan").
+    """
+    output: str
+    agent: Agent
+    deps: List[str] = field(default_factory=list)
+    bind: Dict[str, str] = field(default_factory=dict)
+
+@dataclass
+class NodeTiming:
+    name: str
+    start: float # seconds since workflow start
+    duration: float
+    restored: bool = False # taken from a checkpoint, no LLM call
+    usage: Optional[Dict[str, int]] = None # estimated tokens (see Agent.last_usage)
+
+class StepCheckpoint:
+    """
+    Per-item store of finished workflow steps (one JSON file, rewritten atomically per step).
+    A rerun restores those outputs instead of re-issuing their LLM calls.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.steps: Dict[str, Any] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.steps = json.load(f).get("steps", {})
+            except (OSError, ValueError):
+                self.steps = {} # Torn write: start the item over
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.steps.get(key)
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self.steps[key] = value
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({"steps": self.steps}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+    def clear(self):
+        with self._lock:
+            self.steps = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+class WorkflowScheduler:
+    """
+    Runs a DAG of agent nodes: every node whose dependencies are done is started at once,
+    so independent agents (e.g. Planner and Simulator) overlap their LLM round-trips.
+    """
+    def __init__(self, nodes: List[WorkflowNode], max_workers: Optional[int] = None):
+        self.nodes = {node.output: node for node in nodes}
+        for node in nodes:
+            missing = [d for d in node.deps if d not in self.nodes]
+            if missing:
+                raise ValueError(f"Node '{node.output}' depends on unknown nodes: {missing}")
+        self.max_workers = max_workers or len(nodes)
+
+    def run(self, context: Dict[str, Any], checkpoint: Optional[StepCheckpoint] = None):
+        """
+        Executes the graph on a copy of `context`. Returns (results, timings in completion order).
+        With a checkpoint, finished steps are restored and every new step is saved as it completes.
+        """
+        context = dict(context)
+        pending = dict(self.nodes)
+        timings = []
+        t0 = time.perf_counter()
+
+        if checkpoint is not None:
+            for name, node in list(pending.items()):
+                saved = checkpoint.get(name)
+                if saved is not None:
+                    context[name] = saved
+                    timings.append(NodeTiming(node.agent.name, 0.0, 0.0, restored=True))
+                    del pending[name]
+
+        def execute(node: WorkflowNode):
+            view = dict(context)
+            for key, source in node.bind.items():
+                view[key] = context[source]
+            start = time.perf_counter()
+            result = node.agent.run(view)
+            return result, start - t0, time.perf_counter() - start, node.agent.last_usage
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            error = None
+            while pending or running:
+                if error is None:
+                    for name, node in list(pending.items()):
+                        if all(dep in context for dep in node.deps):
+                            running[executor.submit(execute, node)] = node
+                            del pending[name]
+                if not running:
+                    if error is not None:
+                        break
+                    raise ValueError(f"Workflow has a dependency cycle: {sorted(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    try:
+                        result, start, duration, usage = future.result()
+                    except Exception as e:
+                        # Let in-flight siblings finish (and checkpoint) before re-raising
+                        error = error or e
+                        continue
+                    context[node.output] = result
+                    if checkpoint is not None:
+                        checkpoint.put(node.output, result)
+                    timings.append(NodeTiming(node.agent.name, start, duration, usage=usage))
+
+            if error is not None:
+                raise error
+
+        results = {name: context[name] for name in self.nodes}
+        return results, timings
+
+def _format_step(t: NodeTiming) -> str:
+    if t.restored:
+        return f"{t.name} (checkpoint)"
+    step = f"{t.name} {t.duration:.2f}s @+{t.start:.2f}s"
+    if t.usage:
+        step += f" ~{t.usage['prompt']} in ({t.usage['prefix']} shared) / {t.usage['completion']} out tok"
+    return step
+
+def format_timings(timings: List[NodeTiming]) -> str:
+    wall = max((t.start + t.duration for t in timings), default=0.0)
+    steps = " | ".join(_format_step(t) for t in timings)
+    total = sum(t.usage['prompt'] + t.usage['completion'] for t in timings if t.usage)
+    return f"Timing: {steps} (wall {wall:.2f}s, ~{total} tok)"
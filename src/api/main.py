@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any
@@ -7,11 +8,19 @@ from src.core.config import ConfigLoader
 from src.core.models import NewsItem, Commentary, Event
 from src.gatekeeper.engine import GatekeeperEngine
 from src.historian.graph_db import LocalGraph
+from src.historian.graph_store import PersistentGraph, DEFAULT_GRAPH_DIR
 from src.historian.engine import HistorianEngine
 from src.analyst.engine import AnalystEngine
 from src.editor.engine import EditorEngine
 
-app = FastAPI(title="Autowein's Cognitive Digital Twin API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Shutdown. Neo4j: release the driver; PersistentGraph: final snapshot + WAL reset
+    if hasattr(graph_db, 'close'):
+        graph_db.close()
+
+app = FastAPI(title="Autowein's Cognitive Digital Twin API", lifespan=lifespan)
 
 # Initialize Singletons
 config = ConfigLoader("config_mobility.yaml").load()
@@ -22,10 +31,12 @@ try:
     # In production, credentials should come from env vars
     # For now, we wrap in try/except to fallback if Neo4j is not running
     graph_db = Neo4jGraph(uri="bolt://localhost:7687", user="neo4j", password="password")
+    if graph_db.driver is None:
+        raise ConnectionError("driver unavailable")
     print(" [System] Connected to Neo4j Production Database.")
 except Exception as e:
-    print(f" [System] Neo4j connection failed ({e}). Falling back to LocalGraph (Memory).")
-    graph_db = LocalGraph()
+    print(f" [System] Neo4j connection failed ({e}). Falling back to LocalGraph (snapshot + WAL in {DEFAULT_GRAPH_DIR}).")
+    graph_db = PersistentGraph(DEFAULT_GRAPH_DIR)
 
 gatekeeper = GatekeeperEngine(config)
 historian = HistorianEngine(graph_db)
@@ -97,5 +108,5 @@ def analyze_news(news_id: str):
 # Debug endpoint to populate graph
 @app.post("/debug/add_event")
 def add_event(event: Event):
-    graph_db.add_event(event)
-    return {"status": "success"}
+    historian.add_event(event) # invalidates cached retrievals for the event's entities
+    return {"status": "success", "retrieval_cache": historian.cache_stats}
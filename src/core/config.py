@@ -1,6 +1,6 @@
 import json
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 @dataclass
 class DomainConfig:
@@ -14,6 +14,13 @@ class DomainConfig:
     # API Keys
     api_keys: Dict[str, str] = field(default_factory=dict)
     
+    # Scraper settings (`scraper:` section)
+    # Incremental polling state (conditional GET + seen items); None fetches every feed in full
+    feed_state_path: Optional[str] = None
+    # Concurrent feed fetches (<= 1: serial) and per-request timeout in seconds
+    scraper_max_workers: int = 8
+    scraper_timeout: float = 10
+    
     # Legacy fields (kept for compatibility but unused)
     entity_types: List[str] = field(default_factory=list)
     relation_types: List[str] = field(default_factory=list)
@@ -50,6 +57,13 @@ class ConfigLoader:
                      data['sources'] = parsed.get('sources', [])
                      data['api_keys'] = parsed.get('api_keys', {})
                      
+                     scraper = parsed.get('scraper') or {}
+                     data['feed_state_path'] = scraper.get('feed_state')
+                     if 'max_workers' in scraper:
+                         data['scraper_max_workers'] = int(scraper['max_workers'])
+                     if 'timeout' in scraper:
+                         data['scraper_timeout'] = float(scraper['timeout'])
+                     
                      rep = parsed.get('reputation', {})
                      data['trust_list'] = rep.get('trust_list', [])
                      data['block_list'] = rep.get('block_list', [])
@@ -76,7 +90,10 @@ class ConfigLoader:
             sources=data.get('sources', []),
             trust_list=data.get('trust_list', []),
             block_list=data.get('block_list', []),
-            api_keys=data.get('api_keys', {})
+            api_keys=data.get('api_keys', {}),
+            feed_state_path=data.get('feed_state_path'),
+            scraper_max_workers=data.get('scraper_max_workers', 8),
+            scraper_timeout=data.get('scraper_timeout', 10)
         )
         return self._config
     
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_LEDGER_FILE = "data/processed_ledger.jsonl"
+
+class ProcessedLedger:
+    """
+    Append-only record of which NewsItem IDs each stage has already processed (and its stored result).
+    Requires stable, content-addressed item IDs (see src.gatekeeper.dedup.stable_item_id).
+
+    File format: one JSON object per line {"stage", "id", "ts", "data"}; later lines win.
+    Stage names carry the model/version that produced the data (e.g. "stage3_analysis:gpt-4o:v2"),
+    so a new model starts with an empty stage instead of reusing old results.
+    Superseded lines are dropped by compact(), which also runs on load once more than
+    `compact_ratio` lines exist per live entry; retire_stages() drops results of older versions.
+    A torn last line (crash mid-append) is cut off on load, so the next append starts on a fresh line.
+    """
+
+    def __init__(self, path: str = DEFAULT_LEDGER_FILE, compact_ratio: float = 2.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {} # stage -> {item_id: data}
+        self._stamps: Dict[str, Dict[str, str]] = {} # stage -> {item_id: ts}
+
+        lines = 0
+        if os.path.exists(path):
+            self._repair_tail()
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        rec = json.loads(line)
+                        self._entries.setdefault(rec['stage'], {})[rec['id']] = rec.get('data')
+                        self._stamps.setdefault(rec['stage'], {})[rec['id']] = rec.get('ts')
+                    except Exception:
+                        pass # Torn last line after a crash
+
+        live = sum(len(entries) for entries in self._entries.values())
+        if compact_ratio and lines > max(live, 1) * compact_ratio:
+            print(f"[Ledger] Compacting {path}: {lines} lines -> {live} entries.")
+            self.compact()
+
+    def _repair_tail(self):
+        """
+        Truncates a partial last line (no trailing newline) left by a crash mid-append;
+        a complete record that only lacks its newline gets one instead.
+        """
+        with open(self.path, 'r+b') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Find the start of the last line
+            pos, chunk = size, 4096
+            start = 0
+            while pos > 0:
+                step = min(chunk, pos)
+                pos -= step
+                f.seek(pos)
+                newline = f.read(step).rfind(b"\n")
+                if newline >= 0:
+                    start = pos + newline + 1
+                    break
+            f.seek(start)
+            tail = f.read()
+            try:
+                json.loads(tail)
+                f.write(b"\n")
+            except ValueError:
+                print(f"[Ledger] Dropping torn last line of {self.path} ({len(tail)} bytes).")
+                f.truncate(start)
+
+    def has(self, stage: str, item_id: str) -> bool:
+        return item_id in self._entries.get(stage, {})
+
+    def get(self, stage: str, item_id: str) -> Optional[Any]:
+        return self._entries.get(stage, {}).get(item_id)
+
+    def split_new(self, stage: str, items: Iterable) -> Tuple[List, List]:
+        """
+        Returns (new items, already processed items) for `stage`.
+        """
+        done = self._entries.get(stage, {})
+        new, seen = [], []
+        for item in items:
+            (seen if item.id in done else new).append(item)
+        return new, seen
+
+    def record(self, stage: str, item_id: str, data: Any = None):
+        self.record_many(stage, [(item_id, data)])
+
+    def record_many(self, stage: str, records: Iterable):
+        """
+        records: iterable of (item_id, data). Appended and fsync'd in one write.
+        """
+        ts = datetime.now().isoformat()
+        lines = []
+        with self._lock:
+            stage_entries = self._entries.setdefault(stage, {})
+            stage_stamps = self._stamps.setdefault(stage, {})
+            for item_id, data in records:
+                stage_entries[item_id] = data
+                stage_stamps[item_id] = ts
+                lines.append(json.dumps({"stage": stage, "id": item_id, "ts": ts, "data": data}, ensure_ascii=False, default=str))
+            if not lines:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def count(self, stage: str) -> int:
+        return len(self._entries.get(stage, {}))
+
+    def stages(self) -> List[str]:
+        return list(self._entries)
+
+    def retire_stages(self, current: str) -> List[str]:
+        """
+        Drops every other version of `current`'s stage family (same name before the first ':',
+        incl. the unversioned name), compacting the file if anything was dropped.
+        Call at startup with the stage this run reads and writes.
+        """
+        family = current.split(':', 1)[0]
+        retired = [stage for stage in self.stages()
+                   if stage != current and stage.split(':', 1)[0] == family]
+        if retired:
+            print(f"[Ledger] Retiring {len(retired)} old '{family}' stage(s): {', '.join(retired)}")
+            self.compact(drop_stages=retired)
+        return retired
+
+    def compact(self, drop_stages: Iterable[str] = ()):
+        """
+        Rewrites the file with one line per live (stage, id), atomically (tmp + rename).
+        drop_stages: stages to forget entirely, e.g. results of a retired model version.
+        """
+        with self._lock:
+            for stage in drop_stages:
+                self._entries.pop(stage, None)
+                self._stamps.pop(stage, None)
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for stage, entries in self._entries.items():
+                    stamps = self._stamps.get(stage, {})
+                    for item_id, data in entries.items():
+                        f.write(json.dumps({"stage": stage, "id": item_id, "ts": stamps.get(item_id), "data": data},
+                                           ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,126 @@
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Set
+import numpy as np
+
+# MinHash LSH parameters (20 bands x 3 rows):
+# P(candidate) ~ 0.99 at Jaccard 0.6, ~0.93 at 0.5, ~0.003 at Jaccard 0.05 (unrelated titles).
+MINHASH_BANDS = 20
+MINHASH_ROWS = 3
+
+# Up to this many titles, candidates come from an exact bound instead of LSH (no missed pairs)
+EXACT_TITLE_LIMIT = 4000
+TITLE_THRESHOLD = 0.85
+
+def semantic_neighbors(embeddings, threshold: float = 0.70, top_k: int = 32, block_size: int = 1024) -> List[Dict[int, float]]:
+    """
+    Blocked top-k cosine search.
+    Returns, for every row i, {j: cos_sim} for all neighbours (j != i) with sim >= threshold:
+    exact, because a row whose k-th neighbour is still above the threshold (a dense cluster)
+    falls back to a full scan of its already computed similarity row.
+    Memory is O(block_size x N) instead of the full N x N matrix.
+    """
+    emb = np.asarray(embeddings, dtype=np.float32)
+    n = len(emb)
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    emb = emb / np.maximum(norms, 1e-12)
+
+    k = min(top_k + 1, n) # +1: each row is its own best match
+    neighbors: List[Dict[int, float]] = []
+
+    for start in range(0, n, block_size):
+        sims = emb[start:start + block_size] @ emb.T
+        if k < n:
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(n), (len(sims), n))
+
+        for offset, row in enumerate(top):
+            i = start + offset
+            row_sims = sims[offset, row]
+            if k < n and row_sims.min() >= threshold:
+                # More than top_k neighbours above the threshold: take them all
+                row = np.flatnonzero(sims[offset] >= threshold)
+                row_sims = sims[offset, row]
+            neighbors.append({
+                int(j): float(s) for j, s in zip(row, row_sims)
+                if j != i and s >= threshold
+            })
+
+    return neighbors
+
+def _shingles(title: str, size: int = 3) -> Set[int]:
+    text = " ".join(title.lower().split())
+    if len(text) <= size:
+        return {zlib.crc32(text.encode('utf-8'))}
+    return {zlib.crc32(text[i:i + size].encode('utf-8')) for i in range(len(text) - size + 1)}
+
+def title_candidates(titles: List[str], bands: int = MINHASH_BANDS, rows: int = MINHASH_ROWS, seed: int = 42,
+                     exact_limit: int = EXACT_TITLE_LIMIT, threshold: float = TITLE_THRESHOLD) -> List[Set[int]]:
+    """
+    Near-identical title candidates: for every row i, the set of rows j whose title may have
+    a Levenshtein / difflib ratio > `threshold` with title i.
+    Up to `exact_limit` titles this is exact (see exact_title_candidates). Above it, MinHash LSH
+    over character 3-shingles: rows sharing at least one LSH band. LSH recall is probabilistic:
+    on synthetic news titles with 1-2 word-level edits it finds ~99.9% of the pairs above
+    the threshold (tests/test_clustering.py compares it with a brute-force scan).
+    """
+    if len(titles) <= exact_limit:
+        return exact_title_candidates(titles, threshold)
+
+    n_hashes = bands * rows
+    rng = np.random.RandomState(seed)
+    # Multiply-shift hashing: (a*x + b) mod 2^64 (wrap-around), keep the high 32 bits. `a` must be odd.
+    a = rng.randint(0, 1 << 62, size=n_hashes, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.randint(0, 1 << 62, size=n_hashes, dtype=np.int64).astype(np.uint64)
+
+    buckets = defaultdict(list)
+    for idx, title in enumerate(titles):
+        if not title:
+            continue
+        sh = np.fromiter(_shingles(title), dtype=np.uint64)
+        # Minimised over shingles -> one signature value per hash function
+        signature = ((np.outer(sh, a) + b) >> np.uint64(32)).min(axis=0)
+        for band in range(bands):
+            key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+            buckets[key].append(idx)
+
+    candidates: List[Set[int]] = [set() for _ in titles]
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        for i in members:
+            candidates[i].update(members)
+    for i, cand in enumerate(candidates):
+        cand.discard(i)
+
+    return candidates
+
+def exact_title_candidates(titles: List[str], threshold: float = TITLE_THRESHOLD, buckets: int = 64,
+                           block_size: int = 64) -> List[Set[int]]:
+    """
+    Pairs whose character-multiset bound 2 x |common chars| / (len_i + len_j) exceeds `threshold`.
+    Both the difflib and the Levenshtein ratio are 2 x (matched chars) / (len_i + len_j), and
+    matched chars never exceed the common multiset, so no pair above the threshold is missed.
+    Characters are folded into `buckets` counts (folding only loosens the bound); O(N^2) but vectorized.
+    """
+    n = len(titles)
+    counts = np.zeros((n, buckets), dtype=np.int32)
+    for idx, title in enumerate(titles):
+        if title:
+            codes = np.frombuffer(title.encode('utf-32-le'), dtype=np.uint32) % buckets
+            counts[idx] = np.bincount(codes, minlength=buckets)
+    lengths = counts.sum(axis=1)
+
+    candidates: List[Set[int]] = [set() for _ in titles]
+    for start in range(0, n, block_size):
+        block = counts[start:start + block_size]
+        common = np.minimum(block[:, None, :], counts[None, start:, :]).sum(axis=2)
+        total = lengths[start:start + block_size, None] + lengths[None, start:]
+        hits = np.nonzero(2 * common > threshold * np.maximum(total, 1))
+        for offset, col in zip(*hits):
+            i, j = start + int(offset), start + int(col)
+            if i != j and lengths[i] and lengths[j]:
+                candidates[i].add(j)
+                candidates[j].add(i)
+    return candidates
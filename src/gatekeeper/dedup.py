@@ -0,0 +1,134 @@
+import base64
+import hashlib
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from src.core.models import NewsItem
+
+# Query parameters that never change the article (tracking / feed plumbing)
+TRACKING_PARAMS = {
+    'oc', 'ocid', 'hl', 'gl', 'ceid', 'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid',
+    'cmpid', 'cmp', 'ref', 'ref_src', 'src', 'rss', 'mc_cid', 'mc_eid', 'smid', 'sr_share'
+}
+TRACKING_PREFIXES = ('utm_', 'at_', 'pk_', 'mkt_')
+
+_EMBEDDED_URL_RE = re.compile(rb'https?://[\x21-\x7e]+')
+_TITLE_STRIP_RE = re.compile(r'[^\w]+')
+
+# Placeholders feeds (and the scraper's "No Title") use for a missing title: never an identity
+PLACEHOLDER_TITLES = {"no title", "untitled", "none", "null"}
+
+def _unwrap_google_news(parts) -> Optional[str]:
+    """
+    Google News wraps article links as news.google.com/rss/articles/<base64 protobuf>.
+    Older IDs embed the target URL in plain bytes; newer ones (AU_yqL...) cannot be decoded offline.
+    Redirectors of the form google.com/url?url=... / ?q=... are unwrapped too.
+    """
+    query = dict(parse_qsl(parts.query))
+    for key in ('url', 'q'):
+        if query.get(key, '').startswith('http'):
+            return query[key]
+
+    match = re.search(r'/articles/([A-Za-z0-9_-]+)', parts.path)
+    if not match:
+        return None
+    token = match.group(1)
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    except Exception:
+        return None
+    found = _EMBEDDED_URL_RE.search(raw)
+    return found.group(0).decode('ascii', errors='ignore') if found else None
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical article URL: Google News redirects unwrapped, lowercase host without 'www.',
+    tracking parameters and fragments removed, query sorted, trailing slash dropped.
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    if 'google.' in parts.netloc:
+        target = _unwrap_google_news(parts)
+        if target:
+            parts = urlsplit(target)
+
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https' if parts.scheme in ('http', 'https') else parts.scheme, host, path, urlencode(query), ''))
+
+def normalize_title(title: str) -> str:
+    """
+    Lowercase, punctuation-collapsed title; "" for empty or placeholder titles.
+    """
+    normalized = _TITLE_STRIP_RE.sub(' ', (title or '').lower()).strip()
+    return "" if normalized in PLACEHOLDER_TITLES else normalized
+
+def title_fingerprint(title: str) -> str:
+    normalized = normalize_title(title)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest() if normalized else ""
+
+def stable_item_id(url: str = "", guid: str = "", title: str = "", content: str = "") -> str:
+    """
+    Deterministic, content-addressed NewsItem ID.
+    Prefers the canonical URL (so the same story from two feeds collapses), then the feed GUID, then the title,
+    then the content (blank / placeholder titles would otherwise all share one ID).
+    """
+    canonical = canonicalize_url(url) if url else ""
+    title_basis = normalize_title(title)
+    if canonical:
+        basis = "url:" + canonical
+    elif guid:
+        basis = "guid:" + guid.strip()
+    elif title_basis:
+        basis = "title:" + title_basis
+    else:
+        basis = "content:" + _TITLE_STRIP_RE.sub(' ', (content or '').lower()).strip()
+    return "N_" + hashlib.sha1(basis.encode('utf-8')).hexdigest()[:16]
+
+def deduplicate_items(items: List[NewsItem]) -> Tuple[List[NewsItem], Dict[str, Dict[str, int]]]:
+    """
+    [Stage 1.2] Cross-feed exact deduplication (O(N), hash sets).
+    An item is a duplicate if its canonical URL or normalized-title hash was already seen; the first occurrence is kept.
+    Blank / placeholder titles are no key (those items match on URL only).
+
+    Returns (unique items, per-feed report):
+    {source: {"total": fetched, "kept": first occurrences, "exclusive": stories no other feed returned}}
+    """
+    group_of: Dict[str, int] = {} # url/title key -> story group
+    group_feeds: List[set] = []
+    kept: List[NewsItem] = []
+    report = defaultdict(lambda: {"total": 0, "kept": 0, "exclusive": 0})
+
+    for item in items:
+        keys = [k for k in (canonicalize_url(item.url), title_fingerprint(item.title)) if k]
+        report[item.source]["total"] += 1
+
+        group = next((group_of[k] for k in keys if k in group_of), None)
+        if group is None:
+            group = len(group_feeds)
+            group_feeds.append(set())
+            kept.append(item)
+            report[item.source]["kept"] += 1
+        for k in keys:
+            group_of.setdefault(k, group)
+        group_feeds[group].add(item.source)
+
+    for feeds in group_feeds:
+        if len(feeds) == 1:
+            report[next(iter(feeds))]["exclusive"] += 1
+
+    return kept, dict(report)
+
+def print_feed_report(report: Dict[str, Dict[str, int]]):
+    print("[Dedup] Feed contribution (total / kept / exclusive):")
+    for source, stats in sorted(report.items(), key=lambda kv: kv[1]["exclusive"]):
+        flag = "  <- adds nothing unique" if stats["exclusive"] == 0 else ""
+        print(f"    {stats['total']:5d} / {stats['kept']:5d} / {stats['exclusive']:5d}  {source}{flag}")
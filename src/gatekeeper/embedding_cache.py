@@ -0,0 +1,280 @@
+import os
+import hashlib
+import threading
+import unicodedata
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+import numpy as np
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+DEFAULT_CACHE_DIR = "data/embedding_cache"
+
+class EmbeddingCache:
+    """
+    Persistent on-disk SBERT embedding store.
+    Shared by IRLRewardModel, GatekeeperEngine, train_irl.py and learning_semantic.py.
+
+    Layout (per encoder, under `cache_dir/<encoder-slug>/`):
+    - vectors.f32 : memory-mapped float32 matrix (capacity x dim)
+    - index.npy   : compact row index [(key: raw 16-byte digest, used: occupancy flag, tick: last-use counter)]
+    - lock        : fcntl lock file
+
+    Key = blake2b(encoder name + normalized text). Eviction is LRU by tick once `max_entries` is reached.
+
+    Several processes may share one cache: lookups and writes hold an exclusive file lock and
+    re-read the index when another process saved it (the encoder itself runs outside the lock).
+    Evicted rows are committed as free in the index before new vectors overwrite them, and new
+    keys are only indexed after their vectors are flushed, so neither a crash nor a concurrent
+    writer can leave a key pointing at another text's vector.
+    Without fcntl (Windows) the lock is per process only.
+    """
+
+    # 'V16' keeps digests byte-exact ('S16' would strip trailing NUL bytes)
+    INDEX_DTYPE = np.dtype([('key', 'V16'), ('used', 'u1'), ('tick', '<i8')])
+
+    def __init__(self, model_name: str, dim: int = 768, cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_entries: int = 200_000, initial_capacity: int = 4096):
+        self.model_name = model_name
+        self.dim = dim
+        self.max_entries = max_entries
+        self.dir = os.path.join(cache_dir, model_name.replace('/', '__'))
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.index_path = os.path.join(self.dir, "index.npy")
+        self.lock_path = os.path.join(self.dir, "lock")
+        os.makedirs(self.dir, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self._thread_lock = threading.RLock()
+        self._lock_file = open(self.lock_path, 'a+b')
+
+        # key -> row (row -> key/tick lives in self._index)
+        self._rows = {}
+        self._index = np.zeros(0, dtype=self.INDEX_DTYPE)
+        self._tick = 0
+        self._touched = set() # keys read since our last save (ticks re-applied after a reload)
+        self._stamp = None # (mtime_ns, size) of the index file we last loaded or wrote
+        self.capacity = 0
+
+        with self._locked():
+            self._load_index()
+            self._open(max(len(self._index), min(initial_capacity, max_entries)))
+
+    # --- Keys ---
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+    def key(self, text: str) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self.model_name.encode('utf-8'))
+        h.update(b"\0")
+        h.update(self.normalize(text).encode('utf-8'))
+        return h.digest()
+
+    # --- Locking / sync ---
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _index_stamp(self):
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _load_index(self):
+        """
+        (Re)reads the on-disk index. Caller holds the lock.
+        """
+        self._stamp = self._index_stamp()
+        index = np.zeros(0, dtype=self.INDEX_DTYPE)
+        if self._stamp is not None and os.path.exists(self.vectors_path):
+            try:
+                index = np.load(self.index_path)
+                if index.dtype != self.INDEX_DTYPE:
+                    raise ValueError(f"index format {index.dtype} is outdated")
+            except Exception as e:
+                print(f"[EmbeddingCache] Unusable index ({e}). Starting fresh.")
+                index = np.zeros(0, dtype=self.INDEX_DTYPE)
+
+        self._index = index
+        self._rows = {index['key'][row].tobytes(): int(row) for row in np.flatnonzero(index['used'])}
+        self._tick = max(self._tick, int(index['tick'].max()) if len(index) else 0)
+        for k in self._touched:
+            row = self._rows.get(k)
+            if row is not None:
+                self._tick += 1
+                self._index['tick'][row] = self._tick
+
+    def _sync(self):
+        """
+        Picks up an index saved by another process since we last read/wrote it. Caller holds the lock.
+        """
+        if self._index_stamp() == self._stamp:
+            return
+        self._load_index()
+        self._open(max(self.capacity, len(self._index)))
+
+    def _save_index(self):
+        # Write-then-rename so a crash never leaves a half-written index
+        tmp_path = self.index_path + ".tmp.npy"
+        np.save(tmp_path, self._index)
+        os.replace(tmp_path, self.index_path)
+        self._stamp = self._index_stamp()
+        self._touched.clear()
+
+    # --- Storage ---
+    def _open(self, capacity: int):
+        """
+        (Re)maps the vector file at `capacity` rows, growing the file and index if needed.
+        """
+        size = capacity * self.dim * 4
+        with open(self.vectors_path, 'ab') as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+
+        if len(self._index) < capacity:
+            grown = np.zeros(capacity, dtype=self.INDEX_DTYPE)
+            grown[:len(self._index)] = self._index
+            self._index = grown
+        self.capacity = capacity
+        # Free rows, popped from the end (lowest row first)
+        self._free = [int(r) for r in np.flatnonzero(self._index['used'] == 0)[::-1]]
+
+    def _free_row(self) -> int:
+        """
+        Returns a free row, growing the file (doubling) or evicting LRU entries as needed.
+        """
+        if self._free:
+            return self._free.pop()
+
+        if self.capacity < self.max_entries:
+            self._vectors.flush()
+            self._open(min(self.capacity * 2, self.max_entries))
+            return self._free.pop()
+
+        # Full: evict the least-recently-used 10% in one pass
+        # (rows being written by the current batch are not `used` yet, so never chosen)
+        n_evict = max(1, self.capacity // 10)
+        used = np.flatnonzero(self._index['used'])
+        victims = used[np.argsort(self._index['tick'][used], kind='stable')[:n_evict]]
+        for row in victims:
+            del self._rows[self._index['key'][row].tobytes()]
+            self._index['used'][row] = 0
+            self._index['tick'][row] = 0
+        # Commit the eviction before the rows are overwritten: the saved index must never
+        # map an evicted key to a row that now holds another text's vector
+        self._save_index()
+        self._free = [int(r) for r in victims[::-1]]
+        return self._free.pop()
+
+    def _lookup(self, k: bytes) -> Optional[int]:
+        row = self._rows.get(k)
+        if row is not None:
+            self._tick += 1
+            self._index['tick'][row] = self._tick
+            self._touched.add(k)
+        return row
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        with self._locked():
+            self._sync()
+            row = self._lookup(self.key(text))
+            return None if row is None else np.array(self._vectors[row])
+
+    def put(self, text: str, vector: np.ndarray):
+        with self._locked():
+            self._sync()
+            self._put_many([(self.key(text), vector)])
+
+    def _put_many(self, records):
+        """
+        Writes (key, vector) pairs: vectors first (flushed), then the index. Caller holds the lock.
+        """
+        placed = []
+        for k, vector in records[-self.max_entries:]: # A batch larger than the cache keeps its tail
+            row = self._rows.get(k)
+            if row is None:
+                row = self._free_row()
+                self._index['used'][row] = 0 # Not indexed until its vector is on disk
+            self._vectors[row] = np.asarray(vector, dtype=np.float32)
+            placed.append((k, row))
+        self._vectors.flush()
+        for k, row in placed:
+            self._tick += 1
+            self._rows[k] = row
+            self._index['key'][row] = np.void(k)
+            self._index['used'][row] = 1
+            self._index['tick'][row] = self._tick
+        self._save_index()
+
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Returns an (N, dim) float32 matrix for `texts`.
+        Cached rows are read from disk; only misses (deduplicated) go through `encode_fn`,
+        which runs without holding the cache lock.
+        """
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        missing = {} # key -> (text, [positions])
+
+        with self._locked():
+            self._sync()
+            for pos, text in enumerate(texts):
+                k = self.key(text)
+                row = self._lookup(k)
+                if row is not None:
+                    out[pos] = self._vectors[row]
+                    self.hits += 1
+                else:
+                    missing.setdefault(k, (text, []))[1].append(pos)
+                    self.misses += 1
+
+        if missing:
+            miss_texts = [text for text, _ in missing.values()]
+            vectors = np.asarray(encode_fn(miss_texts), dtype=np.float32)
+            for (_, positions), vector in zip(missing.values(), vectors):
+                out[positions] = vector
+            with self._locked():
+                self._sync()
+                self._put_many(list(zip(missing.keys(), vectors)))
+
+        return out
+
+    def flush(self):
+        """
+        Persists last-use ticks of cache hits (vectors and keys are saved as they are written).
+        """
+        with self._locked():
+            if not self._touched:
+                return
+            self._sync()
+            self._vectors.flush()
+            self._save_index()
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._rows),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+    def __len__(self):
+        return len(self._rows)
@@ -1,14 +1,29 @@
-from typing import List
+from typing import List, Optional
 from src.core.models import NewsItem
+from src.core.ledger import ProcessedLedger
 from src.core.config import DomainConfig
 from src.gatekeeper.scraper import RealScraper
 from src.gatekeeper.models import IRLRewardModel
+from src.gatekeeper.reputation import ReputationIndex
+from src.gatekeeper.dedup import deduplicate_items, print_feed_report
 
 class GatekeeperEngine:
-    def __init__(self, config: DomainConfig):
+    # Above this many items, diversity clustering switches to candidate search (exact cosine, approximate LSH titles)
+    EXACT_CLUSTERING_LIMIT = 1500
+    CLUSTER_TOP_K = 32
+    
+    LEDGER_STAGE = "stage1_scores" # base name; see ledger_stage()
+    SEMANTIC_MODEL_FILE = "data/semantic_model.pkl"
+    
+    def __init__(self, config: DomainConfig, batch_size: int = 64, ledger: Optional[ProcessedLedger] = None):
         self.config = config
-        self.scraper = RealScraper(sources=config.sources)
+        self.batch_size = batch_size
+        # Optional processed-items ledger: skip re-scoring items seen in earlier runs
+        self.ledger = ledger
+        self.scraper = RealScraper(sources=config.sources, max_workers=config.scraper_max_workers,
+                                   timeout=config.scraper_timeout, state_path=config.feed_state_path)
         self.irl_model = IRLRewardModel()
+        self.reputation = ReputationIndex.from_config(config)
         # Share the heavy SBERT encoder to save memory
         self._embedder = self.irl_model.encoder
         
@@ -17,16 +32,78 @@ class GatekeeperEngine:
         Fetches live news and filters it.
         """
         raw_news = self.scraper.scrape()
-        return self.select_news(raw_news)
+        
+        # Cross-feed exact dedup before the (expensive) scoring pass
+        unique_news, feed_report = deduplicate_items(raw_news)
+        print(f"[Gatekeeper] Dedup: {len(raw_news)} -> {len(unique_news)} items.")
+        print_feed_report(feed_report)
+        
+        return self.select_news(unique_news)
+
+    def commit_feed_state(self):
+        """
+        Marks the fetched items as seen in the scraper's feed state (if enabled).
+        Call only after the selection was persisted, so a crash in between re-fetches them.
+        """
+        self.scraper.commit_state()
+
+    def discard_feed_state(self):
+        # Selection failed: forget the staged poll so the items are fetched again next run
+        self.scraper.discard_state()
 
     def select_news(self, news_items: List[NewsItem]) -> List[NewsItem]:
         """
         Filters and scores news items based on domain configuration.
+        Vectorized: all items are encoded once (batched), and the single embedding
+        matrix feeds the IRL head, the One-Class SVM and the diversity clustering.
         """
-        for item in news_items:
-            tfidf_score = self._calculate_tfidf_score(item)
-            semantic_score = self._calculate_semantic_score(item)
-            user_pref_score = self.irl_model.predict_score(item.title + " " + item.content)
+        if not news_items:
+            return news_items
+
+        texts = [item.title + " " + item.content for item in news_items]
+
+        # 1. Single SBERT pass (None if encoder unavailable -> neutral fallbacks)
+        # Load the SVM first: it may bring its own fallback SBERT if none is shared.
+        self._load_semantic_model()
+        print(f"[Deep IRLEngine] Encoding {len(texts)} items (batch size {self.batch_size})...")
+        embeddings = self._encode_texts(texts)
+
+        # Items already scored in an earlier run (stable IDs) with the same models restore their stored scores
+        self._load_tfidf_model()
+        # The stored base score depends only on the hashed models; reputation (trust/block lists
+        # may change between runs) is re-applied on read
+        stage = self.ledger_stage()
+        to_score = list(range(len(news_items)))
+        if self.ledger is not None:
+            self.ledger.retire_stages(stage)
+            to_score = []
+            for idx, item in enumerate(news_items):
+                stored = self.ledger.get(stage, item.id)
+                if stored:
+                    breakdown = dict(stored['scores_breakdown'])
+                    reputation_score = self._calculate_reputation_score(item)
+                    final_score = stored.get('base_score', breakdown['base']) * reputation_score
+                    breakdown.update(final=round(final_score, 4), reputation=round(reputation_score, 4))
+                    item.relevance_score = final_score
+                    item.scores_breakdown = breakdown
+                    item.selected = True
+                else:
+                    to_score.append(idx)
+            print(f"[Deep IRLEngine] Ledger: {len(news_items) - len(to_score)} items already scored, {len(to_score)} new.")
+
+        new_texts = [texts[i] for i in to_score]
+        new_embeddings = embeddings[to_score] if embeddings is not None else None
+
+        tfidf_scores = self._calculate_tfidf_scores(new_texts)
+        semantic_scores = self._calculate_semantic_scores(new_texts, new_embeddings)
+        user_pref_scores = self.irl_model.score_embeddings(new_embeddings) if new_embeddings is not None else [0.5] * len(new_texts)
+
+        base_scores = {}
+        for pos, idx in enumerate(to_score):
+            item = news_items[idx]
+            tfidf_score = tfidf_scores[pos]
+            semantic_score = semantic_scores[pos]
+            user_pref_score = user_pref_scores[pos]
             
             # Hybrid Score (Updated for Deep IRL)
             # TF-IDF (Keywords) + Semantic (Topic Vibe) + IRL (User Pref)
@@ -36,6 +113,7 @@ class GatekeeperEngine:
             # Dampen scores from unknown sources (potential spam)
             reputation_score = self._calculate_reputation_score(item)
             final_score = base_score * reputation_score
+            base_scores[idx] = base_score
             
             item.relevance_score = final_score
             item.scores_breakdown = {
@@ -48,38 +126,99 @@ class GatekeeperEngine:
             }
             item.selected = True # Return all for ranking
             
+        # Neutral 0.5 fallbacks are not scores: record only when every scorer really ran
+        fallbacks = self._fallback_scorers(embeddings)
+        if fallbacks and self.ledger is not None and to_score:
+            print(f"[Deep IRLEngine] Ledger: not recording {len(to_score)} scores (fallback: {', '.join(fallbacks)}).")
+        elif self.ledger is not None and to_score:
+            self.ledger.record_many(stage, (
+                (news_items[idx].id, {"base_score": base_scores[idx],
+                                      "scores_breakdown": news_items[idx].scores_breakdown})
+                for idx in to_score
+            ))
+            
         # 2. Diversity Filter (Clustering)
-        # Sort first so the highest score becomes the cluster representative
-        news_items.sort(key=lambda x: x.relevance_score, reverse=True)
+        # Sort first so the highest score becomes the cluster representative.
+        # Keep the embedding rows aligned with the new order.
+        order = sorted(range(len(news_items)), key=lambda i: news_items[i].relevance_score, reverse=True)
+        news_items = [news_items[i] for i in order]
+        if embeddings is None:
+            # Encoding already failed above: don't retry it inside the diversity filter
+            print("[Deep IRLEngine] No embeddings: skipping diversity clustering.")
+            return news_items
+        embeddings = embeddings[order]
         
         print(f"[Deep IRLEngine] Applying Diversity Clustering...")
-        news_items = self._apply_diversity_filter(news_items, threshold=0.75)
+        news_items = self._apply_diversity_filter(news_items, threshold=0.75, embeddings=embeddings)
         
         return news_items
 
-    def _apply_diversity_filter(self, items: List[NewsItem], threshold: float = 0.75) -> List[NewsItem]:
+    def ledger_stage(self) -> str:
+        """
+        Ledger stage for the current scoring models, e.g. "stage1_scores:3f2a9c1e04b7".
+        Retraining any model (new weights / SVM / TF-IDF files) yields a new stage, so old scores are not reused.
+        """
+        import hashlib
+        import os
+        from src.gatekeeper.tfidf import JSON_MODEL_FILE, BINARY_MODEL_PREFIX
+
+        h = hashlib.sha1(self.irl_model.model_name.encode('utf-8'))
+        for path in (self.irl_model.weights_path, self.SEMANTIC_MODEL_FILE, JSON_MODEL_FILE, BINARY_MODEL_PREFIX + ".idf.npy"):
+            if path and os.path.exists(path):
+                st = os.stat(path)
+                h.update(f"\0{path}:{st.st_size}:{st.st_mtime_ns}".encode('utf-8'))
+        return f"{self.LEDGER_STAGE}:{h.hexdigest()[:12]}"
+
+    def _fallback_scorers(self, embeddings) -> List[str]:
+        """
+        Names of the scorers that returned neutral fallbacks instead of model scores.
+        """
+        fallbacks = []
+        if embeddings is None:
+            fallbacks.append("embeddings")
+        if not getattr(self, '_tfidf_model', None):
+            fallbacks.append("tfidf")
+        if not self._semantic_model:
+            fallbacks.append("semantic")
+        if not self.irl_model.trained:
+            fallbacks.append("irl_head")
+        return fallbacks
+
+    def _encode_texts(self, texts: List[str]):
+        """
+        Bulk-encodes texts once. Returns a float32 numpy matrix or None.
+        """
+        if self._embedder is None:
+            return None
+        try:
+            if self._embedder is self.irl_model.encoder:
+                return self.irl_model.encode(texts, batch_size=self.batch_size)
+            # Fallback embedder (loaded for the semantic model only)
+            return self._embedder.encode(texts, batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False)
+        except Exception as e:
+            print(f"[Deep IRLEngine] Batch encoding failed: {e}")
+            return None
+
+    def _apply_diversity_filter(self, items: List[NewsItem], threshold: float = 0.75, embeddings=None, scalable: bool = None) -> List[NewsItem]:
         """
         [Stage 3.5] Clustering & Diversity
         Groups similar articles and keeps only the highest-scoring representative.
         Others are attached as `related_items`.
+        `embeddings` (optional) must be row-aligned with `items`; if omitted, items are encoded here
+        (and returned unclustered if that fails).
+        `scalable` selects candidate-based clustering (defaults to on above EXACT_CLUSTERING_LIMIT items).
         """
         if not items or not self._embedder:
             return items
             
-        from sentence_transformers import util
-        import torch
-        
-        # Prepare texts
-        texts = [f"{item.title} {item.content}" for item in items]
-        
-        # Bulk Encode
-        embeddings = self._embedder.encode(texts, convert_to_tensor=True, show_progress_bar=False)
-        
-        # Hybrid Clustering (Title + Semantic)
-        kept_items = []
-        merged_indices = set()
+        if scalable is None:
+            scalable = len(items) > self.EXACT_CLUSTERING_LIMIT
         
-        cos_scores = util.cos_sim(embeddings, embeddings)
+        if embeddings is None:
+            embeddings = self._encode_texts([f"{item.title} {item.content}" for item in items])
+            if embeddings is None:
+                print("[Deep IRLEngine] No embeddings: skipping diversity clustering.")
+                return items
         
         # Levenshtein helper
         def get_levenshtein_ratio(s1, s2):
@@ -96,6 +235,28 @@ class GatekeeperEngine:
              def get_levenshtein_ratio(s1, s2):
                  return SequenceMatcher(None, s1, s2).ratio()
 
+        if scalable:
+            kept_items = self._cluster_candidates(items, embeddings, get_levenshtein_ratio)
+        else:
+            kept_items = self._cluster_exact(items, embeddings, get_levenshtein_ratio)
+                    
+        print(f"[Deep IRLEngine] Reduced {len(items)} -> {len(kept_items)} items via Hybrid Clustering{' (LSH title candidates, approximate)' if scalable else ''}.")
+        return kept_items
+
+    def _cluster_exact(self, items: List[NewsItem], embeddings, get_levenshtein_ratio) -> List[NewsItem]:
+        """
+        Exact O(N^2) greedy clustering (full cosine matrix + all title pairs).
+        """
+        from sentence_transformers import util
+        import torch
+        
+        # Hybrid Clustering (Title + Semantic)
+        kept_items = []
+        merged_indices = set()
+        
+        embeddings = torch.as_tensor(embeddings)
+        cos_scores = util.cos_sim(embeddings, embeddings)
+
         for i in range(len(items)):
             if i in merged_indices:
                 continue
@@ -122,96 +283,96 @@ class GatekeeperEngine:
                 if score >= 0.70: 
                     rep_item.related_items.append(items[j])
                     merged_indices.add(j)
-                    
-        print(f"[Deep IRLEngine] Reduced {len(items)} -> {len(kept_items)} items via Hybrid Clustering.")
-        return kept_items
         
-    def _calculate_tfidf_score(self, item: NewsItem) -> float:
+        return kept_items
+
+    def _cluster_candidates(self, items: List[NewsItem], embeddings, get_levenshtein_ratio) -> List[NewsItem]:
         """
-        [Deep IRL Engine v2] TF-IDF Weighted Overlap
+        Sub-quadratic greedy clustering.
+        Candidates come from a blocked top-k cosine search (semantic) and MinHash LSH on titles;
+        exact checks run only on candidate pairs. Same representative / `related_items` semantics as `_cluster_exact`.
+        The semantic merge is exact (dense rows grow past top-k, see semantic_neighbors). So is the
+        title merge up to EXACT_TITLE_LIMIT items; above it, LSH finds a near-duplicate title pair with
+        high but not certain probability, so a reposted title that is also semantically distant (< 0.70)
+        can stay unmerged.
         """
-        import json
-        import math
-        import os
-        import re
-
-        MODEL_FILE = "data/irl_tfidf_model.json"
+        from src.gatekeeper.clustering import semantic_neighbors, title_candidates
         
-        if not hasattr(self, '_tfidf_model'):
-            if os.path.exists(MODEL_FILE):
-                with open(MODEL_FILE, 'r') as f:
-                    self._tfidf_model = json.load(f)
-            else:
-                self._tfidf_model = None
-
-        if not self._tfidf_model:
-            return 0.5 
-            
-        text = (item.title + " " + item.content).lower()
-        tokens = [w for w in re.sub(r'[^\w\s]', '', text).split() if len(w) > 1 and not w.isdigit()]
+        semantic = semantic_neighbors(embeddings, threshold=0.70, top_k=self.CLUSTER_TOP_K)
+        titles = title_candidates([item.title for item in items])
         
-        if not tokens: return 0.0
-
-        idf_scores = self._tfidf_model['idf_scores']
-        default_idf = self._tfidf_model['default_idf']
+        kept_items = []
+        merged_indices = set()
         
-        score_sum = 0.0
-        for token in tokens:
-            idf = idf_scores.get(token, default_idf)
-            score_sum += idf
+        for i in range(len(items)):
+            if i in merged_indices:
+                continue
+                
+            rep_item = items[i]
+            kept_items.append(rep_item)
+            merged_indices.add(i)
             
-        norm_score = score_sum / (len(tokens) ** 0.5) if tokens else 0
-        return min(1.0, norm_score / 30.0)
+            # Walk candidates in score order, as the exact loop does
+            for j in sorted(titles[i].union(semantic[i])):
+                if j <= i or j in merged_indices:
+                    continue
+                
+                # Check 1: Title Similarity (Force Merge)
+                if j in titles[i] and get_levenshtein_ratio(rep_item.title, items[j].title) > 0.85:
+                    rep_item.related_items.append(items[j])
+                    merged_indices.add(j)
+                    continue
+
+                # Check 2: Semantic Similarity (Topic Merge)
+                if j in semantic[i]:
+                    rep_item.related_items.append(items[j])
+                    merged_indices.add(j)
+        
+        return kept_items
+        
+    def _load_tfidf_model(self):
+        """
+        Loads the precompiled TF-IDF scorer once (binary export, else legacy JSON).
+        """
+        if not hasattr(self, '_tfidf_model'):
+            from src.gatekeeper.tfidf import TfidfScorer
+            self._tfidf_model = TfidfScorer.load()
+        return self._tfidf_model
+
+    def _calculate_tfidf_scores(self, texts: List[str]) -> List[float]:
+        """
+        [Deep IRL Engine v2] TF-IDF Weighted Overlap (Batched)
+        """
+        if not self._load_tfidf_model():
+            return [0.5] * len(texts)
+        return self._tfidf_model.score_batch(texts)
 
     def _calculate_reputation_score(self, item: NewsItem) -> float:
         """
         [Heuristic Reputation Module]
-        Uses domain/title matching against configured Trust/Block lists.
+        Uses domain/title matching against configured Trust/Block lists
+        (Aho-Corasick index built once per config, cached per source).
         """
-        from urllib.parse import urlparse
+        from src.gatekeeper.reputation import BLOCK_SCORE, ERROR_SCORE
         
-        # Load from Config (or fallback to empty if missing)
-        BLOCK_LIST = set(getattr(self.config, 'block_list', []))
-        TRUST_LIST = set(getattr(self.config, 'trust_list', []))
-
         try:
-            domain = urlparse(item.url).netloc.replace('www.', '')
-            
-            # Google News RSS URLs are useless ("news.google.com"). 
-            # Extract source from Title suffix: "Title - SourceName"
-            source_name = domain
-            if 'google' in domain and ' - ' in item.title:
-                source_name = item.title.rsplit(' - ', 1)[-1].strip().lower()
-            
-            # Normalize source name for matching
-            source_Check = source_name.lower().replace(' ', '')
-            
-            # Check Blocklist first
-            if any(spam in source_Check for spam in BLOCK_LIST):
-                print(f"[Reputation] Blocked: {source_name}")
-                return 0.1 # Nuked
-            
-            # Check Trustlist
-            if any(trust in source_Check for trust in TRUST_LIST):
-                return 1.2 # Boosted
-                
-            # Neutral / Unknown
-            return 0.9 # Slight penalty for unknown
+            score, rule, source_name = self.reputation.lookup(item.url, item.title)
+            if score == BLOCK_SCORE:
+                print(f"[Reputation] Blocked: {source_name} ({rule})")
+            return score
             
         except Exception as e:
             print(f"[Reputation] Error: {e}")
-            return 0.7
+            return ERROR_SCORE
             
-    def _calculate_semantic_score(self, item: NewsItem) -> float:
+    def _load_semantic_model(self):
         """
-        [Deep IRL Engine v3] Semantic One-Class SVM
-        Measures distance from the "Autowein Choice Boundary".
+        Lazily loads the One-Class SVM (and a fallback SBERT if none is shared).
         """
         import os
         import joblib
-        import numpy as np
         
-        MODEL_FILE = "data/semantic_model.pkl"
+        MODEL_FILE = self.SEMANTIC_MODEL_FILE
         
         if not hasattr(self, '_semantic_model'):
             self._semantic_model = None
@@ -231,27 +392,23 @@ class GatekeeperEngine:
                         
                 except Exception as e:
                     print(f"[Engine] Failed to load Semantic Model: {e}")
-        
-        if not self._semantic_model or not self._embedder:
-            return 0.5 # Neutral fallback if training not done/failed
-            
-        # Embed
-        text = item.title + " " + item.content
-        if len(text) < 5: return 0.0
-        
-        vector = self._embedder.encode([text])[0]
-        
-        # Determine Score
-        dist = self._semantic_model.decision_function([vector])[0]
-        
-        # Safe Sigmoid (prevent overflow)
-        # Dist range check: typical SVM dist is -2 to +2.
-        # If very large/small, clamp.
-        dist = max(-10, min(10, dist))
-        
-        # Sigmoid: 1 / (1 + exp(-dist))
-        # Removed *5 scaling to match natural distribution better
-        score = 1 / (1 + np.exp(-dist))
-        
-        return score
+        return self._semantic_model
+
+    def _calculate_semantic_scores(self, texts: List[str], embeddings) -> List[float]:
+        """
+        [Deep IRL Engine v3] Semantic One-Class SVM (Batched)
+        One `decision_function` call over the shared embedding matrix.
+        """
+        import numpy as np
+
+        self._load_semantic_model()
+        if not texts:
+            return []
+        if not self._semantic_model or embeddings is None:
+            return [0.5] * len(texts) # Neutral fallback if training not done/failed
+
+        # Sigmoid of the SVM distance, clamped to avoid overflow
+        dists = np.clip(self._semantic_model.decision_function(embeddings), -10, 10)
+        scores = 1 / (1 + np.exp(-dists))
 
+        return [0.0 if len(text) < 5 else float(score) for text, score in zip(texts, scores)]
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterable, List
+
+DEFAULT_STATE_FILE = "data/feed_state.json"
+
+class FeedStateStore:
+    """
+    Persistent per-feed polling state for conditional GETs.
+    {source_url: {"etag", "last_modified", "content_hash", "seen": [recent item keys]}}
+    Thread-safe; saved as a small JSON file (write-then-rename).
+
+    Two-phase: validators and seen keys from a poll are only staged, and become part of the
+    state on commit() (call it once downstream processing of the polled items succeeded).
+    A crash before that re-fetches and re-yields the same items on the next poll.
+    """
+    MAX_SEEN = 5000 # Recent item keys remembered per feed
+
+    def __init__(self, path: str = DEFAULT_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state: Dict[str, dict] = {}
+        self._seen_sets: Dict[str, set] = {}
+        self._pending: Dict[str, dict] = {} # url -> staged {"etag", "last_modified", "content_hash", "seen"}
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._state = json.load(f)
+            except Exception as e:
+                print(f"[FeedState] Could not read {path} ({e}). Starting fresh.")
+
+    @staticmethod
+    def hash_body(body: bytes) -> str:
+        return hashlib.sha1(body).hexdigest()
+
+    def get(self, url: str) -> dict:
+        with self._lock:
+            return dict(self._state.get(url, {}))
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        state = self.get(url)
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+        return headers
+
+    def is_unchanged(self, url: str, content_hash: str) -> bool:
+        return self.get(url).get('content_hash') == content_hash
+
+    def update_validators(self, url: str, etag: str = None, last_modified: str = None, body: bytes = None,
+                          content_hash: str = None):
+        """
+        Stages the response validators (applied by commit()).
+        """
+        with self._lock:
+            state = self._pending.setdefault(url, {})
+            if etag:
+                state['etag'] = etag
+            if last_modified:
+                state['last_modified'] = last_modified
+            if body is not None:
+                content_hash = self.hash_body(body)
+            if content_hash:
+                state['content_hash'] = content_hash
+
+    def filter_unseen(self, url: str, keys: Iterable[str]) -> List[bool]:
+        """
+        Returns a parallel list of flags (True = not seen in a committed poll); new keys are staged.
+        """
+        with self._lock:
+            seen = self._seen(url)
+            staged = self._pending.setdefault(url, {}).setdefault('seen', [])
+            flags = []
+            for key in keys:
+                is_new = key not in seen
+                if is_new:
+                    staged.append(key)
+                flags.append(is_new)
+            return flags
+
+    def _seen(self, url: str) -> set:
+        seen = self._seen_sets.get(url)
+        if seen is None:
+            seen = self._seen_sets[url] = set(self._state.get(url, {}).get('seen', ()))
+        return seen
+
+    def commit(self):
+        """
+        Applies the staged validators and seen keys, then saves.
+        """
+        with self._lock:
+            for url, staged in self._pending.items():
+                state = self._state.setdefault(url, {})
+                seen_list = state.setdefault('seen', [])
+                seen = self._seen(url)
+                for key in staged.pop('seen', ()):
+                    if key not in seen:
+                        seen.add(key)
+                        seen_list.append(key)
+                if len(seen_list) > self.MAX_SEEN:
+                    del seen_list[:len(seen_list) - self.MAX_SEEN]
+                    self._seen_sets[url] = set(seen_list)
+                state.update(staged)
+            self._pending.clear()
+        self.save()
+
+    def discard(self):
+        # Drops the staged poll (downstream failed): the next poll re-yields the same items
+        with self._lock:
+            self._pending.clear()
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
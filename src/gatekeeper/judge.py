@@ -1,28 +1,93 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
 import json
 import os
+import re
+import time
 from src.core.models import NewsItem
-from src.analyst.llm import OpenAIClient, GeminiClient, MockLLM
+from src.core.ledger import ProcessedLedger, DEFAULT_LEDGER_FILE
+from src.analyst.llm import LLMInterface, OpenAIClient, GeminiClient, MockLLM
+from src.analyst.llm_cache import CachedLLM, DEFAULT_CACHE_PATH
+from src.analyst.tokens import estimate_tokens
+from src.analyst.json_stream import JsonArrayStreamParser
+from src.analyst.rate_limit import RateLimiter, RateLimitedLLM
+
+JUDGE_SYSTEM_PROMPT = """You are a Strategic Intelligence Analyst. Evaluate the "Strategic Importance" of these news items.
+
+Criteria (0-10):
+- 10: Critical breakthrough, massive policy shift, supply chain shock.
+- 7-9: Major corporate move, key product launch.
+- 4-6: Routine earnings, minor updates.
+- 0-3: PR fluff, spam, irrelevant.
+
+Output JSON List of objects:
+[
+  {"id": "...", "score": 8.5, "reason": "..."}
+]
+Ensure the ID matches exactly. Keep each reason under 20 words."""
+
+# Bump when the batch prompt format or score mapping changes (invalidates memoized judgements)
+JUDGE_PROMPT_VERSION = 1
+
+def is_complete_judgement(user_prompt: str, response: str) -> bool:
+    """
+    Cache gate: only a well-formed answer with a numeric score for every prompted ID is stored,
+    so truncated or partial replies are never replayed by later runs.
+    """
+    parser = JsonArrayStreamParser()
+    results = parser.feed(response)
+    if parser.malformed or not parser.complete:
+        return False
+    scored = set()
+    for res in results:
+        try:
+            float(res.get('score'))
+        except (TypeError, ValueError):
+            return False
+        scored.add(str(res.get('id')))
+    return set(re.findall(r"^ID: (.+)$", user_prompt, re.MULTILINE)) <= scored
 
 class Judge:
     """
     [Stage 1.8] The Judge
     Re-ranks top items using LLM-based Strategic Importance assessment.
     """
-    def __init__(self, api_key: str = None, use_gemini: bool = False, model: str = None):
+    # Expected answer size per item: {"id": "N_...", "score": 8.5, "reason": "<=20 words"}
+    OUTPUT_TOKENS_PER_ITEM = 60
+    MAX_BATCH_ITEMS = 50
+    EMPTY_RETRY_BACKOFF = 2.0 # seconds, doubled per retry of an unparseable reply
+
+    def __init__(self, api_key: str = None, use_gemini: bool = False, model: str = None,
+                 rpm: float = 15, tpm: float = 1_000_000, max_concurrency: int = 4,
+                 rate_limiter: Optional[RateLimiter] = None, llm: Optional[LLMInterface] = None,
+                 cache_path: Optional[str] = DEFAULT_CACHE_PATH, memo_path: Optional[str] = DEFAULT_LEDGER_FILE,
+                 input_token_budget: int = 8000, output_token_budget: int = 2048):
         # Model defaults:
         # OpenAI -> gpt-4o-mini
         # Gemini -> gemini-3-flash-preview
         
-        if use_gemini and api_key:
+        # Per-request packing budget (output budget keeps the JSON list from being cut off)
+        self.input_token_budget = input_token_budget
+        self.output_token_budget = output_token_budget
+        
+        # Quota: free-tier Gemini is ~15 RPM. Raise rpm/max_concurrency on paid tiers.
+        self.limiter = rate_limiter or RateLimiter(rpm=rpm, tpm=tpm, max_concurrency=max_concurrency)
+        
+        if llm is not None:
+            # Injected client (e.g. FakeLLM for offline benchmarks)
+            self.llm = llm
+            self.enabled = True
+            print(f"[Judge] Enabled with injected LLM ({getattr(llm, 'model', type(llm).__name__)})")
+        elif use_gemini and api_key:
             # model = model or "gemini-3-flash-preview"
             model = model or "gemini-2.0-flash-lite"
-            self.llm = GeminiClient(api_key=api_key, model=model)
+            self.llm = GeminiClient(api_key=api_key, model=model, max_output_tokens=output_token_budget)
             self.enabled = True
             print(f"[Judge] Enabled with Google Gemini ({model})")
         elif api_key or os.getenv("OPENAI_API_KEY"):
             model = model or "gpt-4o-mini"
-            self.llm = OpenAIClient(api_key=api_key, model=model)
+            self.llm = OpenAIClient(api_key=api_key, model=model, max_output_tokens=output_token_budget)
             self.enabled = True
             print(f"[Judge] Enabled with OpenAI ({model})")
         else:
@@ -30,59 +95,112 @@ class Judge:
             self.llm = MockLLM()
             self.enabled = False
 
+        # Quota sits *under* the cache: cache hits cost no RPM/TPM
+        if self.enabled:
+            self.llm = RateLimitedLLM(self.llm, self.limiter, output_tokens=self.output_token_budget)
+
+        # Persistent response cache: reruns of the same batch cost no API call
+        if cache_path and llm is None and self.enabled:
+            self.llm = CachedLLM(self.llm, path=cache_path, validate=is_complete_judgement)
+
+        # Per-item judgement memo (stable item fingerprint x prompt/model version):
+        # items judged on an earlier day are never re-sent, even in a differently packed batch
+        self.memo = ProcessedLedger(memo_path) if (memo_path and self.enabled) else None
+        self.memo_stage = f"judge:{self.version}"
+        if self.memo is not None:
+            self.memo.retire_stages(self.memo_stage)
+
+    @property
+    def version(self) -> str:
+        basis = f"{JUDGE_PROMPT_VERSION}\0{getattr(self.llm, 'model', '')}\0{JUDGE_SYSTEM_PROMPT}"
+        return hashlib.sha1(basis.encode('utf-8')).hexdigest()[:12]
+
+    @staticmethod
+    def fingerprint(item: NewsItem) -> str:
+        # Stable ID plus exactly what the prompt shows, so edited items are re-judged
+        basis = f"{item.id}\0{item.title}\0{item.source}\0{item.content[:300]}"
+        return hashlib.sha1(basis.encode('utf-8')).hexdigest()
+
+    def _apply_memo(self, items: List[NewsItem]) -> List[NewsItem]:
+        """
+        Applies memoized judgements in place; returns the items that still need the LLM.
+        """
+        if self.memo is None:
+            return items
+        unseen = []
+        for item in items:
+            stored = self.memo.get(self.memo_stage, self.fingerprint(item))
+            if stored:
+                item.scores_breakdown['llm_score'] = stored['llm_score']
+                item.scores_breakdown['llm_reason'] = stored['llm_reason']
+                item.relevance_score = stored['llm_score']
+            else:
+                unseen.append(item)
+        print(f"[Judge] Memo: {len(items) - len(unseen)} items already judged, {len(unseen)} to send.")
+        return unseen
+
     def evaluate_batch(self, items: List[NewsItem]) -> List[NewsItem]:
         """
         Evaluate items in batches to optimize API usage and respect rate limits.
         """
-        import time
-        
         if not items:
             return []
             
-        print(f"[Judge] Assessing {len(items)} items with {self.llm.model}...")
-        
-        # Determine Batch Size
-        # Gemini Flash has huge context, can handle 10-20 easily.
-        BATCH_SIZE = 10 
-        # Rate Limit: Free tier is ~15 RPM => 1 request every 4 seconds.
-        # We add 4s sleep to be safe.
-        DELAY_SECONDS = 4
-        
         ranked_items = []
-        chunks = [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
-        
-        total_chunks = len(chunks)
-        print(f"[Judge] Processing {total_chunks} batches (Batch Size: {BATCH_SIZE})...")
-        
-        for i, chunk in enumerate(chunks):
-            try:
-                print(f"[Judge] Batch {i+1}/{total_chunks} processing...")
-                scored_chunk = self._evaluate_chunk_optimized(chunk)
-                ranked_items.extend(scored_chunk)
-                
-                # Rate Limit Sleep
-                if i < total_chunks - 1: # Don't sleep after last batch
-                    time.sleep(DELAY_SECONDS)
-                    
-            except Exception as e:
-                print(f"[Judge] Critical Batch Error: {e}")
-                ranked_items.extend(chunk) # Return original items on crash
+        for scored_chunk in self.iter_evaluate(items):
+            ranked_items.extend(scored_chunk)
 
         # Update scores and sort
         ranked_items.sort(key=lambda x: x.scores_breakdown.get('llm_score', 0), reverse=True)
+        print(f"[Judge] Scheduler stats: {self.limiter.stats}")
+        if isinstance(self.llm, CachedLLM):
+            print(f"[Judge] Response cache: {self.llm.stats}")
         return ranked_items
 
-    def _evaluate_chunk_optimized(self, chunk: List[NewsItem]) -> List[NewsItem]:
+    def iter_evaluate(self, items: List[NewsItem]) -> Iterator[List[NewsItem]]:
+        """
+        Dispatches chunks concurrently (up to the limiter's concurrency / RPM / TPM quota)
+        and yields each scored chunk as soon as it finishes.
+        """
+        print(f"[Judge] Assessing {len(items)} items with {self.llm.model}...")
+        
+        if self.enabled:
+            unseen = self._apply_memo(items)
+            if len(unseen) < len(items):
+                unseen_ids = {id(item) for item in unseen}
+                yield [item for item in items if id(item) not in unseen_ids]
+            items = unseen
+            if not items:
+                return
+        
+        # Determine Batch Size (token-budget packing)
+        # Only unseen items are packed, so freed capacity is filled with new ones.
+        chunks = self._pack_batches(items)
+        total_chunks = len(chunks)
+        print(f"[Judge] Processing {total_chunks} batches (~{len(items) / max(total_chunks, 1):.1f} items/batch, "
+              f"budget in/out: {self.input_token_budget}/{self.output_token_budget} tokens, Concurrency: {self.limiter.max_concurrency})...")
+        
         if not self.enabled:
-             for item in chunk:
-                 item.scores_breakdown['llm_score'] = item.relevance_score
-                 item.scores_breakdown['llm_reason'] = "Mock Judge"
-             return chunk
+            for chunk in chunks:
+                yield self._evaluate_chunk_optimized(chunk)
+            return
 
-        # Prepare Batch Prompt
-        items_text = ""
-        for idx, item in enumerate(chunk):
-            items_text += f"""
+        with ThreadPoolExecutor(max_workers=self.limiter.max_concurrency) as executor:
+            futures = {executor.submit(self._evaluate_chunk_safe, chunk): i for i, chunk in enumerate(chunks)}
+            for done, future in enumerate(as_completed(futures), 1):
+                print(f"[Judge] Batch {futures[future]+1} done ({done}/{total_chunks}).")
+                yield future.result()
+
+    def _evaluate_chunk_safe(self, chunk: List[NewsItem]) -> List[NewsItem]:
+        try:
+            return self._evaluate_chunk_optimized(chunk)
+        except Exception as e:
+            print(f"[Judge] Critical Batch Error: {e}")
+            return chunk # Return original items on crash
+
+    @staticmethod
+    def _format_item(idx: int, item: NewsItem) -> str:
+        return f"""
 [Item {idx+1}]
 ID: {item.id}
 Title: {item.title}
@@ -90,88 +208,116 @@ Source: {item.source}
 Snippet: {item.content[:300]}
 """
 
-        system_prompt = """You are a Strategic Intelligence Analyst. Evaluate the "Strategic Importance" of these news items.
+    def _pack_batches(self, items: List[NewsItem]) -> List[List[NewsItem]]:
+        """
+        Greedy token-budget packing (replaces the fixed BATCH_SIZE = 10).
+        A batch closes when the next item would exceed the input budget, or when the expected
+        JSON answer (OUTPUT_TOKENS_PER_ITEM each) would no longer fit the output budget.
+        """
+        base_tokens = estimate_tokens(JUDGE_SYSTEM_PROMPT) + 20
+        max_items = max(1, min(self.MAX_BATCH_ITEMS, self.output_token_budget // self.OUTPUT_TOKENS_PER_ITEM))
 
-Criteria (0-10):
-- 10: Critical breakthrough, massive policy shift, supply chain shock.
-- 7-9: Major corporate move, key product launch.
-- 4-6: Routine earnings, minor updates.
-- 0-3: PR fluff, spam, irrelevant.
+        batches, current, used = [], [], base_tokens
+        for item in items:
+            cost = estimate_tokens(self._format_item(len(current), item))
+            if current and (used + cost > self.input_token_budget or len(current) >= max_items):
+                batches.append(current)
+                current, used = [], base_tokens
+            current.append(item)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
 
-Output JSON List of objects:
-[
-  {"id": "...", "score": 8.5, "reason": "..."}
-]
-Ensure the ID matches exactly."""
+    def _evaluate_chunk_optimized(self, chunk: List[NewsItem], retry: bool = True) -> List[NewsItem]:
+        if not self.enabled:
+             for item in chunk:
+                 item.scores_breakdown['llm_score'] = item.relevance_score
+                 item.scores_breakdown['llm_reason'] = "Mock Judge"
+             return chunk
+
+        # Prepare Batch Prompt
+        items_text = "".join(self._format_item(idx, item) for idx, item in enumerate(chunk))
+
+        system_prompt = JUDGE_SYSTEM_PROMPT
 
         user_prompt = f"Evaluate these {len(chunk)} items:\n{items_text}"
 
-        # Retry logic for 503 Overloaded errors
-        max_retries = 3
-        backoff = 2
-        response = None
-        
-        for attempt in range(max_retries):
+        # Streamed + parsed incrementally: each {"id","score","reason"} is applied as it arrives
+        by_id = {item.id: item for item in chunk}
+        judged = []
+        for res in self._stream_results(user_prompt, system_prompt):
+            item = by_id.pop(str(res.get('id')), None)
+            if item is None:
+                continue
             try:
-                response = self.llm.complete(user_prompt, system_prompt)
-                if response:
-                    break
-            except Exception as e:
-                err_str = str(e)
-                if "503" in err_str or "Overloaded" in err_str or "429" in err_str or "RESOURCE_EXHAUSTED" in err_str:
-                    if attempt < max_retries - 1:
-                        # 429 often asks for ~10s wait. Let's be generous.
-                        # Backoff: 10s, 20s, 40s
-                        initial_wait = 12
-                        sleep_time = initial_wait * (2 ** attempt)
-                        
-                        print(f"[Judge] API Rate Limit/Overload ({'429' if '429' in err_str else '503'}). Retrying in {sleep_time}s...")
-                        import time
-                        time.sleep(sleep_time)
-                        continue
-                print(f"[Judge] Warning: LLM Error on attempt {attempt+1}: {e}")
-
-        if response is None:
-            print(f"[Judge] Error: LLM returned None after retries for batch {chunk[0].id}...")
-            response = "[]" # Treat as empty response
-            
-        try:
-            clean_resp = response.replace('```json', '').replace('```', '').strip()
-                
-            # Robust parsing (sometimes model returns just array, sometimes wrapped)
-            if '{' in clean_resp and '[' not in clean_resp[:10]: 
-                 # Try to find list
-                 import re
-                 match = re.search(r'\[.*\]', clean_resp, re.DOTALL)
-                 if match: clean_resp = match.group(0)
-            
-            results = json.loads(clean_resp)
-            
-            # Map results back to items
-            result_map = {res['id']: res for res in results if 'id' in res}
-            
-            for item in chunk:
-                if item.id in result_map:
-                    res = result_map[item.id]
-                    score_10 = float(res.get('score', 0))
-                    item.scores_breakdown['llm_score'] = min(score_10 / 10.0, 1.0)
-                    item.scores_breakdown['llm_reason'] = res.get('reason', 'Batch Evaluated')
-                    item.relevance_score = item.scores_breakdown['llm_score']
-                else:
-                    # Fallback if model missed an item
-                    item.scores_breakdown['llm_score'] = item.relevance_score
-                    item.scores_breakdown['llm_reason'] = "Batch Missed"
-                    
-        except Exception as e:
-            print(f"[Judge] Error in batch: {e}")
-            # Fallback
-            for item in chunk:
-                 item.scores_breakdown['llm_score'] = item.relevance_score
-                 item.scores_breakdown['llm_reason'] = f"Batch Error: {e}"
+                score_10 = float(res.get('score', 0))
+            except (TypeError, ValueError):
+                by_id[item.id] = item # Malformed score -> retried below
+                continue
+            item.scores_breakdown['llm_score'] = min(score_10 / 10.0, 1.0)
+            item.scores_breakdown['llm_reason'] = res.get('reason', 'Batch Evaluated')
+            item.relevance_score = item.scores_breakdown['llm_score']
+            judged.append((self.fingerprint(item), {
+                "llm_score": item.scores_breakdown['llm_score'],
+                "llm_reason": item.scores_breakdown['llm_reason']
+            }))
+
+        # Only real judgements are memoized (missed/errored items are retried next run)
+        if self.memo is not None and judged:
+            self.memo.record_many(self.memo_stage, judged)
+
+        missing = [item for item in chunk if item.id in by_id]
+        if missing and retry and len(missing) < len(chunk):
+            # Re-send only the missed/malformed items instead of the whole batch
+            print(f"[Judge] {len(missing)}/{len(chunk)} items missing from batch {chunk[0].id}, retrying them...")
+            self._evaluate_chunk_optimized(missing, retry=False)
+        elif missing:
+            if len(missing) == len(chunk):
+                print(f"[Judge] Error: no usable results for batch {chunk[0].id}...")
+            for item in missing:
+                # Fallback if model missed an item
+                item.scores_breakdown['llm_score'] = item.relevance_score
+                item.scores_breakdown['llm_reason'] = "Batch Missed"
 
         return chunk
 
+    def _stream_results(self, user_prompt: str, system_prompt: str, max_retries: int = 3) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming completion, yielding each result object as soon as it is complete.
+        Quota and 429/503 cool-downs are handled by RateLimitedLLM under the cache. Any error before
+        the first result, or a reply that parses to nothing (evicted from the cache), is retried
+        after a backoff; a stream that breaks midway keeps its parsed objects and the caller
+        re-sends the rest.
+        """
+        for attempt in range(max_retries):
+            parser = JsonArrayStreamParser()
+            received = 0
+            try:
+                for delta in self.llm.stream(user_prompt, system_prompt):
+                    for res in parser.feed(delta):
+                        received += 1
+                        yield res
+            except Exception as e:
+                if received:
+                    print(f"[Judge] Warning: stream interrupted after {received} results: {e}")
+                    return
+                reason = f"LLM Error: {e}"
+            else:
+                if parser.malformed:
+                    print(f"[Judge] Warning: skipped {parser.malformed} malformed result objects.")
+                if received:
+                    return
+                reason = "no parseable results"
+                if isinstance(self.llm, CachedLLM):
+                    self.llm.invalidate(user_prompt, system_prompt)
 
+            if attempt < max_retries - 1:
+                delay = self.EMPTY_RETRY_BACKOFF * (2 ** attempt)
+                print(f"[Judge] Warning: {reason} (attempt {attempt+1}). Retrying in {delay:.0f}s...")
+                time.sleep(delay)
+            else:
+                print(f"[Judge] Warning: {reason} (attempt {attempt+1}). Giving up on this batch.")
 
     def _evaluate_single(self, item: NewsItem) -> NewsItem:
         # Legacy single method (kept if needed, but unused by new batch logic)
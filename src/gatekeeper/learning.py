@@ -3,14 +3,14 @@ import math
 import re
 from collections import Counter
 from typing import Dict
+from src.gatekeeper.tfidf import TfidfScorer, BINARY_MODEL_PREFIX, tokenize
 
 CORPUS_FILE = "data/autowein_full_corpus.jsonl"
 MODEL_FILE = "data/irl_tfidf_model.json"
 
 def clean_text(text: str) -> list[str]:
-    # Simple tokenizer retaining some semantic meaning
-    text = re.sub(r'[^\w\s]', '', text.lower())
-    return [w for w in text.split() if len(w) > 1 and not w.isdigit()]
+    # Simple tokenizer retaining some semantic meaning (shared with the compiled scorer)
+    return tokenize(text)
 
 def train_tfidf_model():
     print(f"[Deep IRL] Training TF-IDF Model on {CORPUS_FILE}...")
@@ -63,6 +63,10 @@ def train_tfidf_model():
         json.dump(model_data, f, ensure_ascii=False)
         
     print(f"[Deep IRL] Saved 'TF-IDF Weight Model' to {MODEL_FILE}")
+    
+    # Binary export (vocab + mmap-able float32 IDF array) loaded by the Gatekeeper at startup
+    TfidfScorer.export(idf_scores, model_data['default_idf'], total_docs, prefix=BINARY_MODEL_PREFIX)
+    print(f"[Deep IRL] Exported compiled TF-IDF model to {BINARY_MODEL_PREFIX}.vocab / .idf.npy")
 
 if __name__ == "__main__":
     train_tfidf_model()
@@ -4,6 +4,7 @@ import numpy as np
 import os
 from sklearn.svm import OneClassSVM
 from sentence_transformers import SentenceTransformer
+from src.gatekeeper.embedding_cache import EmbeddingCache
 
 CORPUS_FILE = "data/autowein_full_corpus.jsonl"
 MODEL_FILE = "data/semantic_model.pkl"
@@ -66,7 +67,9 @@ def train_semantic_model():
     embedder = SentenceTransformer(EMBEDDER_NAME, device='cpu')
     
     print("[Deep IRL] Embedding corpus (this may take a moment)...")
-    embeddings = embedder.encode(texts, batch_size=64, show_progress_bar=True)
+    cache = EmbeddingCache(model_name=EMBEDDER_NAME)
+    embeddings = cache.encode(texts, lambda batch: embedder.encode(batch, batch_size=64, show_progress_bar=True))
+    print(f"[Deep IRL] Embedding cache: {cache.stats}")
     
     # 3. Train One-Class SVM
     # Refinement: nu=0.1 (Reverting to 10% outlier assumption for broader acceptance)
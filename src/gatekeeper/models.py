@@ -23,21 +23,29 @@ class IRLRewardModel:
     - Head: Linear Classification Layer (trained on 10 years of historical data)
     """
     
-    def __init__(self, model_name: str = 'sentence-transformers/paraphrase-multilingual-mpnet-base-v2', weights_path: Optional[str] = "data/irl_weights.pth"):
+    def __init__(self, model_name: str = 'sentence-transformers/paraphrase-multilingual-mpnet-base-v2', weights_path: Optional[str] = "data/irl_weights.pth", use_cache: bool = True):
         # Force CPU if using older GPU (GTX 10xx) with new PyTorch
         # The user has GTX 1050 (CC 6.1) but PyTorch wants 7.0+
         self.device = 'cpu' 
         # self.device = 'cuda' if (HAS_ML and torch.cuda.is_available()) else 'cpu'
         
         self.model_name = model_name
+        self.weights_path = weights_path
         self.encoder = None
         self.classifier = None
+        self.cache = None
+        self.trained = False # False while the head runs on initialized weights
         
         if HAS_ML:
             print(f"[Gatekeeper] Loading IRL Reward Model: {model_name} on {self.device}...")
             try:
                 self.encoder = SentenceTransformer(model_name, device=self.device)
                 
+                # Persistent embedding store: skip SBERT for texts seen in previous runs
+                if use_cache:
+                    from src.gatekeeper.embedding_cache import EmbeddingCache
+                    self.cache = EmbeddingCache(model_name=model_name)
+                
                 # Simple Linear Head for binary/regression score
                 # This 'Linear Head' is what needs to be trained on top of SBERT.
                 self.classifier = nn.Sequential(
@@ -49,6 +57,7 @@ class IRLRewardModel:
                 
                 if weights_path and os.path.exists(weights_path):
                     self.classifier.load_state_dict(torch.load(weights_path, map_location=self.device))
+                    self.trained = True
                     print(f"[Gatekeeper] Loaded trained Classification Head from {weights_path}")
                 else:
                     print(f"[Gatekeeper] No trained Classification Head found at {weights_path}. Using initialized weights (Simulation Mode).")
@@ -58,36 +67,37 @@ class IRLRewardModel:
                 print(f"[Gatekeeper] Error initializing SBERT: {e}")
                 self.encoder = None
 
-    def predict_score(self, text: str) -> float:
+    def encode(self, texts: List[str], batch_size: int = 64):
         """
-        Returns a score between 0.0 and 1.0 indicating user preference.
+        Bulk-encodes texts into a single (N, 768) float32 numpy matrix.
+        This matrix is meant to be shared by every downstream scorer (IRL head, SVM, clustering).
+        Cached vectors are reused; only unseen texts go through SBERT.
+        Returns None if the encoder is unavailable.
         """
-        if not HAS_ML or self.encoder is None:
-            # Fallback heuristic if ML is missing
-            return 0.5
+        if not HAS_ML or self.encoder is None or not texts:
+            return None
 
-        try:
-            with torch.no_grad():
-                embedding = self.encoder.encode(text, convert_to_tensor=True)
-                score = self.classifier(embedding).item()
-                return float(score)
-        except Exception as e:
-            # logging.error(f"Prediction failed: {e}")
-            return 0.5
+        def _encode(batch):
+            return self.encoder.encode(batch, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+
+        if self.cache is None:
+            return _encode(texts).astype(np.float32)
+
+        embeddings = self.cache.encode(texts, _encode)
+        print(f"[Gatekeeper] Embedding cache: {self.cache.stats}")
+        return embeddings
+
+    def score_embeddings(self, embeddings) -> List[float]:
+        """
+        Runs the classification head on precomputed embeddings (no SBERT pass).
+        """
+        if embeddings is None or not HAS_ML or self.classifier is None:
+            return [0.5] * (0 if embeddings is None else len(embeddings))
 
-    def batch_predict(self, texts: List[str]) -> List[float]:
-        if not HAS_ML or self.encoder is None:
-            return [0.5] * len(texts)
-            
         try:
             with torch.no_grad():
-                embeddings = self.encoder.encode(texts, convert_to_tensor=True)
-                scores = self.classifier(embeddings).squeeze().cpu().tolist()
-                
-                # Handle single item case (float) vs list
-                if isinstance(scores, float):
-                    return [scores]
-                return scores
+                tensor = torch.from_numpy(np.asarray(embeddings, dtype=np.float32)).to(self.device)
+                return self.classifier(tensor).view(-1).cpu().tolist()
         except Exception as e:
-            print(f"[Gatekeeper] Batch prediction error: {e}")
-            return [0.5] * len(texts)
+            print(f"[Gatekeeper] Head scoring error: {e}")
+            return [0.5] * len(embeddings)
@@ -0,0 +1,125 @@
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+BLOCK = "block"
+TRUST = "trust"
+
+# Multiplicative reputation scores (see GatekeeperEngine.select_news)
+BLOCK_SCORE = 0.1 # Nuked
+TRUST_SCORE = 1.2 # Boosted
+UNKNOWN_SCORE = 0.9 # Slight penalty for unknown
+ERROR_SCORE = 0.7
+
+def normalize_source(name: str) -> str:
+    return name.lower().replace(' ', '')
+
+class ReputationIndex:
+    """
+    [Heuristic Reputation Module]
+    Aho-Corasick automaton over the normalized Trust/Block list entries.
+    One O(len(source)) scan finds every list entry contained in the source name;
+    block rules take precedence over trust rules (same as the original linear scans).
+    Results are cached per normalized source.
+    """
+
+    def __init__(self, trust_list: List[str], block_list: List[str]):
+        # Trie as parallel lists: goto[state] = {char: next_state}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Best rule ending at (or reachable via fail links from) each state: (kind, entry)
+        self._out: List[Optional[Tuple[str, str]]] = [None]
+        self._cache: Dict[str, Tuple[float, Optional[str]]] = {}
+
+        for entry in trust_list:
+            self._insert(normalize_source(entry), TRUST)
+        for entry in block_list:
+            self._insert(normalize_source(entry), BLOCK)
+        self._build()
+
+    @classmethod
+    def from_config(cls, config) -> 'ReputationIndex':
+        return cls(getattr(config, 'trust_list', []) or [], getattr(config, 'block_list', []) or [])
+
+    def _insert(self, pattern: str, kind: str):
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(None)
+            state = nxt
+        self._out[state] = self._merge(self._out[state], (kind, pattern))
+
+    @staticmethod
+    def _merge(a: Optional[Tuple[str, str]], b: Optional[Tuple[str, str]]) -> Optional[Tuple[str, str]]:
+        # Block beats trust; otherwise keep the first rule seen
+        if a is None:
+            return b
+        if b is not None and b[0] == BLOCK and a[0] != BLOCK:
+            return b
+        return a
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._merge(self._out[nxt], self._out[self._fail[nxt]])
+
+    def match(self, source: str) -> Optional[Tuple[str, str]]:
+        """
+        Returns the winning (kind, entry) rule contained in the normalized source, or None.
+        """
+        best = None
+        state = 0
+        for ch in source:
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            if self._out[state] is not None:
+                best = self._merge(best, self._out[state])
+                if best[0] == BLOCK:
+                    break
+        return best
+
+    @staticmethod
+    def extract_source(url: str, title: str) -> str:
+        """
+        Domain of the URL, or the "Title - SourceName" suffix for Google News links (their domain is useless).
+        """
+        domain = urlparse(url).netloc.replace('www.', '')
+        if 'google' in domain and ' - ' in title:
+            return title.rsplit(' - ', 1)[-1].strip().lower()
+        return domain
+
+    def lookup(self, url: str, title: str) -> Tuple[float, Optional[str], str]:
+        """
+        Returns (score, matched rule as "kind:entry" or None, extracted source name).
+        """
+        source_name = self.extract_source(url, title)
+        source_check = normalize_source(source_name)
+
+        cached = self._cache.get(source_check)
+        if cached is None:
+            rule = self.match(source_check)
+            if rule is None:
+                cached = (UNKNOWN_SCORE, None)
+            elif rule[0] == BLOCK:
+                cached = (BLOCK_SCORE, f"{BLOCK}:{rule[1]}")
+            else:
+                cached = (TRUST_SCORE, f"{TRUST}:{rule[1]}")
+            self._cache[source_check] = cached
+
+        return cached[0], cached[1], source_name
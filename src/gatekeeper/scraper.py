@@ -1,162 +1,380 @@
+import hashlib
 import urllib.request
+import urllib.parse
+import urllib.error
+import http.client
+import threading
+import itertools
 import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 from src.core.models import NewsItem
+from src.gatekeeper.feed_state import FeedStateStore
+from src.gatekeeper.dedup import stable_item_id
+
+CHUNK_SIZE = 64 * 1024
+
+# Namespaces collapse to local names, so RSS 2.0 <item>, Atom <entry> and RDF (RSS 1.0) <item> share one path
+ITEM_TAGS = {'item', 'entry'}
+FEED_MARKERS = (b'<rss', b'<feed', b'<rdf:RDF', b'<RDF')
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1] if '}' in tag else tag.rsplit(':', 1)[-1]
 
 class BaseScraper:
     def scrape(self) -> List[NewsItem]:
         raise NotImplementedError
 
+class _ConnectionPool:
+    """
+    Per-thread, per-host keep-alive connections (http.client).
+    Each worker thread reuses one connection per (scheme, host) across feeds.
+    """
+    def __init__(self, timeout: float = 10):
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self, scheme: str, host: str, fresh: bool = False):
+        conns = getattr(self._local, 'conns', None)
+        if conns is None:
+            conns = self._local.conns = {}
+        key = (scheme, host)
+        if fresh and key in conns:
+            conns.pop(key).close()
+        if key not in conns:
+            cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            conns[key] = cls(host, timeout=self.timeout)
+        return conns[key]
+
+    def get(self, url: str, headers: dict, max_redirects: int = 5):
+        """
+        GET with keep-alive and manual redirect handling.
+        Returns (status, response headers, body chunk iterator).
+        The iterator must be exhausted before this thread's next request to the same host
+        (otherwise the next request reconnects).
+        """
+        for _ in range(max_redirects + 1):
+            parts = urllib.parse.urlsplit(url)
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+
+            # One retry on a fresh socket if the server closed the idle keep-alive connection
+            for attempt in range(2):
+                conn = self._conn(parts.scheme, parts.netloc, fresh=attempt > 0)
+                try:
+                    conn.request('GET', path, headers={**headers, 'Connection': 'keep-alive'})
+                    response = conn.getresponse()
+                    break
+                except (http.client.RemoteDisconnected, http.client.ImproperConnectionState, ConnectionResetError, BrokenPipeError):
+                    if attempt:
+                        raise
+
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                response.read()
+                url = urllib.parse.urljoin(url, response.getheader('Location'))
+                continue
+            return response.status, response.headers, _iter_chunks(response)
+
+        raise IOError(f"Too many redirects: {url}")
+
+def _uses_proxy(url: str, proxies: dict) -> bool:
+    # Same rules urllib applies: a *_proxy env/system setting for the scheme, unless no_proxy bypasses the host
+    parts = urllib.parse.urlsplit(url)
+    return parts.scheme in proxies and not urllib.request.proxy_bypass(parts.hostname or '')
+
+def _hashing(chunks: Iterable[bytes], hasher) -> Iterator[bytes]:
+    # Passes body chunks through while feeding them to `hasher`
+    for chunk in chunks:
+        hasher.update(chunk)
+        yield chunk
+
+def _iter_chunks(response, size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    while True:
+        chunk = response.read(size)
+        if not chunk:
+            return
+        yield chunk
+
 class RealScraper(BaseScraper):
-    def __init__(self, sources: List[str] = None):
+    # Use curl user-agent as it proved successful in CLI
+    USER_AGENT = 'curl/7.68.0'
+
+    def __init__(self, sources: List[str] = None, max_workers: int = 8, timeout: float = 10, state_path: Optional[str] = None):
         self.sources = sources or ["https://autowein.com"]
+        # max_workers <= 1 -> serial fallback (original urllib path)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # Incremental polling (opt-in): conditional GET + only items not seen in earlier polls.
+        # The poll is staged until commit_state(): call it after the scraped items were processed.
+        self.state = FeedStateStore(state_path) if state_path else None
         
     def scrape(self) -> List[NewsItem]:
         print(f"[Scraper] Fetching from {len(self.sources)} sources...")
+        # Collect as feeds complete, but return in configured source order (deterministic downstream)
+        by_source = dict(self.iter_scrape())
         news_items = []
         for url in self.sources:
-            try:
-                # Safe Encode URL for non-ASCII characters
-                # include + in safe to prevent breaking query parameters (space)
-                import urllib.parse
-                safe_url = urllib.parse.quote(url, safe=':/?&=+')
-                
-                # Standard lib fetch
-                # Use curl user-agent as it proved successful in CLI
-                req = urllib.request.Request(safe_url, headers={'User-Agent': 'curl/7.68.0'})
-                with urllib.request.urlopen(req, timeout=10) as response:
-                    content = response.read()
-
-                # Detect RSS/XML
+            news_items.extend(by_source.get(url, []))
+        return news_items
+
+    def iter_scrape(self) -> Iterator[Tuple[str, List[NewsItem]]]:
+        """
+        Yields (source_url, parsed items) as each feed completes.
+        Concurrent (bounded thread pool, keep-alive per host) unless max_workers <= 1.
+        Feeds behind an HTTP(S)_PROXY go through urllib, which honours it.
+        """
+        if self.max_workers <= 1 or len(self.sources) <= 1:
+            for url in self.sources:
+                yield url, self._scrape_source(url, self._fetch_urllib)
+            return
+
+        pool = _ConnectionPool(timeout=self.timeout)
+        proxies = urllib.request.getproxies()
+
+        def fetch(safe_url: str, headers: dict):
+            if proxies and _uses_proxy(safe_url, proxies):
+                return self._fetch_urllib(safe_url, headers)
+            return self._fetch_pooled(pool, safe_url, headers)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.sources))) as executor:
+            futures = {executor.submit(self._scrape_source, url, fetch): url for url in self.sources}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def commit_state(self):
+        """
+        Marks the last poll's items as seen (and keeps its validators). Call after downstream success.
+        """
+        if self.state:
+            self.state.commit()
+
+    def discard_state(self):
+        if self.state:
+            self.state.discard()
+
+    def _fetch_pooled(self, pool: _ConnectionPool, safe_url: str, headers: dict):
+        status, resp_headers, chunks = pool.get(safe_url, {'User-Agent': self.USER_AGENT, **headers})
+        if status >= 400:
+            for _ in chunks: pass # Drain so the connection stays reusable
+            raise IOError(f"HTTP Error {status}")
+        return status, resp_headers, chunks
+
+    def _fetch_urllib(self, safe_url: str, headers: dict):
+        # Standard lib fetch (serial fallback)
+        req = urllib.request.Request(safe_url, headers={'User-Agent': self.USER_AGENT, **headers})
+        try:
+            response = urllib.request.urlopen(req, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, e.headers, iter(())
+            raise
+
+        def chunks():
+            with response:
+                yield from _iter_chunks(response)
+        return response.status, response.headers, chunks()
+
+    def _scrape_source(self, url: str, fetch) -> List[NewsItem]:
+        """
+        Fetches and parses a single source. Never raises (errors are logged per feed).
+        With a feed-state store: sends conditional headers, hashes the body while it streams
+        into the parser (dropping the result on 304 / identical body), and returns only items
+        not seen in earlier committed polls.
+        """
+        news_items = []
+        try:
+            # Safe Encode URL for non-ASCII characters
+            # include + in safe to prevent breaking query parameters (space)
+            safe_url = urllib.parse.quote(url, safe=':/?&=+')
+            headers = self.state.conditional_headers(url) if self.state else {}
+            status, resp_headers, chunks = fetch(safe_url, headers)
+
+            hasher = None
+            if self.state:
+                if status == 304:
+                    print(f"[Scraper] Not modified: {url}")
+                    return []
+                hasher = hashlib.sha1()
+                chunks = _hashing(chunks, hasher)
+
+            # Peek the head to detect RSS/XML, then stream the rest into the parser
+            head = b''
+            for chunk in chunks:
+                head += chunk
+                if any(marker in head for marker in FEED_MARKERS) or len(head) >= CHUNK_SIZE:
+                    break
+
+            if any(marker in head for marker in FEED_MARKERS):
+                news_items.extend(self._iter_rss(itertools.chain([head], chunks), url))
+                print(f"[Scraper] Parsed {len(news_items)} items from RSS: {url}")
+            else:
+                content = head + b''.join(chunks)
                 if b'<rss' in content or b'<feed' in content:
-                    news_items.extend(self._parse_rss(content, url))
+                    news_items.extend(self._iter_rss([content], url))
+                    print(f"[Scraper] Parsed {len(news_items)} items from RSS: {url}")
                 else:
-                    # Fallback RegEx for HTML
-                    # Debug: if it's short, print it
-                    if len(content) < 2000:
-                         print(f"[Scraper] Short content from {url}: {content[:200]}")
+                    news_items.extend(self._parse_html(content, url))
+
+            if hasher is not None:
+                for _ in chunks: pass # Parser may stop early: hash the whole body
+                digest = hasher.hexdigest()
+                if self.state.is_unchanged(url, digest):
+                    print(f"[Scraper] Not modified: {url}")
+                    return []
+                self.state.update_validators(url, resp_headers.get('ETag'), resp_headers.get('Last-Modified'), content_hash=digest)
+
+            news_items = self._filter_seen(url, news_items)
                     
-                    html = content.decode('utf-8', errors='ignore')
-                    matches = re.findall(r'<h[23][^>]*><a[^>]*href=["\'](.*?)["\'][^>]*>(.*?)</a></h[23]>', html)
-                    for i, (link, title) in enumerate(matches[:500]):
-                        title = re.sub(r'<[^>]+>', '', title).strip()
-                        news_items.append(NewsItem(
-                            id=f"SCRAPED_{len(news_items)}",
-                            title=title,
-                            content=f"Snippet: {title}...",
-                            url=link if link.startswith('http') else url + link,
-                            published_at=datetime.now(),
-                            source=url
-                        ))
-                        
-            except Exception as e:
-                print(f"[Scraper] Error scraping {url}: {e}")
-                
+        except Exception as e:
+            print(f"[Scraper] Error scraping {url}: {e}")
+            
         return news_items
 
-    def _parse_rss(self, content: bytes, source_url: str) -> List[NewsItem]:
-        items = []
+    def _parse_html(self, content: bytes, url: str) -> List[NewsItem]:
+        # Fallback RegEx for HTML
+        # Debug: if it's short, print it
+        if len(content) < 2000:
+             print(f"[Scraper] Short content from {url}: {content[:200]}")
+        
+        news_items = []
+        html = content.decode('utf-8', errors='ignore')
+        matches = re.findall(r'<h[23][^>]*><a[^>]*href=["\'](.*?)["\'][^>]*>(.*?)</a></h[23]>', html)
+        for i, (link, title) in enumerate(matches[:500]):
+            title = re.sub(r'<[^>]+>', '', title).strip()
+            link = link if link.startswith('http') else url + link
+            news_items.append(NewsItem(
+                id=stable_item_id(url=link, title=title),
+                title=title,
+                content=f"Snippet: {title}...",
+                url=link,
+                published_at=datetime.now(),
+                source=url
+            ))
+        return news_items
+
+    def _filter_seen(self, url: str, news_items: List[NewsItem]) -> List[NewsItem]:
+        if not self.state:
+            return news_items
+        fresh = self.state.filter_unseen(url, (self._item_key(item) for item in news_items))
+        news_items = [item for item, is_new in zip(news_items, fresh) if is_new]
+        print(f"[Scraper] {len(news_items)} new items from {url}")
+        return news_items
+
+    @staticmethod
+    def _item_key(item: NewsItem) -> str:
+        # Content-addressed ID (canonical URL / GUID / title)
+        return item.id
+
+    def _iter_rss(self, chunks: Iterable[bytes], source_url: str) -> Iterator[NewsItem]:
+        """
+        Streaming single-pass parser (XMLPullParser) for RSS 2.0, Atom and RDF/RSS 1.0.
+        Yields NewsItems as soon as each <item>/<entry> closes; processed elements are cleared
+        and detached so memory stays flat regardless of feed size.
+        """
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        stack = [] # Open elements (to detach finished items from their parent)
         try:
-            # Debug: Print first 100 bytes to verify content
-            # print(f"[Scraper] Parsing {len(content)} bytes from {source_url}")
-            # print(f"[Scraper] Head: {content[:100]}") 
-
-            import xml.etree.ElementTree as ET
-            # Parse XML
-            root = ET.fromstring(content)
-            # print(f"[Scraper] Root Tag: {root.tag}")
-            
-            # RSS 2.0 uses <channel><item>...
-            # Atom uses <entry>...
-            
-            count = 0 
-            # RSS namespace handling? usually not needed for basic item tag unless strict
-            items_found = root.findall('.//item') + root.findall('.//entry') + root.findall('.//{http://purl.org/rss/1.0/}item')
-            # print(f"[Scraper] Found {len(items_found)} raw items")
-
-            for item in items_found:
-                # Removed limit as per user request
-                # if count >= 50: break 
-
-                
-                title = item.find('title')
-                link = item.find('link')
-                desc = item.find('description') or item.find('summary')
-                
-                title_text = title.text.strip() if title is not None and title.text else "No Title"
-                # Atom link usually has href attr, RSS has text
-                link_text = link.text.strip() if link is not None and link.text else (link.get('href') if link is not None else "")
-                desc_text = desc.text.strip() if desc is not None and desc.text else ""
-                
-                # Remove HTML from desc
-                desc_text = re.sub(r'<[^>]+>', '', desc_text)[:200] + "..."
-
-                # Parse Date
-                pub_date_str = item.find('pubDate')
-                pub_date = datetime.now()
-                if pub_date_str is not None and pub_date_str.text:
+            for chunk in chunks:
+                parser.feed(chunk)
+                for event, elem in parser.read_events():
+                    if event == 'start':
+                        stack.append(elem)
+                        continue
+                    stack.pop()
+                    if _local(elem.tag) not in ITEM_TAGS:
+                        continue
                     try:
-                        from email.utils import parsedate_to_datetime
-                        # Returns offset-aware datetime
-                        pub_date = parsedate_to_datetime(pub_date_str.text)
-                        # Remove timezone for simpler comparison if needed, or keep it. 
-                        # Let's keep it but ensure we handle it later.
-                    except:
-                        pass
-                elif item.find('updated') is not None:
-                     # Atom uses 'updated' and ISO format
-                     try:
-                         pub_date = datetime.fromisoformat(item.find('updated').text.replace('Z', '+00:00'))
-                     except: pass
-
-                items.append(NewsItem(
-                    id=f"RSS_{source_url}_{count}",
-                    title=title_text,
-                    content=str(title_text + " " + desc_text), 
-                    url=link_text,
-                    published_at=pub_date,
-                    source=source_url,
-                    # [NEW] Extracted Metadata
-                    author=self._get_text(item, ['creator', 'author', 'dc:creator']),
-                    tags=[c.text for c in item.findall('category') if c.text],
-                    image_url=self._get_image(item)
-                ))
-                count += 1
-                
-            print(f"[Scraper] Parsed {len(items)} items from RSS: {source_url}")
-        except Exception as e:
+                        yield self._build_item(elem, source_url)
+                    except Exception as e:
+                        print(f"[Scraper] Skipped malformed item in {source_url}: {e}")
+                    elem.clear()
+                    if stack:
+                        stack[-1].remove(elem)
+            parser.close()
+        except ET.ParseError as e:
             print(f"[Scraper] RSS Parse Error: {e}")
-            
-        return items
-
-    def _get_text(self, item, tags):
-        for tag in tags:
-            # Try finding with namespace wildcard roughly or exact match
-            # Python ElementTree namespace handling is tricky.
-            # We try direct match first.
-            res = item.find(tag)
-            if res is not None and res.text:
-                return res.text
-            # Try iterate children if namespace issues
-            for child in item:
-                if any(t in child.tag for t in tags):
-                    return child.text
-        return "Unknown"
-
-    def _get_image(self, item):
-        # Media Content / Enclosure
-        # Check <enclosure url="...">
-        enc = item.find('enclosure')
-        if enc is not None:
-             return enc.get('url', '')
-             
-        # Check media:content (namespace)
-        # Often looks like {http://search.yahoo.com/mrss/}content
+
+    def _build_item(self, item, source_url: str) -> NewsItem:
+        # One pass over the children, keyed by local name (first occurrence wins)
+        fields = {}
+        tags = []
+        image_url = ""
         for child in item:
-            if 'content' in child.tag and 'url' in child.attrib:
-                # likely media:content
-                return child.attrib['url']
-            if 'thumbnail' in child.tag and 'url' in child.attrib:
-                return child.attrib['url']
-        return ""
+            name = _local(child.tag)
+            fields.setdefault(name, child)
+            if name == 'category':
+                # RSS: text, Atom: term attribute
+                label = child.text or child.get('term')
+                if label: tags.append(label)
+            elif not image_url:
+                # Media Content / Enclosure / media:thumbnail
+                if name == 'enclosure':
+                    image_url = child.get('url', '')
+                elif name in ('content', 'thumbnail') and 'url' in child.attrib:
+                    image_url = child.attrib['url']
+
+        title = fields.get('title')
+        link = fields.get('link')
+        desc = fields.get('description')
+        if desc is None:
+            desc = fields.get('summary')
+
+        title_text = title.text.strip() if title is not None and title.text else "No Title"
+        # Atom link usually has href attr, RSS has text
+        link_text = link.text.strip() if link is not None and link.text else (link.get('href', '') if link is not None else "")
+        desc_text = desc.text.strip() if desc is not None and desc.text else ""
+        
+        # Remove HTML from desc
+        desc_text = re.sub(r'<[^>]+>', '', desc_text)[:200] + "..."
+
+        # Parse Date
+        pub_date = datetime.now()
+        pub_elem = fields.get('pubDate')
+        updated = fields.get('updated') # Atom
+        if updated is None:
+            updated = fields.get('date') # dc:date (RDF)
+        if pub_elem is not None and pub_elem.text:
+            try:
+                from email.utils import parsedate_to_datetime
+                # Returns offset-aware datetime
+                pub_date = parsedate_to_datetime(pub_elem.text)
+            except:
+                pass
+        elif updated is not None and updated.text:
+             # Atom uses 'updated' and ISO format
+             try:
+                 pub_date = datetime.fromisoformat(updated.text.strip().replace('Z', '+00:00'))
+             except: pass
+
+        # dc:creator / author (Atom nests <name>)
+        author = "Unknown"
+        author_elem = fields.get('creator')
+        if author_elem is None:
+            author_elem = fields.get('author')
+        if author_elem is not None:
+            name_elem = next((c for c in author_elem if _local(c.tag) == 'name'), None)
+            text = name_elem.text if name_elem is not None else author_elem.text
+            if text and text.strip():
+                author = text.strip()
+
+        # RSS <guid> / Atom <id>
+        guid = fields.get('guid')
+        if guid is None:
+            guid = fields.get('id')
+        guid_text = guid.text.strip() if guid is not None and guid.text else ""
+
+        return NewsItem(
+            id=stable_item_id(url=link_text, guid=guid_text, title=title_text, content=desc_text),
+            title=title_text,
+            content=str(title_text + " " + desc_text), 
+            url=link_text,
+            published_at=pub_date,
+            source=source_url,
+            # [NEW] Extracted Metadata
+            author=author,
+            tags=tags,
+            image_url=image_url
+        )
@@ -0,0 +1,105 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional
+import numpy as np
+
+JSON_MODEL_FILE = "data/irl_tfidf_model.json"
+# Binary layout: <prefix>.vocab (line 1: JSON meta, then one token per line) + <prefix>.idf.npy (float32, mmap)
+BINARY_MODEL_PREFIX = "data/irl_tfidf_model"
+
+_PUNCT_RE = re.compile(r'[^\w\s]')
+
+def tokenize(text: str) -> List[str]:
+    """
+    Same tokenizer as learning.clean_text (lowercase, strip punctuation, drop 1-char and numeric tokens).
+    """
+    return [w for w in _PUNCT_RE.sub('', text.lower()).split() if len(w) > 1 and not w.isdigit()]
+
+class TfidfScorer:
+    """
+    [Deep IRL Engine v2] Precompiled TF-IDF Weighted Overlap
+    Vocabulary -> column index dict plus a float32 IDF array (memory-mapped when loaded from the binary export).
+    Scores are computed per batch with a single bincount over (doc, token) pairs.
+    """
+
+    def __init__(self, vocab: Dict[str, int], idf: np.ndarray, default_idf: float = 0.0, total_docs: int = 0):
+        self.vocab = vocab
+        # Kept as given (no copy): a float32 memmap stays on disk and only touched pages are read
+        self.idf = idf if isinstance(idf, np.ndarray) and idf.dtype == np.float32 else np.asarray(idf, dtype=np.float32)
+        self.default_idf = default_idf
+        self.total_docs = total_docs
+
+    @classmethod
+    def load(cls, prefix: str = BINARY_MODEL_PREFIX, json_path: str = JSON_MODEL_FILE) -> Optional['TfidfScorer']:
+        """
+        Loads the binary export if present, otherwise compiles the legacy JSON model. Returns None if neither exists.
+        """
+        vocab_path, idf_path = prefix + ".vocab", prefix + ".idf.npy"
+        if os.path.exists(vocab_path) and os.path.exists(idf_path):
+            with open(vocab_path, 'r', encoding='utf-8') as f:
+                meta = json.loads(f.readline())
+                vocab = {line.rstrip('\n'): i for i, line in enumerate(f)}
+            idf = np.load(idf_path, mmap_mode='r')
+            return cls(vocab, idf, meta.get('default_idf', 0.0), meta.get('total_docs', 0))
+
+        if os.path.exists(json_path):
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+            return cls.from_scores(data['idf_scores'], data['default_idf'], data.get('total_docs', 0))
+
+        return None
+
+    @classmethod
+    def from_scores(cls, idf_scores: Dict[str, float], default_idf: float = 0.0, total_docs: int = 0) -> 'TfidfScorer':
+        tokens = list(idf_scores)
+        vocab = {token: i for i, token in enumerate(tokens)}
+        idf = np.fromiter((idf_scores[t] for t in tokens), dtype=np.float32, count=len(tokens))
+        return cls(vocab, idf, default_idf, total_docs)
+
+    @staticmethod
+    def export(idf_scores: Dict[str, float], default_idf: float = 0.0, total_docs: int = 0, prefix: str = BINARY_MODEL_PREFIX):
+        """
+        Writes the binary model (vocab + float32 IDF array) used by `load`.
+        Tokens never contain newlines (tokenizer splits on whitespace), so one token per line is safe.
+        """
+        tokens = list(idf_scores)
+        with open(prefix + ".vocab", 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"default_idf": default_idf, "total_docs": total_docs, "size": len(tokens)}) + "\n")
+            for token in tokens:
+                f.write(token + "\n")
+        np.save(prefix + ".idf.npy", np.fromiter((idf_scores[t] for t in tokens), dtype=np.float32, count=len(tokens)))
+
+    def score_batch(self, texts: List[str]) -> List[float]:
+        """
+        Returns min(1, sum(idf) / sqrt(n_tokens) / 30) per text (0.0 for texts without tokens).
+        """
+        doc_ids = []
+        cols = []
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        get = self.vocab.get
+
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[doc] = len(tokens)
+            doc_ids.extend([doc] * len(tokens))
+            cols.extend(get(token, -1) for token in tokens)
+
+        if not cols:
+            return [0.0] * len(texts)
+
+        # Out-of-vocabulary tokens (-1) weigh default_idf
+        cols = np.asarray(cols)
+        known = cols >= 0
+        weights = np.full(len(cols), self.default_idf, dtype=np.float32)
+        weights[known] = self.idf[cols[known]]
+
+        # Sparse (doc x vocab) count matrix times the IDF vector, as one weighted bincount
+        sums = np.bincount(np.asarray(doc_ids), weights=weights, minlength=len(texts))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            norm = np.where(lengths > 0, sums / np.sqrt(lengths), 0.0)
+
+        return np.minimum(1.0, norm / 30.0).tolist()
+
+    def score(self, text: str) -> float:
+        return self.score_batch([text])[0]
@@ -0,0 +1,355 @@
+import hashlib
+import heapq
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from src.core.models import Event, Relation
+from src.historian.graph_db import GraphDB, LocalGraph
+
+MAGIC = b"LGRAPH01"
+ALIGN = 64
+
+def _hash(name: str) -> int:
+    return int.from_bytes(hashlib.blake2b(name.encode('utf-8'), digest_size=8).digest(), 'little')
+
+class _StringTable:
+    """
+    Interned strings as one UTF-8 blob + offsets, with a sorted 64-bit hash index for lookups
+    (no per-string Python objects until a string is actually read).
+    """
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, hashes: Optional[np.ndarray] = None,
+                 order: Optional[np.ndarray] = None):
+        self.blob = blob
+        self.offsets = offsets
+        self.hashes = hashes
+        self.order = order
+
+    @classmethod
+    def build(cls, strings: List[str], index: bool = True) -> "_StringTable":
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        hashes = order = None
+        if index:
+            raw = np.array([_hash(s) for s in strings], dtype=np.uint64)
+            order = np.argsort(raw, kind='stable').astype(np.int32)
+            hashes = raw[order]
+        return cls(blob, offsets, hashes, order)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def all(self) -> List[str]:
+        # Bulk decode (one bytes copy) for full materialization
+        data, offsets = self.blob.tobytes(), self.offsets.tolist()
+        return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+    def find(self, name: str) -> int:
+        h = np.uint64(_hash(name))
+        pos = int(np.searchsorted(self.hashes, h))
+        while pos < len(self.hashes) and self.hashes[pos] == h:
+            idx = int(self.order[pos])
+            if self[idx] == name:
+                return idx
+            pos += 1
+        return -1
+
+    def arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        out = {f"{prefix}_blob": self.blob, f"{prefix}_offsets": self.offsets}
+        if self.hashes is not None:
+            out[f"{prefix}_hashes"] = self.hashes
+            out[f"{prefix}_order"] = self.order
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str) -> "_StringTable":
+        return cls(arrays[f"{prefix}_blob"], arrays[f"{prefix}_offsets"],
+                   arrays.get(f"{prefix}_hashes"), arrays.get(f"{prefix}_order"))
+
+class CompactGraph(GraphDB):
+    """
+    Array-backed LocalGraph for large histories.
+    Node / relation names are interned to ints, edges are CSR (offsets + neighbors + rel ids),
+    and events are columns (node id, impact, type, date, description). `save()` writes everything
+    into one file that `load()` memory-maps, so startup is O(1) and worker processes share pages.
+    The arrays are immutable: add_event / add_relation go to a small LocalGraph overlay that
+    queries merge in, and `compact()` folds the overlay into fresh arrays.
+    Query semantics match LocalGraph.get_related_events.
+    """
+    def __init__(self, arrays: Dict[str, np.ndarray], top_k: int = 10):
+        self.top_k = top_k
+        self.overlay = LocalGraph(top_k=top_k) # writes since compaction
+        self._arrays = arrays
+        self.names = _StringTable.from_arrays(arrays, "node")
+        self.rel_names = _StringTable.from_arrays(arrays, "rel")
+        self.offsets = arrays["edge_offsets"]
+        self.neighbors = arrays["edge_neighbors"]
+        self.edge_rel = arrays["edge_rel"]
+        self.node_event = arrays["node_event"] # node id -> event row (-1 for entities)
+        self.event_node = arrays["event_node"]
+        self.event_impact = arrays["event_impact"]
+        self.event_type = arrays["event_type"] # -> rel/type string table
+        self.event_dates = _StringTable.from_arrays(arrays, "event_date")
+        self.event_desc = _StringTable.from_arrays(arrays, "event_desc")
+
+    @classmethod
+    def from_local(cls, graph: LocalGraph) -> "CompactGraph":
+        node_names = list(graph.adj.keys())
+        for event_id in graph.events:
+            if event_id not in graph.adj:
+                node_names.append(event_id) # Event without entities
+        node_ids = {name: i for i, name in enumerate(node_names)}
+        for targets in graph.adj.values():
+            for v in targets:
+                if v not in node_ids:
+                    node_ids[v] = len(node_names)
+                    node_names.append(v)
+
+        labels = sorted({rel for targets in graph.adj.values() for rel in targets.values()} |
+                        {e.event_type for e in graph.events.values()})
+        label_ids = {label: i for i, label in enumerate(labels)}
+
+        offsets = np.zeros(len(node_names) + 1, dtype=np.int64)
+        neighbors, edge_rel = [], []
+        for i, name in enumerate(node_names):
+            targets = graph.adj.get(name, {})
+            neighbors.extend(node_ids[v] for v in targets)
+            edge_rel.extend(label_ids[rel] for rel in targets.values())
+            offsets[i + 1] = len(neighbors)
+
+        events = list(graph.events.values())
+        node_event = np.full(len(node_names), -1, dtype=np.int32)
+        for row, event in enumerate(events):
+            node_event[node_ids[event.id]] = row
+
+        arrays = {
+            **_StringTable.build(node_names).arrays("node"),
+            **_StringTable.build(labels).arrays("rel"),
+            "edge_offsets": offsets,
+            "edge_neighbors": np.array(neighbors, dtype=np.int32),
+            "edge_rel": np.array(edge_rel, dtype=np.uint16),
+            "node_event": node_event,
+            "event_node": np.array([node_ids[e.id] for e in events], dtype=np.int32),
+            "event_impact": np.array([e.impact_score for e in events], dtype=np.float64),
+            "event_type": np.array([label_ids[e.event_type] for e in events], dtype=np.uint16),
+            **_StringTable.build([_date_str(e.date) for e in events], index=False).arrays("event_date"),
+            **_StringTable.build([e.description for e in events], index=False).arrays("event_desc"),
+        }
+        return cls(arrays, top_k=graph.top_k)
+
+    def compact(self) -> "CompactGraph":
+        """
+        New CompactGraph with the overlay merged into the arrays (this one is left unchanged).
+        """
+        if not self.overlay.adj and not self.overlay.events:
+            return self
+        return CompactGraph.from_local(self.to_local())
+
+    # --- Single-file layout: MAGIC | u64 header length | JSON header | 64-byte aligned arrays ---
+
+    def save(self, path: str):
+        if self.overlay.adj or self.overlay.events:
+            self.compact().save(path) # Persist the overlay too
+            return
+        header, offset = {}, 0
+        for name, arr in self._arrays.items():
+            arr = np.ascontiguousarray(arr)
+            offset = (offset + ALIGN - 1) // ALIGN * ALIGN
+            header[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+            offset += arr.nbytes
+        header_bytes = json.dumps(header).encode('utf-8')
+        data_start = (len(MAGIC) + 8 + len(header_bytes) + ALIGN - 1) // ALIGN * ALIGN
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC)
+            f.write(len(header_bytes).to_bytes(8, 'little'))
+            f.write(header_bytes)
+            for name, meta in header.items():
+                f.seek(data_start + meta["offset"])
+                f.write(np.ascontiguousarray(self._arrays[name]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, top_k: int = 10) -> "CompactGraph":
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a compact graph file: {path}")
+            header_len = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(header_len))
+        data_start = (len(MAGIC) + 8 + header_len + ALIGN - 1) // ALIGN * ALIGN
+
+        mm = np.memmap(path, dtype=np.uint8, mode='r')
+        arrays = {}
+        for name, meta in header.items():
+            dtype = np.dtype(meta["dtype"])
+            count = int(np.prod(meta["shape"])) if meta["shape"] else 1
+            start = data_start + meta["offset"]
+            arrays[name] = mm[start:start + count * dtype.itemsize].view(dtype).reshape(meta["shape"])
+        return cls(arrays, top_k=top_k)
+
+    # --- GraphDB ---
+
+    def add_event(self, event: Event):
+        self.overlay.add_event(event)
+
+    def add_relation(self, relation: Relation):
+        self.overlay.add_relation(relation)
+
+    def _neighbors(self, node: int):
+        return self.neighbors[self.offsets[node]:self.offsets[node + 1]].tolist()
+
+    def get_related_events(self, entities: List[str], hops: int = 2, top_k: Optional[int] = None) -> List[Event]:
+        return self.traverse(entities, hops=hops, top_k=top_k)[0]
+
+    def traverse(self, entities: List[str], hops: int = 2, top_k: Optional[int] = None) -> Tuple[List[Event], Set[str]]:
+        """
+        Events as get_related_events, plus the expanded entities (see LocalGraph.traverse).
+        """
+        top_k = self.top_k if top_k is None else top_k
+        if self.overlay.adj:
+            return self._merged_related(entities, hops, top_k)
+        seeds = [i for i in (self.names.find(e) for e in dict.fromkeys(entities)) if i >= 0]
+        if not seeds or hops < 1:
+            return [], set()
+
+        distance = {}
+        reached = set()
+        visited = set(seeds)
+        frontier = seeds
+        for depth in range(1, hops + 1):
+            reached.update(node for node in frontier if self.node_event[node] < 0)
+            next_frontier = []
+            for node in frontier:
+                for neighbor in self._neighbors(node):
+                    if neighbor in visited:
+                        continue
+                    visited.add(neighbor)
+                    next_frontier.append(neighbor)
+                    row = int(self.node_event[neighbor])
+                    if row >= 0:
+                        distance.setdefault(row, depth)
+            frontier = next_frontier
+            if not frontier:
+                break
+
+        ranked = ((d, -float(self.event_impact[row]), row) for row, d in distance.items())
+        best = heapq.nsmallest(top_k, ranked) if top_k else sorted(ranked)
+        return [self.event(row) for _, _, row in best], {self.names[node] for node in reached}
+
+    def _merged_related(self, entities: List[str], hops: int, top_k: int) -> Tuple[List[Event], Set[str]]:
+        """
+        Same BFS over the union of the arrays and the overlay, by node name
+        (slower than the int path; only used until the next compact()).
+        """
+        overlay = self.overlay
+        seeds = [e for e in dict.fromkeys(entities) if e in overlay.adj or self.names.find(e) >= 0]
+        if not seeds or hops < 1:
+            return [], set()
+
+        def neighbors(name: str):
+            node = self.names.find(name)
+            base = [self.names[v] for v in self._neighbors(node)] if node >= 0 else []
+            return base + [v for v in overlay.adj.get(name, ()) if v not in base]
+
+        distance = {}
+        reached, events_seen = set(), set()
+        visited = set(seeds)
+        frontier = seeds
+        for depth in range(1, hops + 1):
+            reached.update(name for name in frontier if name not in events_seen)
+            next_frontier = []
+            for name in frontier:
+                for neighbor in neighbors(name):
+                    if neighbor in visited:
+                        continue
+                    visited.add(neighbor)
+                    next_frontier.append(neighbor)
+                    event = self._event_by_id(neighbor)
+                    if event is not None:
+                        distance.setdefault(neighbor, (depth, event))
+                        events_seen.add(neighbor)
+            frontier = next_frontier
+            if not frontier:
+                break
+
+        ranked = ((d, -event.impact_score, event_id) for event_id, (d, event) in distance.items())
+        best = heapq.nsmallest(top_k, ranked) if top_k else sorted(ranked)
+        return [distance[event_id][1] for _, _, event_id in best], reached
+
+    def _event_by_id(self, name: str) -> Optional[Event]:
+        if name in self.overlay.events:
+            return self.overlay.events[name]
+        node = self.names.find(name)
+        row = int(self.node_event[node]) if node >= 0 else -1
+        return self.event(row) if row >= 0 else None
+
+    def event(self, row: int) -> Event:
+        node = int(self.event_node[row])
+        entities = [self.names[v] for v, rel in zip(self._neighbors(node), self.edge_rel[self.offsets[node]:self.offsets[node + 1]])
+                    if self.rel_names[int(rel)] == "INVOLVES"]
+        return Event(
+            id=self.names[node],
+            date=_parse_date(self.event_dates[row]),
+            description=self.event_desc[row],
+            entities=entities,
+            event_type=self.rel_names[int(self.event_type[row])],
+            impact_score=float(self.event_impact[row]),
+        )
+
+    @property
+    def event_count(self) -> int:
+        added = sum(1 for event_id in self.overlay.events if self.names.find(event_id) < 0)
+        return len(self.event_node) + added
+
+    def to_local(self) -> LocalGraph:
+        names, labels = self.names.all(), self.rel_names.all()
+        dates, descs = self.event_dates.all(), self.event_desc.all()
+        offsets, neighbors, edge_rel = self.offsets.tolist(), self.neighbors.tolist(), self.edge_rel.tolist()
+        node_event = self.node_event.tolist()
+        impacts, types = self.event_impact.tolist(), self.event_type.tolist()
+
+        graph = LocalGraph(top_k=self.top_k)
+        for row, node in enumerate(self.event_node.tolist()):
+            lo, hi = offsets[node], offsets[node + 1]
+            graph.add_event(Event(
+                id=names[node],
+                date=_parse_date(dates[row]),
+                description=descs[row],
+                entities=[names[v] for v, rel in zip(neighbors[lo:hi], edge_rel[lo:hi]) if labels[rel] == "INVOLVES"],
+                event_type=labels[types[row]],
+                impact_score=impacts[row],
+            ))
+        # Entity-entity relations
+        for node, row in enumerate(node_event):
+            if row >= 0:
+                continue
+            lo, hi = offsets[node], offsets[node + 1]
+            for v, rel in zip(neighbors[lo:hi], edge_rel[lo:hi]):
+                if node_event[v] < 0:
+                    graph._add_edge(names[node], names[v], labels[rel])
+        # Overlay (writes since compaction)
+        for event in self.overlay.events.values():
+            graph.add_event(event)
+        for u, targets in self.overlay.adj.items():
+            for v, rel in targets.items():
+                graph._add_edge(u, v, rel)
+        return graph
+
+def _date_str(date) -> str:
+    return date.isoformat() if hasattr(date, 'isoformat') else str(date)
+
+def _parse_date(value: str):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return value
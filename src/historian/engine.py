@@ -1,10 +1,28 @@
 from typing import List, Dict, Any
 from src.core.models import NewsItem, Event
 from src.historian.graph_db import GraphDB
+from src.historian.retrieval_cache import CachedGraph
 
 class HistorianEngine:
-    def __init__(self, graph_db: GraphDB):
-        self.graph = graph_db
+    def __init__(self, graph_db: GraphDB, cache: bool = True, cache_ttl: float = 3600, cache_size: int = 1024):
+        # Articles sharing an entity set (e.g. {Tesla, China}) reuse one graph query
+        self.graph = CachedGraph(graph_db, max_entries=cache_size, ttl_seconds=cache_ttl) if cache else graph_db
+
+    def add_event(self, event: Event):
+        # Goes through the cache wrapper so affected entries are invalidated
+        self.graph.add_event(event)
+
+    def add_events(self, events: List[Event], **kwargs) -> int:
+        # Bulk ingest through the wrapper as well (one invalidation for the whole batch)
+        if hasattr(self.graph, 'add_events'):
+            return self.graph.add_events(events, **kwargs)
+        for event in events:
+            self.graph.add_event(event)
+        return len(events)
+
+    @property
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.graph.stats if isinstance(self.graph, CachedGraph) else {}
         
     def retrieve_context(self, news_item: NewsItem) -> Dict[str, Any]:
         """
@@ -1,5 +1,8 @@
+import heapq
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
 from src.core.models import Entity, Event, Relation
 
 class GraphDB(ABC):
@@ -12,11 +15,19 @@ class GraphDB(ABC):
         pass
 
 class LocalGraph(GraphDB):
-    def __init__(self):
+    """
+    In-memory graph: entities and events are nodes, `adj` holds the typed edges
+    (entity <-INVOLVED_IN/INVOLVES-> event, entity <-RELATED_TO-> entity).
+    An entity -> event inverted index answers direct lookups without touching `adj`.
+    """
+    def __init__(self, top_k: int = 10):
         # adjacency list: {node_id: {neighbor_id: relation_type}}
         self.adj = {}
         self.nodes = {} 
         self.events = {}
+        # inverted index: {entity_id: {event_id, ...}}
+        self.entity_events: Dict[str, Set[str]] = {}
+        self.top_k = top_k
 
     def add_event(self, event: Event):
         self.events[event.id] = event
@@ -24,33 +35,105 @@ class LocalGraph(GraphDB):
         for entity_id in event.entities:
             self._add_edge(event.id, entity_id, "INVOLVES")
             self._add_edge(entity_id, event.id, "INVOLVED_IN")
+            self.entity_events.setdefault(entity_id, set()).add(event.id)
+
+    def add_relation(self, relation: Relation):
+        # Entity-entity links (partners, tariffs, ...) extend multi-hop retrieval
+        self._add_edge(relation.source, relation.target, "RELATED_TO")
+        self._add_edge(relation.target, relation.source, "RELATED_TO")
             
     def _add_edge(self, u, v, rel_type):
         if u not in self.adj: self.adj[u] = {}
         self.adj[u][v] = rel_type
+
+    def compact(self):
+        """
+        Array-backed copy (CompactGraph) for large histories; `.save()` it to mmap later.
+        """
+        from src.historian.compact_graph import CompactGraph
+        return CompactGraph.from_local(self)
         
-    def get_related_events(self, entities: List[str], hops: int = 2) -> List[Event]:
-        # Simple BFS / Traversal logic for demo
-        # If any of the input entities are involved in an event, return that event.
-        
-        found_events = []
-        for eid, evt in self.events.items():
-            # Check intersection
-            if any(e in evt.entities for e in entities):
-                found_events.append(evt)
-                
-        # Fallback for demo if no direct entity match (since entities are mock strings)
-        if not found_events and self.events:
-            return list(self.events.values())
-            
-        return found_events
+    def get_related_events(self, entities: List[str], hops: int = 2, top_k: Optional[int] = None) -> List[Event]:
+        """
+        Bounded BFS over `adj` from the given entities, up to `hops` edges (same semantics as
+        the Neo4j `*1..hops` match). Events are ranked by hop distance, then impact_score.
+        """
+        return self.traverse(entities, hops=hops, top_k=top_k)[0]
+
+    def traverse(self, entities: List[str], hops: int = 2, top_k: Optional[int] = None) -> Tuple[List[Event], Set[str]]:
+        """
+        get_related_events plus the entities the BFS expanded (within hops - 1 of a seed):
+        a later event or relation on any of them can change the result.
+        """
+        top_k = self.top_k if top_k is None else top_k
+        seeds = [e for e in dict.fromkeys(entities) if e in self.adj]
+        if not seeds or hops < 1:
+            return [], set()
+
+        # Hop 1 straight from the inverted index (all that hops=1 needs)
+        distance = {}
+        for entity in seeds:
+            for event_id in self.entity_events.get(entity, ()):
+                distance.setdefault(event_id, 1)
+
+        reached = set(seeds)
+        if hops > 1:
+            visited = set(seeds)
+            frontier = seeds
+            for depth in range(1, hops + 1):
+                reached.update(node for node in frontier if node not in self.events)
+                next_frontier = []
+                for node in frontier:
+                    for neighbor in self.adj.get(node, ()):
+                        if neighbor in visited:
+                            continue
+                        visited.add(neighbor)
+                        next_frontier.append(neighbor)
+                        if neighbor in self.events:
+                            distance.setdefault(neighbor, depth)
+                frontier = next_frontier
+                if not frontier:
+                    break
+
+        ranked = ((d, -self.events[event_id].impact_score, event_id) for event_id, d in distance.items())
+        best = heapq.nsmallest(top_k, ranked) if top_k else sorted(ranked)
+        return [self.events[event_id] for _, _, event_id in best], reached
 
 class Neo4jGraph(GraphDB):
-    def __init__(self, uri=None, user=None, password=None):
+    """
+    Neo4j-backed graph. Writes go through `add_events`: one `UNWIND $events` query per
+    transaction, `batch_size` events each, on a single reused session.
+    `driver` can be injected (e.g. RecordingDriver from neo4j_fake for offline runs).
+    """
+    SCHEMA_QUERIES = [
+        "CREATE CONSTRAINT event_id IF NOT EXISTS FOR (e:Event) REQUIRE e.id IS UNIQUE",
+        "CREATE CONSTRAINT entity_name IF NOT EXISTS FOR (n:Entity) REQUIRE n.name IS UNIQUE",
+        "CREATE INDEX event_date IF NOT EXISTS FOR (e:Event) ON (e.date)",
+        "CREATE INDEX event_impact IF NOT EXISTS FOR (e:Event) ON (e.impact_score)",
+    ]
+
+    INGEST_QUERY = """
+    UNWIND $events AS row
+    MERGE (e:Event {id: row.id})
+    SET e.description = row.description, e.date = row.date,
+        e.event_type = row.event_type, e.impact_score = row.impact
+    WITH e, row
+    UNWIND row.entities AS entity_name
+    MERGE (n:Entity {name: entity_name})
+    MERGE (n)-[:INVOLVED_IN]->(e)
+    """
+
+    def __init__(self, uri=None, user=None, password=None, driver=None, batch_size: int = 1000):
         import os
         self.uri = uri or os.getenv("NEO4J_URI", "bolt://localhost:7687")
         self.user = user or os.getenv("NEO4J_USER", "neo4j")
         self.password = password or os.getenv("NEO4J_PASSWORD", "password")
+        self.batch_size = batch_size
+        self._schema_ready = False
+
+        if driver is not None:
+            self.driver = driver
+            return
         
         try:
             from neo4j import GraphDatabase
@@ -67,29 +150,64 @@ class Neo4jGraph(GraphDB):
         if self.driver:
             self.driver.close()
 
+    def ensure_schema(self):
+        """
+        Uniqueness constraints back every MERGE with an index lookup instead of a label scan.
+        """
+        if self._schema_ready or not self.driver:
+            return
+        with self.driver.session() as session:
+            for query in self.SCHEMA_QUERIES:
+                session.run(query).consume()
+        self._schema_ready = True
+
+    @staticmethod
+    def _event_row(event: Event) -> Dict[str, Any]:
+        date = event.date.isoformat() if hasattr(event.date, 'isoformat') else (event.date or "")
+        return {
+            "id": event.id,
+            "description": event.description or "Unknown Event",
+            "date": date,
+            "event_type": event.event_type,
+            "impact": event.impact_score,
+            "entities": list(event.entities),
+        }
+
     def add_event(self, event: Event):
-        if not self.driver: return
-        
-        query = """
-        MERGE (e:Event {id: $event_id})
-        SET e.title = $title, e.date = $date, e.impact_score = $impact
-        WITH e
-        UNWIND $entities as entity_name
-        MERGE (n:Entity {name: entity_name})
-        MERGE (n)-[:INVOLVED_IN]->(e)
+        if self.add_events([event], verbose=False):
+            print(f"[Graph] Added Event {event.id} to Neo4j")
+
+    def add_events(self, events: Iterable[Event], batch_size: Optional[int] = None, verbose: bool = True) -> int:
+        """
+        Bulk ingestion: one transaction + one UNWIND round-trip per batch. Returns rows written.
         """
+        if not self.driver: return 0
+        batch_size = batch_size or self.batch_size
+        written = 0
+        start = time.time()
         
         try:
+            self.ensure_schema()
             with self.driver.session() as session:
-                session.run(query, 
-                            event_id=event.id, 
-                            title=event.title or "Unknown Event",
-                            date=event.timestamp.isoformat() if event.timestamp else "",
-                            impact=event.impact_score,
-                            entities=event.entities)
-            print(f"[Graph] Added Event {event.id} to Neo4j")
+                batch = []
+                for event in events:
+                    batch.append(self._event_row(event))
+                    if len(batch) >= batch_size:
+                        written += self._write_batch(session, batch)
+                        batch = []
+                if batch:
+                    written += self._write_batch(session, batch)
         except Exception as ex:
-            print(f"[Graph] Error adding event: {ex}")
+            print(f"[Graph] Error adding events (after {written} rows): {ex}")
+
+        elapsed = time.time() - start
+        if verbose and written:
+            print(f"[Graph] Ingested {written} events in {elapsed:.2f}s ({written / max(elapsed, 1e-9):.0f} rows/s, batch {batch_size})")
+        return written
+
+    def _write_batch(self, session, rows: List[Dict[str, Any]]) -> int:
+        session.execute_write(lambda tx: tx.run(self.INGEST_QUERY, events=rows).consume())
+        return len(rows)
 
     def get_related_events(self, entities: List[str], hops: int = 2) -> List[Event]:
         if not self.driver: return []
@@ -97,12 +215,14 @@ class Neo4jGraph(GraphDB):
         # Cypher: Find events connected to these entities within N hops
         # Cypher: 2-Hop Impact Analysis (Graph-RAG)
         # Finds events related to the target entities, or related to PARTNERS of the target entities.
-        query = """
-        MATCH (target:Entity)-[:INVOLVES|INVOLVED_IN|RELATED_TO*1..2]-(e:Event)
+        # (Variable-length bounds cannot be parameters, hence the int() formatting.)
+        query = f"""
+        MATCH (target:Entity)-[:INVOLVES|INVOLVED_IN|RELATED_TO*1..{max(1, int(hops))}]-(e:Event)
         WHERE target.name IN $entities
         AND e.date > '2020-01-01'  // Filter for relevance (optional, can be dynamic)
-        RETURN DISTINCT e.id as id, e.title as title, e.date as date, e.impact_score as impact
-        ORDER BY e.impact_score DESC
+        RETURN DISTINCT e.id as id, e.description as description, e.date as date,
+               e.event_type as event_type, e.impact_score as impact
+        ORDER BY impact DESC
         LIMIT 5
         """
         
@@ -111,13 +231,18 @@ class Neo4jGraph(GraphDB):
             with self.driver.session() as session:
                 records = session.run(query, entities=entities)
                 for record in records:
-                    # Reconstruct Event object (simplified)
+                    # Reconstruct Event object (entities omitted: not needed for context)
+                    try:
+                        date = datetime.fromisoformat(record['date'])
+                    except (TypeError, ValueError):
+                        date = record['date']
                     evt = Event(
                         id=record['id'],
-                        title=record['title'],
-                        content="Retrieved from Graph",
+                        date=date,
+                        description=record['description'] or "Retrieved from Graph",
                         entities=[], # Simplified
-                        timestamp=None # Parsing logic skipped for brevity
+                        event_type=record['event_type'] or "Unknown",
+                        impact_score=record['impact'] or 0.0
                     )
                     results.append(evt)
         except Exception as ex:
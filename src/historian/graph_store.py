@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+import time
+from dataclasses import asdict
+from datetime import datetime
+from typing import Iterable, List, Optional, Set, Tuple
+from src.core.models import Event, Relation
+from src.historian.graph_db import GraphDB, LocalGraph
+
+DEFAULT_GRAPH_DIR = "data/graph"
+
+class PersistentGraph(GraphDB):
+    """
+    Graph that survives restarts: a binary snapshot (CompactGraph file) plus an
+    append-only write-ahead log of every add_event / add_relation since that snapshot.
+    Startup = mmap the snapshot + replay the WAL into the CompactGraph's LocalGraph overlay;
+    reads are served from the arrays + overlay, so the snapshot is never copied into dicts.
+    A snapshot is taken once the WAL holds
+    max(snapshot_every, snapshot_ratio x snapshot size) records: the interval grows with the graph,
+    so snapshot cost stays amortized O(1) per write (a fixed interval makes a backfill O(n^2)),
+    and the WAL replayed on startup stays proportional to the snapshot loaded with it.
+    add_events (bulk load) defers snapshots to a single one at the end.
+    Replays are idempotent (same event id overwrites), so a crash between writing a snapshot
+    and truncating the WAL only re-applies a few records.
+    All reads and writes take the same lock (FastAPI runs sync endpoints in a threadpool).
+    """
+    SNAPSHOT_FILE = "snapshot.lgraph"
+    WAL_FILE = "wal.jsonl"
+
+    def __init__(self, path: str = DEFAULT_GRAPH_DIR, snapshot_every: int = 10_000,
+                 snapshot_ratio: float = 0.5, fsync: bool = False, top_k: int = 10):
+        from src.historian.compact_graph import CompactGraph
+        self.top_k = top_k
+        self.graph = CompactGraph.from_local(LocalGraph(top_k=top_k))
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.snapshot_ratio = snapshot_ratio
+        self.fsync = fsync # fsync each WAL write (durable against power loss, slower)
+        self._lock = threading.RLock()
+        self._pending = 0 # WAL records since the last snapshot
+        os.makedirs(path, exist_ok=True)
+
+        start = time.time()
+        restored = self._load_snapshot()
+        replayed = self._replay_wal()
+        self._pending = replayed
+        self._wal = open(self.wal_path, 'a', encoding='utf-8')
+        print(f"[Graph] Restored {restored} events from snapshot + {replayed} WAL records "
+              f"in {time.time() - start:.2f}s ({self.path})")
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.path, self.SNAPSHOT_FILE)
+
+    @property
+    def wal_path(self) -> str:
+        return os.path.join(self.path, self.WAL_FILE)
+
+    def _load_snapshot(self) -> int:
+        if not os.path.exists(self.snapshot_path):
+            return 0
+        from src.historian.compact_graph import CompactGraph
+        self.graph = CompactGraph.load(self.snapshot_path, top_k=self.top_k)
+        return self.graph.event_count
+
+    @property
+    def event_count(self) -> int:
+        with self._lock:
+            return self.graph.event_count
+
+    def _replay_wal(self) -> int:
+        if not os.path.exists(self.wal_path):
+            return 0
+        count, good = 0, 0
+        with open(self.wal_path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break # Torn tail from a crash mid-write: everything before it is intact
+                self._apply(record)
+                count += 1
+                good += len(line)
+        if good < os.path.getsize(self.wal_path):
+            # Drop the torn tail so new appends are not hidden behind it on the next replay
+            with open(self.wal_path, 'r+b') as f:
+                f.truncate(good)
+        return count
+
+    def _apply(self, record: dict):
+        if record["op"] == "event":
+            data = dict(record["data"])
+            try:
+                data["date"] = datetime.fromisoformat(data["date"])
+            except (TypeError, ValueError):
+                pass
+            self.graph.add_event(Event(**data))
+        elif record["op"] == "relation":
+            self.graph.add_relation(Relation(**record["data"]))
+
+    @staticmethod
+    def _encode(op: str, obj) -> str:
+        return json.dumps({"op": op, "data": asdict(obj)}, ensure_ascii=False, default=str) + "\n"
+
+    def _log(self, lines: str):
+        self._wal.write(lines)
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+
+    def _applied(self, count: int, check: bool = True):
+        self._pending += count
+        if check and self._snapshot_due():
+            self.snapshot()
+
+    def _snapshot_due(self) -> bool:
+        if not self.snapshot_every:
+            return False
+        # Snapshot size (arrays only): counting the overlay would cost O(overlay) per write
+        snapshot_size = len(self.graph.event_node)
+        return self._pending >= max(self.snapshot_every, self.snapshot_ratio * snapshot_size)
+
+    # --- Reads ---
+
+    def get_related_events(self, entities: List[str], hops: int = 2, top_k: Optional[int] = None) -> List[Event]:
+        with self._lock:
+            return self.graph.get_related_events(entities, hops=hops, top_k=top_k)
+
+    def traverse(self, entities: List[str], hops: int = 2, top_k: Optional[int] = None) -> Tuple[List[Event], Set[str]]:
+        with self._lock:
+            return self.graph.traverse(entities, hops=hops, top_k=top_k)
+
+    # --- Writes (logged before they are applied) ---
+
+    def add_event(self, event: Event):
+        with self._lock:
+            self._wal_write_and_apply([event])
+
+    def add_events(self, events: Iterable[Event], batch_size: int = 1000) -> int:
+        """
+        Backfill path: one WAL write + flush per batch instead of per event,
+        and at most one snapshot, after the last batch.
+        """
+        total, batch = 0, []
+        with self._lock:
+            for event in events:
+                batch.append(event)
+                if len(batch) >= batch_size:
+                    total += self._wal_write_and_apply(batch, check=False)
+                    batch = []
+            if batch:
+                total += self._wal_write_and_apply(batch, check=False)
+            if self._snapshot_due():
+                self.snapshot()
+        return total
+
+    def _wal_write_and_apply(self, events, check: bool = True) -> int:
+        self._log("".join(self._encode("event", e) for e in events))
+        for event in events:
+            self.graph.add_event(event)
+        self._applied(len(events), check)
+        return len(events)
+
+    def add_relation(self, relation: Relation):
+        with self._lock:
+            self._log(self._encode("relation", relation))
+            self.graph.add_relation(relation)
+            self._applied(1)
+
+    def snapshot(self):
+        """
+        Folds the overlay into a new compact snapshot, then starts an empty WAL
+        and serves reads from the freshly mapped file.
+        """
+        from src.historian.compact_graph import CompactGraph
+        with self._lock:
+            start = time.time()
+            self.graph.compact().save(self.snapshot_path)
+            self.graph = CompactGraph.load(self.snapshot_path, top_k=self.top_k)
+            self._wal.close()
+            self._wal = open(self.wal_path, 'w', encoding='utf-8')
+            self._pending = 0
+            print(f"[Graph] Snapshot: {self.graph.event_count} events in {time.time() - start:.2f}s")
+
+    def close(self, snapshot: bool = True):
+        with self._lock:
+            if snapshot and self._pending:
+                self.snapshot()
+            self._wal.close()
@@ -0,0 +1,85 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+class _Result:
+    def __init__(self, records: List[Dict[str, Any]]):
+        self._records = records
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def consume(self):
+        return None
+
+class _Tx:
+    def __init__(self, driver: "RecordingDriver", session: "_Session"):
+        self._driver = driver
+        self._session = session
+
+    def run(self, query: str, **params) -> _Result:
+        return self._driver._record(query, params, self._session.transactions)
+
+class _Session:
+    def __init__(self, driver: "RecordingDriver"):
+        self._driver = driver
+        self.transactions = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run(self, query: str, **params) -> _Result:
+        # Auto-commit query: its own transaction
+        self.transactions += 1
+        return self._driver._record(query, params, self.transactions)
+
+    def execute_write(self, work, *args, **kwargs):
+        self.transactions += 1
+        return work(_Tx(self._driver, self), *args, **kwargs)
+
+    execute_read = execute_write
+
+    def close(self):
+        pass
+
+class RecordingDriver:
+    """
+    Offline stand-in for `neo4j.Driver`: records every (query, params) instead of executing it,
+    with an optional per-round-trip latency and canned read results.
+    Lets ingestion batching / schema setup be checked and benchmarked without a server.
+    """
+    def __init__(self, latency: float = 0.0, results: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.latency = latency
+        self.results = results or {} # query substring -> records returned by run()
+        self.queries: List[Dict[str, Any]] = []
+        self.sessions = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def session(self, **kwargs) -> _Session:
+        with self._lock:
+            self.sessions += 1
+        return _Session(self)
+
+    def _record(self, query: str, params: Dict[str, Any], transaction: int) -> _Result:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.queries.append({"query": query, "params": params, "transaction": transaction})
+        for marker, records in self.results.items():
+            if marker in query:
+                return _Result(records)
+        return _Result([])
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def round_trips(self) -> int:
+        return len(self.queries)
+
+    def rows_written(self, param: str = "events") -> int:
+        return sum(len(q["params"].get(param, [])) for q in self.queries)
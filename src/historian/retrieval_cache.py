@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from src.core.models import Event, Relation
+from src.historian.graph_db import GraphDB
+
+CacheKey = Tuple[Tuple[str, ...], int]
+
+class CachedGraph(GraphDB):
+    """
+    Retrieval cache in front of any GraphDB: get_related_events results keyed by
+    (sorted entity tuple, hops), with TTL expiry and LRU eviction.
+    add_event / add_events / add_relation through this wrapper invalidate every entry whose seed
+    entities, cached events' entities, or traversed entities overlap the written entities.
+    Traversed entities (those within hops - 1 of a seed, e.g. via RELATED_TO) come from the graph's
+    traverse() where it has one (LocalGraph, CompactGraph, PersistentGraph); Neo4j results carry
+    neither, so TTL bounds staleness from multi-hop effects there.
+    Writes made on the wrapped graph directly (e.g. Neo4jGraph.add_events on the raw graph) bypass
+    invalidation: route them through the wrapper or call invalidate()/clear() afterwards.
+    Every write bumps a generation counter; a miss whose query overlapped a write is returned
+    but not stored.
+    """
+    def __init__(self, graph: GraphDB, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600):
+        self.graph = graph
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, List[Event], Set[str]]]" = OrderedDict()
+        self._by_entity: Dict[str, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = 0
+
+    @staticmethod
+    def key(entities: List[str], hops: int) -> CacheKey:
+        return tuple(sorted(set(entities))), hops
+
+    def get_related_events(self, entities: List[str], hops: int = 2) -> List[Event]:
+        key = self.key(entities, hops)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl_seconds is None or now - entry[0] <= self.ttl_seconds):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            generation = self._generation
+
+        # Miss: query outside the lock (concurrent stage-3 workers may race on the same key; last write wins).
+        # If a write happened meanwhile the result may predate it: don't cache it.
+        if hasattr(self.graph, 'traverse'):
+            events, reached = self.graph.traverse(list(key[0]), hops=hops)
+        else:
+            events, reached = self.graph.get_related_events(list(key[0]), hops=hops), set()
+        with self._lock:
+            if self._generation == generation:
+                self._store(key, events, reached, now)
+        return list(events)
+
+    @staticmethod
+    def _touched(key: CacheKey, events: List[Event], reached: Set[str]) -> Set[str]:
+        touched = set(key[0]) | reached
+        for event in events:
+            touched.update(getattr(event, 'entities', None) or ())
+        return touched
+
+    def _store(self, key: CacheKey, events: List[Event], reached: Set[str], now: float):
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (now, events, reached)
+        for entity in self._touched(key, events, reached):
+            self._by_entity.setdefault(entity, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: CacheKey):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for entity in self._touched(key, entry[1], entry[2]):
+            keys = self._by_entity.get(entity)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_entity[entity]
+
+    def invalidate(self, entities: Iterable[str]) -> int:
+        with self._lock:
+            self._generation += 1
+            stale = set()
+            for entity in entities:
+                stale.update(self._by_entity.get(entity, ()))
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def _begin_write(self):
+        # Misses already in flight must not store results read before this write lands
+        with self._lock:
+            self._generation += 1
+
+    def add_event(self, event: Event):
+        self._begin_write()
+        self.graph.add_event(event)
+        self.invalidate(event.entities)
+
+    def add_events(self, events: Iterable[Event], **kwargs) -> int:
+        """
+        Bulk write through the wrapped graph's add_events (or add_event per event), then one
+        invalidation for the union of the events' entities.
+        """
+        events = list(events)
+        self._begin_write()
+        if hasattr(self.graph, 'add_events'):
+            written = self.graph.add_events(events, **kwargs)
+        else:
+            for event in events:
+                self.graph.add_event(event)
+            written = len(events)
+        entities = set()
+        for event in events:
+            entities.update(event.entities)
+        self.invalidate(entities)
+        return written
+
+    def add_relation(self, relation: Relation):
+        self._begin_write()
+        self.graph.add_relation(relation)
+        self.invalidate([relation.source, relation.target])
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_entity.clear()
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._entries), "invalidations": self.invalidations}
+
+    def close(self):
+        if hasattr(self.graph, 'close'):
+            self.graph.close()
@@ -0,0 +1,26 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# Tests import the package as `src.*`, like the scripts do
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.models import Event, NewsItem
+
+@pytest.fixture
+def make_event():
+    def factory(event_id: str, *entities: str, impact: float = 0.5, date: datetime = datetime(2024, 1, 1)) -> Event:
+        return Event(id=event_id, date=date, description=event_id,
+                     entities=list(entities), event_type="Test", impact_score=impact)
+    return factory
+
+@pytest.fixture
+def make_item():
+    def factory(title: str, url: str = "", source: str = "feed", content: str = None, item_id: str = None) -> NewsItem:
+        from src.gatekeeper.dedup import stable_item_id
+        return NewsItem(id=item_id or stable_item_id(url=url, title=title, content=content or ""),
+                        title=title, content=title if content is None else content, url=url,
+                        published_at=datetime(2024, 1, 1), source=source)
+    return factory
@@ -0,0 +1,61 @@
+import itertools
+import random
+import string
+from difflib import SequenceMatcher
+
+import pytest
+
+from src.gatekeeper.clustering import TITLE_THRESHOLD, title_candidates
+
+def _titles(seed: int = 0, stories: int = 120):
+    """
+    Synthetic headlines plus reposts with 1-2 word-level edits (suffix, swapped/replaced word, case).
+    """
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))) for _ in range(800)]
+
+    def variant(title):
+        words = title.split()
+        op = rng.random()
+        if op < 0.25:
+            words.append(rng.choice(["- Reuters", "| Electrek", "(update)"]))
+        elif op < 0.5:
+            words[rng.randrange(len(words))] = rng.choice(vocab)
+        elif op < 0.75:
+            i = rng.randrange(len(words) - 1)
+            words[i], words[i + 1] = words[i + 1], words[i]
+        else:
+            words[0] = words[0].upper()
+            words[-1] += "!"
+        return " ".join(words)
+
+    titles = []
+    for _ in range(stories):
+        title = " ".join(rng.choice(vocab) for _ in range(rng.randint(4, 9))).capitalize()
+        titles.append(title)
+        for _ in range(rng.randint(0, 3)):
+            titles.append(variant(variant(title)) if rng.random() < 0.5 else variant(title))
+    rng.shuffle(titles)
+    return titles
+
+def _brute_force_pairs(titles):
+    pairs = set()
+    for i, j in itertools.combinations(range(len(titles)), 2):
+        matcher = SequenceMatcher(None, titles[i], titles[j])
+        if matcher.quick_ratio() > TITLE_THRESHOLD and matcher.ratio() > TITLE_THRESHOLD:
+            pairs.add((i, j))
+    return pairs
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_title_candidates_against_brute_force(seed):
+    titles = _titles(seed)
+    truth = _brute_force_pairs(titles)
+    assert len(truth) > 50
+
+    exact = title_candidates(titles)
+    assert all(j in exact[i] for i, j in truth) # exact below EXACT_TITLE_LIMIT
+
+    lsh = title_candidates(titles, exact_limit=0)
+    recall = sum(j in lsh[i] for i, j in truth) / len(truth)
+    assert recall >= 0.98
+    assert sum(map(len, lsh)) / 2 < 0.02 * len(titles) ** 2 # still a small fraction of all pairs
@@ -0,0 +1,30 @@
+from src.core.models import Relation
+from src.historian.compact_graph import CompactGraph
+from src.historian.graph_db import LocalGraph
+from src.historian.retrieval_cache import CachedGraph
+
+def _ids(events):
+    return [e.id for e in events]
+
+def test_writes_after_compaction_match_local_graph(tmp_path, make_event):
+    local = LocalGraph()
+    local.add_event(make_event("E1", "Tesla", "China", impact=0.9))
+    local.add_event(make_event("E2", "China", "EU", impact=0.4))
+    graph = CachedGraph(local.compact())
+
+    # CompactGraph is a drop-in GraphDB: writes land in its overlay
+    for event in (make_event("E3", "EU", "BYD", impact=0.7), make_event("E4", "Canada", impact=0.8)):
+        local.add_event(event)
+        graph.add_event(event)
+    relation = Relation("Tesla", "Canada", "partners_with")
+    local.add_relation(relation)
+    graph.add_relation(relation)
+
+    for hops in (1, 2, 3):
+        assert _ids(graph.get_related_events(["Tesla"], hops=hops)) == _ids(local.get_related_events(["Tesla"], hops=hops))
+
+    path = str(tmp_path / "graph.bin")
+    graph.graph.save(path)
+    reloaded = CompactGraph.load(path)
+    assert reloaded.event_count == 4
+    assert _ids(reloaded.get_related_events(["Tesla"], hops=3)) == _ids(local.get_related_events(["Tesla"], hops=3))
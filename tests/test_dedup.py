@@ -0,0 +1,12 @@
+from src.gatekeeper.dedup import deduplicate_items, stable_item_id
+
+def test_blank_and_placeholder_titles_do_not_collapse(make_item):
+    items = [make_item("No Title", "https://a.example/1"), make_item("", "https://a.example/2"),
+             make_item("  ", "https://b.example/3"), make_item("No Title", "https://a.example/1?utm_source=x", "other")]
+    kept, report = deduplicate_items(items)
+    assert [item.url for item in kept] == ["https://a.example/1", "https://a.example/2", "https://b.example/3"]
+    assert report["other"]["kept"] == 0
+
+def test_placeholder_title_ids_fall_back_to_content():
+    assert stable_item_id(title="No Title", content="first") != stable_item_id(title="No Title", content="second")
+    assert stable_item_id(title="Tesla cuts prices") == stable_item_id(title="Tesla  cuts prices!")
@@ -0,0 +1,99 @@
+import numpy as np
+
+from src.gatekeeper.embedding_cache import EmbeddingCache
+
+DIM = 4
+
+def _vector(text: str) -> np.ndarray:
+    seed = int.from_bytes(text.encode('utf-8')[-4:].rjust(4, b'\0'), 'little')
+    return np.random.default_rng(seed).random(DIM, dtype=np.float32)
+
+def _encode(texts):
+    return np.stack([_vector(t) for t in texts])
+
+def _nul_terminated_text(cache: EmbeddingCache) -> str:
+    for i in range(100_000):
+        text = f"nul-{i}"
+        if cache.key(text).endswith(b"\0"):
+            return text
+    raise AssertionError("no NUL-terminated digest found")
+
+def test_nul_terminated_digest_survives_eviction_and_reload(tmp_path):
+    cache = EmbeddingCache("test-model", dim=DIM, cache_dir=str(tmp_path), max_entries=4, initial_capacity=4)
+    nul_text = _nul_terminated_text(cache)
+
+    # The NUL-terminated key is the oldest entry, so it is the first eviction victim
+    texts = [nul_text] + [f"text-{i}" for i in range(3)]
+    cache.encode(texts, _encode)
+    assert cache.get(nul_text) is not None
+    cache._index['tick'][cache._rows[cache.key(nul_text)]] = 0
+
+    newcomers = [f"new-{i}" for i in range(6)]
+    cache.encode(newcomers, _encode)
+
+    assert cache.get(nul_text) is None # really evicted, not left as a stale key
+    assert len(cache) <= 4
+    for text in texts + newcomers:
+        vector = cache.get(text)
+        if vector is not None:
+            np.testing.assert_allclose(vector, _vector(text))
+
+    # Re-inserted and reloaded from disk: exact key, still hits
+    cache.encode([nul_text], _encode)
+    cache.flush()
+    reloaded = EmbeddingCache("test-model", dim=DIM, cache_dir=str(tmp_path), max_entries=4, initial_capacity=4)
+    np.testing.assert_allclose(reloaded.get(nul_text), _vector(nul_text))
+    assert len(reloaded) == len(cache)
+
+def _writer(cache_dir: str, worker: int):
+    cache = EmbeddingCache("test-model", dim=DIM, cache_dir=cache_dir, max_entries=40, initial_capacity=8)
+    for round_ in range(5):
+        cache.encode([f"w{worker}-r{round_}-{i}" for i in range(12)] + ["shared"], _encode)
+
+def test_concurrent_processes_never_map_a_key_to_another_vector(tmp_path):
+    import multiprocessing
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_writer, args=(str(tmp_path), w)) for w in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+        assert p.exitcode == 0
+
+    cache = EmbeddingCache("test-model", dim=DIM, cache_dir=str(tmp_path), max_entries=40)
+    assert 0 < len(cache) <= 40
+    for k, row in cache._rows.items():
+        assert cache._index['used'][row]
+    texts = ["shared"] + [f"w{w}-r{r}-{i}" for w in range(4) for r in range(5) for i in range(12)]
+    found = 0
+    for text in texts:
+        vector = cache.get(text)
+        if vector is not None:
+            found += 1
+            np.testing.assert_allclose(vector, _vector(text))
+    assert found == len(cache)
+
+def test_crash_after_eviction_does_not_resurrect_evicted_keys(tmp_path, monkeypatch):
+    cache = EmbeddingCache("test-model", dim=DIM, cache_dir=str(tmp_path), max_entries=4, initial_capacity=4)
+    old = [f"old-{i}" for i in range(4)]
+    cache.encode(old, _encode)
+
+    # Crash after the new vectors hit the file but before their keys are indexed
+    saves = []
+    def crash_after_first_save():
+        saves.append(1)
+        if len(saves) > 1:
+            raise RuntimeError("crash")
+        EmbeddingCache._save_index(cache)
+    monkeypatch.setattr(cache, "_save_index", crash_after_first_save)
+    try:
+        cache.encode(["new-0"], _encode)
+    except RuntimeError:
+        pass
+
+    reloaded = EmbeddingCache("test-model", dim=DIM, cache_dir=str(tmp_path), max_entries=4, initial_capacity=4)
+    for text in old:
+        vector = reloaded.get(text)
+        if vector is not None:
+            np.testing.assert_allclose(vector, _vector(text))
+    assert reloaded.get("new-0") is None
@@ -0,0 +1,55 @@
+import threading
+
+import numpy as np
+
+from src.core.models import Relation
+from src.historian.graph_db import LocalGraph
+from src.historian.graph_store import PersistentGraph
+
+def _ids(events):
+    return [e.id for e in events]
+
+def test_restart_serves_mmap_snapshot_plus_wal(tmp_path, make_event):
+    path = str(tmp_path / "graph")
+    local = LocalGraph()
+    graph = PersistentGraph(path, snapshot_every=0)
+    for event in (make_event("E1", "Tesla", "China", impact=0.9), make_event("E2", "China", "EU", impact=0.4)):
+        local.add_event(event)
+        graph.add_event(event)
+    graph.snapshot()
+    # After the snapshot: only in the WAL
+    for graph_ in (local, graph):
+        graph_.add_event(make_event("E3", "EU", "BYD", impact=0.7))
+        graph_.add_relation(Relation("Tesla", "BYD", "competes_with"))
+    graph.close(snapshot=False)
+
+    reopened = PersistentGraph(path, snapshot_every=0)
+    assert isinstance(reopened.graph.event_node, np.memmap) # not copied back into dicts
+    assert set(reopened.graph.overlay.events) == {"E3"}
+    for hops in (1, 2, 3):
+        assert _ids(reopened.get_related_events(["Tesla"], hops=hops)) == _ids(local.get_related_events(["Tesla"], hops=hops))
+    assert reopened.event_count == 3
+    reopened.close(snapshot=False)
+
+def test_reads_race_writes(tmp_path, make_event):
+    graph = PersistentGraph(str(tmp_path / "graph"), snapshot_every=50, snapshot_ratio=0.5)
+    errors = []
+
+    def reader():
+        try:
+            for _ in range(50):
+                graph.get_related_events(["Tesla"], hops=2)
+        except Exception as e: # e.g. "dictionary changed size during iteration"
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for i in range(200):
+        graph.add_event(make_event(f"E{i}", "Tesla", f"Entity{i % 7}"))
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(graph.get_related_events(["Tesla"], hops=1, top_k=0)) == 200
+    graph.close()
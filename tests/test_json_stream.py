@@ -0,0 +1,27 @@
+from src.analyst.json_stream import JsonArrayStreamParser
+
+def _feed_chars(text):
+    parser = JsonArrayStreamParser()
+    out = []
+    for ch in text: # worst case: one character per streamed delta
+        out.extend(parser.feed(ch))
+    return parser, out
+
+def test_brackets_in_leading_prose_are_not_the_array():
+    text = 'Scores [see notes] for items [1] and [2]:\n[\n  {"id": "a", "score": 7}, {"id": "b", "score": 3}\n]'
+    parser, out = _feed_chars(text)
+    assert [obj["id"] for obj in out] == ["a", "b"]
+    assert parser.complete and parser.malformed == 0
+
+def test_array_after_code_fence():
+    parser, out = _feed_chars('```json\n[ {"id": "a", "reason": "uses [brackets] and } braces"}, oops, {"id": "b"} ]\n```')
+    assert [obj["id"] for obj in out] == ["a", "b"]
+    assert parser.complete
+
+def test_empty_array_and_malformed_elements():
+    parser, out = _feed_chars("[ ]")
+    assert out == [] and parser.complete
+
+    parser, out = _feed_chars('[{"id": "a"}, {"id": }, {"id": "c"}]')
+    assert [obj["id"] for obj in out] == ["a", "c"]
+    assert parser.malformed == 1
@@ -0,0 +1,48 @@
+from src.core.ledger import ProcessedLedger
+
+def test_torn_last_line_is_dropped_and_next_record_survives(tmp_path):
+    path = str(tmp_path / "ledger.jsonl")
+    ledger = ProcessedLedger(path)
+    ledger.record("s:v1", "a", {"score": 1})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"stage": "s:v1", "id": "b", "da') # crash mid-append
+
+    ledger = ProcessedLedger(path)
+    assert not ledger.has("s:v1", "b")
+    ledger.record("s:v1", "c", {"score": 3})
+
+    reloaded = ProcessedLedger(path)
+    assert reloaded.get("s:v1", "a") == {"score": 1}
+    assert reloaded.get("s:v1", "c") == {"score": 3}
+
+def test_complete_last_record_without_newline_is_kept(tmp_path):
+    path = str(tmp_path / "ledger.jsonl")
+    ProcessedLedger(path).record("s:v1", "a", 1)
+    with open(path, "rb+") as f:
+        f.truncate(f.seek(0, 2) - 1)
+
+    ledger = ProcessedLedger(path)
+    ledger.record("s:v1", "b", 2)
+    assert ProcessedLedger(path).get("s:v1", "a") == 1
+    assert ProcessedLedger(path).get("s:v1", "b") == 2
+
+def test_retire_stages_keeps_current_and_other_families(tmp_path):
+    path = str(tmp_path / "ledger.jsonl")
+    ledger = ProcessedLedger(path)
+    for stage in ("stage1_scores", "stage1_scores:old", "stage1_scores:new", "judge:abc"):
+        ledger.record(stage, "a", stage)
+
+    assert sorted(ledger.retire_stages("stage1_scores:new")) == ["stage1_scores", "stage1_scores:old"]
+    assert sorted(ProcessedLedger(path).stages()) == ["judge:abc", "stage1_scores:new"]
+    assert ledger.retire_stages("stage1_scores:new") == []
+
+def test_compaction_keeps_latest_record(tmp_path):
+    path = str(tmp_path / "ledger.jsonl")
+    ledger = ProcessedLedger(path, compact_ratio=2.0)
+    for value in range(5):
+        ledger.record("s:v1", "a", value)
+
+    reloaded = ProcessedLedger(path) # 5 lines for 1 live entry: compacts on load
+    assert reloaded.get("s:v1", "a") == 4
+    with open(path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
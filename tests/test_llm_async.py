@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from src.analyst import llm as llm_module
+from src.analyst.llm import FakeLLM, MockLLM
+
+def test_abatch_runs_concurrently_in_input_order():
+    llm = FakeLLM(latency=0.05)
+    prompts = [f"ID: {i}" for i in range(8)] + [("Plan the outline", "You are the Planner")]
+
+    start = time.perf_counter()
+    results = asyncio.run(llm.abatch(prompts, max_concurrency=8))
+    elapsed = time.perf_counter() - start
+
+    assert results[:8] == [f'[{{"id": "{i}", "score": 5.0, "reason": "Fake Judge"}}]' for i in range(8)]
+    assert results[8] == "Mock Response"
+    assert elapsed < 0.05 * 4 # two waves of 0.05s, not nine sequential calls
+
+def test_abatch_respects_max_concurrency():
+    class Tracking(MockLLM):
+        active = peak = 0
+
+        async def acomplete(self, user_prompt, system_prompt=""):
+            type(self).active += 1
+            type(self).peak = max(type(self).peak, type(self).active)
+            await asyncio.sleep(0.01)
+            type(self).active -= 1
+            return user_prompt
+
+    llm = Tracking()
+    assert asyncio.run(llm.abatch([str(i) for i in range(10)], max_concurrency=3)) == [str(i) for i in range(10)]
+    assert Tracking.peak == 3
+
+def test_abatch_collects_errors_when_asked():
+    llm = FakeLLM(latency=0.0, error_rate=1.0)
+    results = asyncio.run(llm.abatch(["a", "b"], return_exceptions=True))
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+def test_default_acomplete_runs_blocking_complete_off_loop():
+    class Blocking(llm_module.LLMInterface):
+        def complete(self, user_prompt, system_prompt=""):
+            time.sleep(0.05)
+            return user_prompt.upper()
+
+    start = time.perf_counter()
+    assert asyncio.run(Blocking().abatch(["a", "b", "c", "d"])) == ["A", "B", "C", "D"]
+    assert time.perf_counter() - start < 0.05 * 3
+
+def test_async_clients_are_shared_per_event_loop():
+    created = []
+
+    def factory():
+        created.append(object())
+        return created[-1]
+
+    async def get():
+        first = llm_module._shared_async_client("test", "key", factory)
+        assert llm_module._shared_async_client("test", "key", factory) is first
+        return first
+
+    assert asyncio.run(get()) is not asyncio.run(get()) # new loop, new client
+    assert len(created) == 2
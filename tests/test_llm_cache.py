@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from src.analyst.llm import LLMInterface
+from src.analyst.llm_cache import CacheMissError, CachedLLM
+
+class _Counting(LLMInterface):
+    model = "counting"
+
+    def __init__(self, response="answer"):
+        self.response = response
+        self.calls = 0
+
+    def complete(self, user_prompt, system_prompt=""):
+        self.calls += 1
+        return f"{self.response}:{user_prompt}"
+
+    def stream(self, user_prompt, system_prompt=""):
+        self.calls += 1
+        text = f"{self.response}:{user_prompt}"
+        yield text[:3]
+        yield text[3:]
+
+def test_hits_persist_across_instances_and_key_on_system_prompt(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    inner = _Counting()
+    cache = CachedLLM(inner, path=path)
+    assert cache.complete("q", "sys") == "answer:q"
+    assert cache.complete("q", "sys") == "answer:q"
+    assert cache.complete("q", "other sys") == "answer:q"
+    assert inner.calls == 2
+    cache.close()
+
+    replay = CachedLLM(_Counting(), path=path, replay_only=True)
+    assert replay.complete("q", "sys") == "answer:q"
+    with pytest.raises(CacheMissError):
+        replay.complete("new", "sys")
+    assert replay.stats["hits"] == 1 and replay.stats["misses"] == 1
+
+def test_invalid_responses_are_not_stored_and_invalidate_forces_a_call(tmp_path):
+    inner = _Counting(response="partial")
+    cache = CachedLLM(inner, path=str(tmp_path / "cache.sqlite"), validate=lambda prompt, response: "ok" in response)
+    cache.complete("q")
+    cache.complete("q")
+    assert inner.calls == 2 and cache.rejected == 2
+
+    inner.response = "ok"
+    cache.complete("q")
+    cache.invalidate("q")
+    cache.complete("q")
+    assert inner.calls == 4
+
+def test_stream_caches_only_the_full_completion(tmp_path):
+    inner = _Counting()
+    cache = CachedLLM(inner, path=str(tmp_path / "cache.sqlite"))
+    assert list(cache.stream("q")) == ["ans", "wer:q"]
+    assert list(cache.stream("q")) == ["answer:q"] # replayed as one chunk
+    assert asyncio.run(cache.acomplete("q")) == "answer:q"
+    assert inner.calls == 1
+
+def test_ttl_expiry_and_lru_eviction(tmp_path):
+    inner = _Counting()
+    cache = CachedLLM(inner, path=str(tmp_path / "cache.sqlite"), max_entries=10, ttl_seconds=None)
+    for i in range(10):
+        cache.complete(str(i))
+    cache.complete("0") # touch: now most recently used
+    cache.complete("10") # over the limit: evicts the LRU rows down to 90%
+    calls = inner.calls
+    cache.complete("0")
+    cache.complete("1")
+    assert inner.calls == calls + 1 # "0" survived, "1" was evicted
+
+    expired = CachedLLM(inner, path=str(tmp_path / "cache.sqlite"), ttl_seconds=-1)
+    calls = inner.calls
+    expired.complete("0")
+    assert inner.calls == calls + 1
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from src.historian.graph_db import Neo4jGraph
+from src.historian.neo4j_fake import RecordingDriver
+
+def test_add_events_batches_into_unwind_round_trips(make_event):
+    driver = RecordingDriver()
+    graph = Neo4jGraph(driver=driver, batch_size=4)
+    events = [make_event(f"E{i}", "Tesla", f"Entity{i}", impact=i / 10) for i in range(10)]
+
+    assert graph.add_events(events) == 10
+
+    schema = [q for q in driver.queries if q["query"] in Neo4jGraph.SCHEMA_QUERIES]
+    ingest = [q for q in driver.queries if q["query"] == Neo4jGraph.INGEST_QUERY]
+    assert [q["query"] for q in schema] == Neo4jGraph.SCHEMA_QUERIES
+    assert driver.round_trips == len(Neo4jGraph.SCHEMA_QUERIES) + 3 # ceil(10 / 4) UNWIND batches
+    assert "UNWIND $events AS row" in Neo4jGraph.INGEST_QUERY
+    assert [len(q["params"]["events"]) for q in ingest] == [4, 4, 2]
+    assert [q["transaction"] for q in ingest] == [1, 2, 3] # one transaction per batch
+    assert driver.sessions == 2 # schema setup + one reused ingest session
+    assert ingest[0]["params"]["events"][1] == {
+        "id": "E1", "description": "E1", "date": datetime(2024, 1, 1).isoformat(),
+        "event_type": "Test", "impact": 0.1, "entities": ["Tesla", "Entity1"],
+    }
+
+def test_schema_is_created_once(make_event):
+    driver = RecordingDriver()
+    graph = Neo4jGraph(driver=driver)
+    graph.add_events([make_event("E1", "Tesla")])
+    graph.add_event(make_event("E2", "BYD"))
+
+    assert sum(q["query"] in Neo4jGraph.SCHEMA_QUERIES for q in driver.queries) == len(Neo4jGraph.SCHEMA_QUERIES)
+    assert driver.rows_written() == 2
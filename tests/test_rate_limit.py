@@ -0,0 +1,75 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.analyst.llm import LLMInterface
+from src.analyst.rate_limit import RateLimitedLLM, RateLimiter, TokenBucket, retry_after_seconds
+
+class _Flaky(LLMInterface):
+    """
+    Fails the first `failures` calls with `error`, then echoes; tracks peak concurrency.
+    """
+    def __init__(self, failures: int = 0, error: str = "429 RESOURCE_EXHAUSTED", latency: float = 0.0):
+        self.failures = failures
+        self.error = error
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def complete(self, user_prompt, system_prompt=""):
+        with self._lock:
+            self.calls += 1
+            fail = self.calls <= self.failures
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.latency)
+            if fail:
+                raise RuntimeError(self.error)
+            return user_prompt
+        finally:
+            with self._lock:
+                self.active -= 1
+
+def test_token_bucket_charges_debt_as_wait():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve(1) == 0.0
+    assert bucket.reserve(1) == 0.0
+    assert bucket.reserve(1) == pytest.approx(0.1, abs=0.02)
+    assert bucket.reserve(50) == pytest.approx(0.3, abs=0.02) # clamped to capacity, queued behind the debt
+
+def test_concurrency_cap_is_shared_by_all_callers():
+    limiter = RateLimiter(rpm=60_000, max_concurrency=3)
+    inner = _Flaky(latency=0.02)
+    llm = RateLimitedLLM(inner, limiter)
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        assert list(executor.map(llm.complete, [str(i) for i in range(20)])) == [str(i) for i in range(20)]
+    assert 1 < inner.peak <= 3
+    assert limiter.stats["calls"] == 20
+
+def test_throttle_honours_retry_after_then_succeeds():
+    limiter = RateLimiter(rpm=60_000, max_concurrency=2)
+    inner = _Flaky(failures=1, error="429 Too Many Requests: please try again in 0.2s")
+    llm = RateLimitedLLM(inner, limiter)
+
+    start = time.monotonic()
+    assert llm.complete("hello") == "hello"
+    assert time.monotonic() - start >= 0.2
+    assert inner.calls == 2
+    assert limiter.stats["throttled"] == 1
+
+def test_non_retryable_errors_are_not_retried():
+    inner = _Flaky(failures=5, error="400 invalid request")
+    llm = RateLimitedLLM(inner, RateLimiter(rpm=60_000))
+    with pytest.raises(RuntimeError):
+        llm.complete("x")
+    assert inner.calls == 1
+
+def test_retry_after_parsing():
+    assert retry_after_seconds(RuntimeError("{'retryDelay': '7s'}")) == 7.0
+    assert retry_after_seconds(RuntimeError("Rate limit reached. Please try again in 1.5s.")) == 1.5
+    assert retry_after_seconds(RuntimeError("429")) is None
@@ -0,0 +1,48 @@
+import random
+from urllib.parse import urlparse
+
+import pytest
+
+from src.gatekeeper.reputation import ReputationIndex
+
+def _legacy_score(trust_list, block_list, url, title):
+    # The linear substring scans the index replaced
+    domain = urlparse(url).netloc.replace('www.', '')
+    source_name = domain
+    if 'google' in domain and ' - ' in title:
+        source_name = title.rsplit(' - ', 1)[-1].strip().lower()
+    source_check = source_name.lower().replace(' ', '')
+    if any(spam in source_check for spam in block_list):
+        return 0.1
+    if any(trust in source_check for trust in trust_list):
+        return 1.2
+    return 0.9
+
+TRUST = ["reuters", "bloomberg", "electrek", "insideevs", "ft.com", "nikkei"]
+BLOCK = ["spam", "clickbait", "evnews24", "reuters-fake"]
+CASES = [
+    ("https://www.reuters.com/business/autos", "Tesla cuts prices"),
+    ("https://reuters-fake.biz/a", "Tesla cuts prices"),
+    ("https://news.google.com/rss/articles/x", "BYD beats Tesla - Bloomberg"),
+    ("https://news.google.com/rss/articles/y", "BYD beats Tesla - Click Bait Daily"),
+    ("https://news.google.com/rss/articles/z", "No source suffix"),
+    ("https://www.electrek.co/2024/ev", "Charging"),
+    ("https://unknown.example/", "Something"),
+    ("", ""),
+]
+
+@pytest.mark.parametrize("url,title", CASES)
+def test_index_matches_linear_scans(url, title):
+    index = ReputationIndex(TRUST, BLOCK)
+    assert index.lookup(url, title)[0] == _legacy_score(TRUST, BLOCK, url, title)
+
+def test_random_lists_and_sources_match_linear_scans():
+    rng = random.Random(7)
+    word = lambda: "".join(rng.choice("abcde.") for _ in range(rng.randint(1, 5)))
+    for _ in range(200):
+        trust = [word() for _ in range(rng.randint(0, 6))]
+        block = [word() for _ in range(rng.randint(0, 6))]
+        index = ReputationIndex(trust, block)
+        for _ in range(20):
+            url = f"https://{word()}{word()}.com/x"
+            assert index.lookup(url, "")[0] == _legacy_score(trust, block, url, "")
@@ -0,0 +1,59 @@
+import pytest
+
+from src.core.models import Relation
+from src.historian.graph_db import LocalGraph
+from src.historian.retrieval_cache import CachedGraph
+
+class _RacingGraph(LocalGraph):
+    """
+    Lets a write land through the cache while a miss is querying.
+    """
+    def __init__(self):
+        super().__init__()
+        self.on_query = None
+
+    def traverse(self, entities, hops=2, top_k=None):
+        result = super().traverse(entities, hops=hops, top_k=top_k)
+        if self.on_query is not None:
+            hook, self.on_query = self.on_query, None
+            hook()
+        return result
+
+def test_miss_overlapping_a_write_is_not_cached(make_event):
+    graph = _RacingGraph()
+    graph.add_event(make_event("E1", "Tesla"))
+    cache = CachedGraph(graph)
+
+    graph.on_query = lambda: cache.add_event(make_event("E2", "Tesla"))
+    stale = cache.get_related_events(["Tesla"])
+    assert [e.id for e in stale] == ["E1"]
+    assert cache.stats["entries"] == 0
+
+    fresh = cache.get_related_events(["Tesla"])
+    assert {e.id for e in fresh} == {"E1", "E2"}
+
+def test_add_events_invalidates_union_of_entities(make_event):
+    graph = LocalGraph()
+    graph.add_event(make_event("E1", "Tesla"))
+    graph.add_event(make_event("E2", "BYD"))
+    cache = CachedGraph(graph)
+    cache.get_related_events(["Tesla"])
+    cache.get_related_events(["BYD"])
+    cache.get_related_events(["EU"])
+
+    assert cache.add_events([make_event("E3", "Tesla"), make_event("E4", "BYD")]) == 2
+    assert cache.stats["entries"] == 1
+    assert {e.id for e in cache.get_related_events(["BYD"])} == {"E2", "E4"}
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_event_on_related_entity_invalidates_seed_entry(make_event, compact):
+    graph = LocalGraph()
+    graph.add_event(make_event("E1", "Tesla"))
+    graph.add_relation(Relation("Tesla", "BYD", "competes_with"))
+    cache = CachedGraph(graph.compact() if compact else graph)
+    assert [e.id for e in cache.get_related_events(["Tesla"], hops=2)] == ["E1"]
+
+    # BYD is in no cached event, but the BFS from Tesla went through it
+    cache.add_event(make_event("E2", "BYD"))
+    assert cache.stats["entries"] == 0
+    assert [e.id for e in cache.get_related_events(["Tesla"], hops=2)] == ["E1", "E2"]
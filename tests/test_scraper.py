@@ -0,0 +1,126 @@
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.gatekeeper.scraper import RealScraper
+
+def _rss(*titles: str) -> bytes:
+    items = "".join(f"<item><title>{t}</title><link>https://news.example/{i}</link></item>"
+                    for i, t in enumerate(titles))
+    return f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>'.encode('utf-8')
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    feeds = {} # path -> (etag, body)
+    delays = {} # path -> seconds before answering
+    requests = []
+
+    def do_GET(self):
+        # Requests through a proxy carry the absolute URL
+        path = urllib.parse.urlsplit(self.path).path
+        type(self).requests.append((self.path, dict(self.headers)))
+        etag, body = self.feeds[path]
+        time.sleep(self.delays.get(path, 0))
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # client gave up (timeout test)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def feed_server(monkeypatch):
+    for name in ("http_proxy", "HTTP_PROXY", "https_proxy", "HTTPS_PROXY", "no_proxy", "NO_PROXY"):
+        monkeypatch.delenv(name, raising=False)
+    _FeedHandler.feeds, _FeedHandler.delays, _FeedHandler.requests = {}, {}, []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def _titles(items):
+    return [item.title for item in items]
+
+def test_conditional_get_and_seen_items(feed_server, tmp_path):
+    _, base = feed_server
+    state_path = str(tmp_path / "feed_state.json")
+    _FeedHandler.feeds["/a"] = ('"v1"', _rss("One", "Two"))
+
+    assert _titles(RealScraper([base + "/a"], state_path=state_path).scrape()) == ["One", "Two"]
+
+    # Not committed (downstream failed): the next run sees the same items again
+    scraper = RealScraper([base + "/a"], state_path=state_path)
+    assert _titles(scraper.scrape()) == ["One", "Two"]
+    scraper.commit_state()
+
+    # Committed: the ETag is sent back and the 304 yields nothing
+    assert RealScraper([base + "/a"], state_path=state_path).scrape() == []
+    assert _FeedHandler.requests[-1][1].get('If-None-Match') == '"v1"'
+
+    # Changed feed: only the item not seen before
+    _FeedHandler.feeds["/a"] = ('"v2"', _rss("One", "Two", "Three"))
+    assert _titles(RealScraper([base + "/a"], state_path=state_path).scrape()) == ["Three"]
+
+def test_identical_body_without_etag_is_not_modified(feed_server, tmp_path):
+    _, base = feed_server
+    state_path = str(tmp_path / "feed_state.json")
+    _FeedHandler.feeds["/b"] = (None, _rss("Only"))
+
+    scraper = RealScraper([base + "/b"], state_path=state_path)
+    assert _titles(scraper.scrape()) == ["Only"]
+    scraper.commit_state()
+    assert RealScraper([base + "/b"], state_path=state_path).scrape() == []
+
+def test_feeds_are_fetched_concurrently_in_source_order(feed_server):
+    _, base = feed_server
+    sources = [f"{base}/{i}" for i in range(6)]
+    for i in range(6):
+        _FeedHandler.feeds[f"/{i}"] = (None, _rss(f"Story {i}"))
+        _FeedHandler.delays[f"/{i}"] = 0.2
+
+    start = time.perf_counter()
+    items = RealScraper(sources, max_workers=6).scrape()
+    assert time.perf_counter() - start < 0.2 * 3 # one wave, not six sequential fetches
+    assert _titles(items) == [f"Story {i}" for i in range(6)]
+
+def test_slow_feed_times_out_without_failing_the_others(feed_server):
+    _, base = feed_server
+    _FeedHandler.feeds["/slow"] = (None, _rss("Late"))
+    _FeedHandler.feeds["/fast"] = (None, _rss("On time"))
+    _FeedHandler.delays["/slow"] = 1.0
+
+    start = time.perf_counter()
+    items = RealScraper([base + "/slow", base + "/fast"], max_workers=2, timeout=0.2).scrape()
+    assert time.perf_counter() - start < 0.9
+    assert _titles(items) == ["On time"]
+
+def test_pooled_fetch_honours_http_proxy(feed_server, monkeypatch):
+    _, base = feed_server
+    monkeypatch.setenv("http_proxy", base)
+    urllib.request.install_opener(None) # urlopen reads the proxy env when it builds its opener
+    _FeedHandler.feeds["/a"] = (None, _rss("Via proxy A"))
+    _FeedHandler.feeds["/b"] = (None, _rss("Via proxy B"))
+
+    # feeds.invalid does not resolve: only the proxy can answer
+    try:
+        items = RealScraper(["http://feeds.invalid/a", "http://feeds.invalid/b"], max_workers=2).scrape()
+    finally:
+        urllib.request.install_opener(None)
+    assert _titles(items) == ["Via proxy A", "Via proxy B"]
+    assert sorted(path for path, _ in _FeedHandler.requests) == ["http://feeds.invalid/a", "http://feeds.invalid/b"]
@@ -0,0 +1,41 @@
+import re
+
+import numpy as np
+import pytest
+
+from src.gatekeeper.tfidf import TfidfScorer
+
+IDF = {"tesla": 3.2, "cuts": 1.1, "prices": 2.4, "china": 1.9, "ev": 4.5, "byd": 5.0, "über": 2.2}
+DEFAULT_IDF = 6.0
+TEXTS = [
+    "Tesla cuts prices in China!",
+    "BYD's EV sales beat Tesla, 2024 record (Q3)",
+    "Über-fast chargers: über good? über 350 kW",
+    "Completely unknown words only",
+    "",
+    "1 2 3 a b c !!!",
+    "EV " * 500,
+]
+
+def _legacy_score(text: str) -> float:
+    # The per-item loop the compiled scorer replaced
+    tokens = [w for w in re.sub(r'[^\w\s]', '', text.lower()).split() if len(w) > 1 and not w.isdigit()]
+    if not tokens:
+        return 0.0
+    score_sum = sum(IDF.get(token, DEFAULT_IDF) for token in tokens)
+    return min(1.0, score_sum / (len(tokens) ** 0.5) / 30.0)
+
+def test_compiled_scores_match_legacy_loop():
+    scorer = TfidfScorer.from_scores(IDF, DEFAULT_IDF)
+    expected = [_legacy_score(text) for text in TEXTS]
+    assert scorer.score_batch(TEXTS) == pytest.approx(expected, abs=1e-6)
+    assert [scorer.score(text) for text in TEXTS] == pytest.approx(expected, abs=1e-6)
+
+def test_binary_export_is_memory_mapped_and_equivalent(tmp_path):
+    prefix = str(tmp_path / "model")
+    TfidfScorer.export(IDF, DEFAULT_IDF, total_docs=10, prefix=prefix)
+    scorer = TfidfScorer.load(prefix=prefix, json_path=str(tmp_path / "missing.json"))
+
+    assert isinstance(scorer.idf, np.memmap)
+    assert scorer.total_docs == 10
+    assert scorer.score_batch(TEXTS) == pytest.approx([_legacy_score(text) for text in TEXTS], abs=1e-6)
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from src.analyst.agents import Agent
+from src.analyst.workflow import StepCheckpoint, WorkflowNode, WorkflowScheduler
+
+class _Step(Agent):
+    """
+    Sleeps, then returns its name plus the upstream values it read; can be told to fail.
+    """
+    def __init__(self, name, reads=(), delay=0.0, fail=False):
+        super().__init__(name, "test", llm=None)
+        self.reads = reads
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def run(self, context):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        return "+".join([self.name] + [context[key] for key in self.reads])
+
+def test_independent_nodes_overlap_and_bind_renames_inputs():
+    writer = _Step("writer", reads=("plan",))
+    scheduler = WorkflowScheduler([
+        WorkflowNode("plan", _Step("planner", delay=0.1)),
+        WorkflowNode("simulation", _Step("simulator", delay=0.1)),
+        WorkflowNode("revised_plan", _Step("synth", reads=("plan", "simulation")), deps=["plan", "simulation"]),
+        WorkflowNode("draft", writer, deps=["revised_plan"], bind={"plan": "revised_plan"}),
+    ])
+
+    start = time.perf_counter()
+    results, timings = scheduler.run({"news": "n"})
+    assert time.perf_counter() - start < 0.18 # planner and simulator ran side by side
+    assert results["draft"] == "writer+synth+planner+simulator"
+    assert [t.name for t in timings][-2:] == ["synth", "writer"]
+
+def test_failure_keeps_finished_siblings_in_the_checkpoint(tmp_path):
+    path = str(tmp_path / "item.json")
+    simulator = _Step("simulator", delay=0.05)
+    failing = WorkflowScheduler([
+        WorkflowNode("plan", _Step("planner", fail=True)),
+        WorkflowNode("simulation", simulator),
+        WorkflowNode("draft", _Step("writer", reads=("plan", "simulation")), deps=["plan", "simulation"]),
+    ])
+    with pytest.raises(RuntimeError):
+        failing.run({}, checkpoint=StepCheckpoint(path))
+    assert StepCheckpoint(path).steps == {"simulation": "simulator"}
+
+    # Rerun: the simulation is restored, only the missing steps call their agents
+    simulator.calls = 0
+    rerun = WorkflowScheduler([
+        WorkflowNode("plan", _Step("planner")),
+        WorkflowNode("simulation", simulator),
+        WorkflowNode("draft", _Step("writer", reads=("plan", "simulation")), deps=["plan", "simulation"]),
+    ])
+    results, timings = rerun.run({}, checkpoint=StepCheckpoint(path))
+    assert results["draft"] == "writer+planner+simulator"
+    assert simulator.calls == 0
+    assert [t.name for t in timings if t.restored] == ["simulator"]
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError):
+        WorkflowScheduler([WorkflowNode("a", _Step("a"), deps=["missing"])])
+    cyclic = WorkflowScheduler([WorkflowNode("a", _Step("a"), deps=["b"]), WorkflowNode("b", _Step("b"), deps=["a"])])
+    with pytest.raises(ValueError):
+        cyclic.run({})